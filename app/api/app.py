@@ -1,40 +1,212 @@
 import os
-import base64
-from fastapi import FastAPI, HTTPException, UploadFile, File, status
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from app.core.board import Board
+import json
+import asyncio
+import contextvars
+import numpy as np
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError
 import random
-from app.core.ai import ai_move, transcribe_audio, ai_decision_with_llm
+from typing import List, Literal, Optional
+from app.core.analysis import PositionAnalyzer
+from app.core.ai import (STRATEGIES, ai_move_with_info, ai_moves_batch, transcribe_batch, transcribe_samples,
+                         ai_decision_with_llm, ai_decision_scored)
+from app.core.audio import (CHUNK_SIZE, TARGET_RATE, AudioDecodeError, MultipartError, UploadTooLarge, asr_input,
+                            read_limited, read_multipart_file, resample)
+from app.core.batching import MicroBatcher
+from app.core.board import Board
+from app.core.cache import LRUCache
+from app.core.events import GameEvents, board_delta
+from app.core.inference import InferencePool, InferenceTimeout, Overloaded
+from app.core.metrics import BOARD_LATENCY, REGISTRY, MetricsMiddleware
+from app.core.movelog import MoveLog
+from app.core.persistence import SQLiteGameRepository, SQLiteSharedState
+from app.core.models import ModelUnavailable, all_ready, models_status, warm_up
+from app.core.solver import get_perfect_table
+from app.core.store import GameStore, GameNotFound, VersionConflict
+from app.core.tts import TTSCache, get_backend, valid_key
+from app.services.speech_to_command import interpret_command
+from app.services.streaming_asr import StreamingRecognizer
 
 TEST_MODE = os.getenv("TEST_MODE", "false").lower() == "true"
+# 啟動時是否在背景預熱 Whisper/gpt2（不影響純遊戲端點的啟動速度）
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
 ALLOW_MOVE_ANYTIME = os.getenv("ALLOW_MOVE_ANYTIME", "true").lower() == "true"
+# 未指定 game_id 的舊端點（/game、/reset、/ai_move、/nlp_move）共用這一局
+DEFAULT_GAME_ID = "default"
+
+@asynccontextmanager
+async def lifespan(app):
+    # 啟動時先 mmap 完美對弈表（若已用 python -m app.core.solver 產生）
+    get_perfect_table()
+    if MODEL_WARMUP:
+        warm_up()
+    yield
+    if move_log is not None:
+        move_log.close()
+    if game_repo is not None:
+        game_repo.close()
+    if shared_state is not None:
+        shared_state.close()
+    model_pool.shutdown()
+    search_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+# 模型推論（ASR / LLM）與 AI 搜尋各自的執行緒池，不佔用請求執行緒池
+model_pool = InferencePool(
+    "model",
+    max_workers=int(os.getenv("MODEL_WORKERS", "2")),
+    max_pending=int(os.getenv("MODEL_MAX_PENDING", "32")),
+    timeout=float(os.getenv("MODEL_TIMEOUT", "30")),
+)
+search_pool = InferencePool(
+    "search",
+    max_workers=int(os.getenv("SEARCH_WORKERS", "4")),
+    max_pending=int(os.getenv("SEARCH_MAX_PENDING", "64")),
+    timeout=float(os.getenv("SEARCH_TIMEOUT", "10")),
+)
+# /transcribe 的微批次排程：最多湊 ASR_MAX_BATCH 筆或等 ASR_MAX_WAIT_MS 毫秒，
+# 批次經由 model_pool.run 執行（受 MODEL_MAX_PENDING 限制）；等待湊批的請求超過 ASR_MAX_QUEUE 時回 503
+asr_batcher = MicroBatcher(
+    transcribe_batch,
+    max_batch_size=int(os.getenv("ASR_MAX_BATCH", "8")),
+    max_wait_ms=float(os.getenv("ASR_MAX_WAIT_MS", "10")),
+    pool=model_pool,
+    max_queue=int(os.getenv("ASR_MAX_QUEUE", "64")),
+)
+# 上傳音訊大小上限（bytes），超過回 413
+ASR_MAX_UPLOAD_BYTES = int(os.getenv("ASR_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# LLM 決策快取：key 為正規化後的 prompt（scored 模式再加上局面）
+decision_cache = LRUCache(int(os.getenv("LLM_CACHE_SIZE", "4096")))
+decision_stats = {"rule": 0, "model": 0}
+# 多個 worker（uvicorn --workers N 或多個容器）共用遊戲狀態時設定 SHARED_STATE_PATH：
+# 每次落子以版本做 compare-and-swap 寫入共用的 SQLite，被其他 worker 搶先改動時回 409
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+shared_state = SQLiteSharedState(SHARED_STATE_PATH) if SHARED_STATE_PATH else None
+# 單一 worker 時設定 GAME_DB_PATH 把每局快照寫入 SQLite（背景批次寫入），記憶體中沒有的局會延遲載入
+GAME_DB_PATH = os.getenv("GAME_DB_PATH", "")
+game_repo = SQLiteGameRepository(GAME_DB_PATH) if GAME_DB_PATH and shared_state is None else None
+# 走法紀錄（預設關閉，設定 MOVE_LOG_PATH 才寫入）；以 python -m app.core.movelog 重播或統計
+MOVE_LOG_PATH = os.getenv("MOVE_LOG_PATH", "")
+move_log = MoveLog(MOVE_LOG_PATH) if MOVE_LOG_PATH else None
+
+def _record_created(game_id, board):
+    # 同一個 id 重新建立棋盤（例如被淘汰後再次使用）時記一筆 reset，重播才會從新棋盤開始
+    if move_log is not None:
+        move_log.append(game_id, board.version, "reset", "X")
 
-app = FastAPI()
-board = Board()
+store = GameStore(
+    max_games=int(os.getenv("GAME_STORE_MAX_GAMES", "200000")),
+    ttl=float(os.getenv("GAME_STORE_TTL", "3600")),
+    loader=game_repo.load if game_repo else None,
+    saver=game_repo.save if game_repo else None,
+    shared=shared_state,
+    on_create=_record_created,
+)
+# 每局的 WebSocket 訂閱者；任何端點改動棋盤後推送差異
+events = GameEvents(queue_size=int(os.getenv("WS_QUEUE_SIZE", "64")))
+# GET /games/{game_id}?wait_for_version=N 長輪詢的最長等待秒數
+LONG_POLL_MAX_TIMEOUT = float(os.getenv("LONG_POLL_MAX_TIMEOUT", "60"))
+# 語音合成：TTS_BACKEND 選後端（gtts / stub），音訊以內容定址快取在記憶體與 TTS_CACHE_DIR（空字串則只用記憶體）
+tts_cache = TTSCache(
+    get_backend(os.getenv("TTS_BACKEND", "gtts")),
+    directory=os.getenv("TTS_CACHE_DIR", "data/tts"),
+    voice=os.getenv("TTS_VOICE", "zh-TW"),
+    max_items=int(os.getenv("TTS_CACHE_SIZE", "1024")),
+)
+
+# /games/{game_id}/hint 的分析快取：以 8 種對稱下的標準形為 key，所有遊戲共用
+hint_analyzer = PositionAnalyzer(
+    maxsize=int(os.getenv("HINT_CACHE_SIZE", "65536")),
+    time_ms=float(os.getenv("HINT_TIME_MS", "200")),
+    table_fn=get_perfect_table,
+)
+
+# 抓取 /metrics 時才讀取的即時狀態
+REGISTRY.gauge_func("games_in_memory", "Games currently held in memory", lambda: len(store))
+REGISTRY.gauge_func("games_evicted", "Games evicted from memory since start (LRU / TTL)", lambda: store.evicted)
+REGISTRY.gauge_func("ws_subscribers", "Open WebSocket game subscriptions", lambda: events.subscribers())
+REGISTRY.gauge_func("asr_queue_depth", "Requests waiting in the ASR micro-batcher",
+                    lambda: asr_batcher.stats()["queue_depth"])
+REGISTRY.gauge_func("llm_decisions", "LLM decisions by source since start",
+                    lambda: {("rule",): decision_stats["rule"], ("model",): decision_stats["model"],
+                             ("cache",): decision_cache.stats()["hits"]}, ("source",))
+REGISTRY.gauge_func("inference_pending", "Jobs queued or running per inference pool",
+                    lambda: {(pool.name,): pool.stats()["pending"] for pool in (model_pool, search_pool)}, ("pool",))
+REGISTRY.gauge_func("hint_cache", "Hint analysis cache lookups by outcome",
+                    lambda: {("hit",): hint_analyzer.stats()["hits"], ("miss",): hint_analyzer.stats()["misses"]},
+                    ("outcome",))
+REGISTRY.gauge_func("tts_synthesized", "Messages synthesized by the TTS backend since start",
+                    lambda: tts_cache.stats()["synthesized"])
+if move_log is not None:
+    REGISTRY.gauge_func("move_log_pending", "Move log records not yet written", lambda: move_log.stats()["pending"])
+if shared_state is not None:
+    REGISTRY.gauge_func("shared_state_conflicts", "Compare-and-swap writes rejected because another worker moved first",
+                        lambda: shared_state.stats()["conflicts"])
+if game_repo is not None:
+    REGISTRY.gauge_func("game_db_pending", "Game snapshots waiting for the SQLite writer",
+                        lambda: game_repo.stats()["pending"])
 
 class GameIn(BaseModel):
     player: str
     action: str  # "place" or "move"
     pos: str = None
     from_pos: str = None
+    game_id: str = DEFAULT_GAME_ID
 
 class AIMoveIn(BaseModel):
     player: str
+    game_id: str = DEFAULT_GAME_ID
+    strategy: str = "random"  # "random"、"perfect"、"alphabeta" 或 "mcts"
+    time_ms: float = Field(200, gt=0, le=5000)             # 搜尋式策略每步的時間上限
+    max_nodes: int = Field(200_000, gt=0, le=5_000_000)  # 搜尋式策略每步的節點數上限
+
+class AIBatchIn(BaseModel):
+    game_ids: List[str]
+    player: Optional[Literal["X", "O", "x", "o"]] = None  # 預設為各局目前輪到的一方
+    strategy: str = "random"
+    time_ms: float = Field(200, gt=0, le=5000)
+    max_nodes: int = Field(200_000, gt=0, le=5_000_000)
 
 class LLMIn(BaseModel):
     prompt: str
+    game_id: str = DEFAULT_GAME_ID
+    player: str = None      # 預設為該局目前輪到的一方
+    mode: str = "scored"    # "scored"：只替合法動作打分；"generate"：舊的自由生成
 
 class GameMoveIn(BaseModel):
     player: str
     position: str
 
+class BatchMove(BaseModel):
+    player: str
+    action: Literal["place", "move"] = "place"
+    pos: str
+    from_pos: str = None   # action 為 move 時必填（在 game_moves 中檢查）
+
+class BatchMovesIn(BaseModel):
+    moves: List[BatchMove]
+
+# 一次批次最多幾步，避免單一請求長時間持有該局的鎖
+BATCH_MAX_MOVES = int(os.getenv("BATCH_MAX_MOVES", "256"))
+# /ai_move/batch 一次最多幾局
+AI_BATCH_MAX_GAMES = int(os.getenv("AI_BATCH_MAX_GAMES", "1024"))
+# /ai_move/batch 整批搜尋的時間上限（毫秒），避免單一請求長時間佔住搜尋執行緒；超過的局回 504
+AI_BATCH_MAX_MS = float(os.getenv("AI_BATCH_MAX_MS", "5000"))
+
+def _speech_text(message):
+    # 成功落子時 message 是整個棋盤狀態（或它的字串），改念固定短句，讓同一句話共用快取
+    if isinstance(message, dict) or str(message).startswith("{"):
+        return "已落子"
+    return str(message)
+
 def _maybe_tts(text: str):
-    # Dummy TTS function that returns base64 encoded dummy audio data
-    # Replace with actual TTS implementation
-    audio_bytes = text.encode("utf-8")
-    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-    return audio_b64
+    # 只註冊文字、不合成；音訊在第一次 GET /tts/{key} 時才合成並快取
+    key = tts_cache.register(text)
+    return {"url": f"/tts/{key}", "etag": key}
 
 def _common_payload(success, message, board, winner, turn):
     return {
@@ -49,12 +221,27 @@ def _common_payload(success, message, board, winner, turn):
         "game_over": board.game_over, # 保留原本的 key，避免破壞其他地方
     }
 
-def _apply_action(player: str, action: str, pos: str = None, from_pos: str = None):
+# _guarded 區塊內產生的走法紀錄先放這裡，session 寫入成功（共用狀態 CAS 通過）後才寫進 move_log
+_pending_records = contextvars.ContextVar("pending_records", default=None)
+
+def _record(game_id, board, version, action, player, from_pos=None, to_pos=None):
+    # 棋盤版本有變才代表動作被接受，寫入走法紀錄
+    if move_log is not None and game_id is not None and board.version != version:
+        record = (game_id, board.version, action, player, from_pos, to_pos)
+        pending = _pending_records.get()
+        if pending is None:
+            move_log.append(*record)
+        else:
+            pending.append(record)
+
+def _apply_action(board, player: str, action: str, pos: str = None, from_pos: str = None, game_id: str = None):
     player = player.upper()
+    version = board.version
     if action == "place":
         if not TEST_MODE and player != board.turn:
             raise HTTPException(status_code=400, detail="Not your turn")
-        success, msg = board.place_piece(pos, player)
+        with BOARD_LATENCY.time("place_piece"):
+            success, msg = board.place_piece(pos, player)
         # === 只針對「已經有棋子」才丟 400，其餘錯誤訊息直接回傳 ===
         if not success and msg == "已經有棋子":
             raise HTTPException(status_code=400, detail="Position already occupied")
@@ -65,35 +252,177 @@ def _apply_action(player: str, action: str, pos: str = None, from_pos: str = Non
             raise HTTPException(status_code=400, detail="You must place pieces before moving")
         if not from_pos or not pos:
             raise HTTPException(status_code=400, detail="Move requires from_pos and pos")
-        success, msg = board.move_piece(pos, player, from_pos)
+        with BOARD_LATENCY.time("move_piece"):
+            success, msg = board.move_piece(pos, player, from_pos)
     else:
         raise HTTPException(status_code=400, detail="Invalid action, must be place or move")
+    _record(game_id, board, version, action, player, from_pos if action == "move" else None, pos)
 
-    # 確保 winner 狀態即時更新
-    board.is_winner("X")
-    board.is_winner("O")
-    board.check_game_over()
+    # place_piece / move_piece 已增量更新勝負，這裡只讀結果
     # === 新增：和局檢查 ===
     if board.game_over and board.winner is None:
         board.winner = None  # 明確標記為和局
         return True, "draw"
     return success, msg
 
+@contextmanager
+def _broadcast(game_id, board):
+    # 區塊結束時若棋盤版本有變，把差異推送給該局的 WebSocket 訂閱者（沒人訂閱時不做事）
+    if not events.subscribers(game_id):
+        yield
+        return
+    version, cells = board.version, board.cells()
+    try:
+        yield
+    finally:
+        if board.version != version:
+            events.publish(game_id, board_delta(game_id, cells, board))
+
+def _snapshot(game_id: str, create: bool = False):
+    # 在鎖內複製一份棋盤，耗時的搜尋 / 推論在副本上進行，不持有該局的鎖
+    with _open_game(game_id, create) as board:
+        return Board.from_dict(board.to_dict())
+
+async def _offload(pool, fn, *args, timeout=None):
+    # 交給專用執行緒池；池滿回 503，逾時回 504
+    try:
+        return await pool.run(fn, *args, timeout=timeout)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+def _ai_choice(board, player: str, strategy: str, time_ms: float, max_nodes: int):
+    # 只讀取 board，回傳 (from_pos, to_pos, msg, info)
+    try:
+        with BOARD_LATENCY.time(f"ai_move.{strategy}" if strategy in STRATEGIES else "ai_move.unknown"):
+            return ai_move_with_info(board, player, strategy, time_ms, max_nodes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _ai_search(game_id: str, player: str, strategy: str, time_ms: float, max_nodes: int, create=False):
+    """
+    在 search_pool 中對棋盤副本搜尋；回傳 (搜尋時的棋盤版本, 搜尋結果)
+    逾時上限為策略本身的時間預算再加上 SEARCH_TIMEOUT
+    """
+    snapshot = await run_in_threadpool(_snapshot, game_id, create)
+    choice = await _offload(search_pool, _ai_choice, snapshot, player, strategy, time_ms, max_nodes,
+                            timeout=time_ms / 1000 + search_pool.timeout)
+    return snapshot.version, choice
+
+def _apply_ai(board, player: str, version: int, choice, game_id: str = None):
+    # 在鎖內套用 _ai_search 的結果；搜尋期間棋盤已被改動時回 409，回傳 (success, state)
+    if board.version != version:
+        raise HTTPException(status_code=409, detail="棋盤在 AI 思考時已變動，請重試")
+    from_pos, to_pos, msg, info = choice
+    success, state = (False, "AI 沒有動作")
+    try:
+        if from_pos is None:
+            success, state = board.place_piece(to_pos, player)
+        else:
+            if not ALLOW_MOVE_ANYTIME and len(board.pieces[player]) < board.max_pieces:
+                raise HTTPException(status_code=400, detail="目前只能下子，還不能移動棋子")
+            success, state = board.move_piece(to_pos, player, from_pos)
+    except Exception:
+        raise HTTPException(status_code=400, detail="AI 回傳非法位置")
+    _record(game_id, board, version, "place" if from_pos is None else "move", player, from_pos, to_pos)
+    return success, state
+
 def _speak_and_attach(payload):
     if payload.get("message"):
-        payload["tts"] = _maybe_tts(payload["message"])
+        payload["tts"] = _maybe_tts(_speech_text(payload["message"]))
     return payload
 
+# 精簡模式下由 state 取代的棋盤相關欄位
+_STATE_KEYS = {"board", "board_str", "winner", "turn", "next_player", "is_over", "game_over"}
+
+def _response_options(request: Request):
+    # ?compact=1 或 X-Response-Mode: compact 開啟精簡模式；?omit=board_str,tts 省略指定欄位
+    compact = request.query_params.get("compact", "").lower() in ("1", "true", "yes") \
+        or request.headers.get("x-response-mode", "").lower() == "compact"
+    omit = {key.strip() for key in request.query_params.get("omit", "").split(",") if key.strip()}
+    return compact, omit
+
+def _respond(request: Request, payload, board, status_code=200, speak=True):
+    """
+    依請求選項輸出回應：
+      - 預設：與原本相同的完整 payload（可用 omit 省略欄位，省略 tts 時也不會做 TTS）
+      - 精簡：{"success", "message", ..., "state": {...}}，state 直接拼接該版本快取好的 bytes
+    需在持有該局鎖時呼叫，確保 state 與 payload 是同一版本
+    """
+    compact, omit = _response_options(request)
+    if speak and "tts" not in omit:
+        _speak_and_attach(payload)
+    if not compact:
+        for key in omit:
+            payload.pop(key, None)
+        return JSONResponse(content=payload, status_code=status_code)
+    extra = {k: v for k, v in payload.items() if k not in _STATE_KEYS and k not in omit}
+    if isinstance(extra.get("message"), dict):
+        extra.pop("message")  # 成功時 message 是整個棋盤狀態，與 state 重複
+    head = json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    body = head[:-1] + (b',"state":' if extra else b'"state":') + board.render_compact() + b"}"
+    return Response(content=body, media_type="application/json", status_code=status_code)
+
 @app.get("/")
 def root():
     return JSONResponse(content={"message": "TicTacToe API is running"})
 
+@app.get("/metrics")
+def metrics():
+    # Prometheus 文字格式
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/healthz")
+def healthz():
+    # liveness：行程活著就回 200，不等模型
+    return JSONResponse(content={"status": "ok"})
+
+@app.get("/readyz")
+def readyz():
+    # readiness：回報各模型狀態；模型尚未就緒時回 503（遊戲端點仍可正常使用）
+    ready = all_ready()
+    return JSONResponse(
+        content={"ready": ready, "models": models_status()},
+        status_code=200 if ready else 503,
+    )
+
+def _open_game(game_id: str, create: bool = False):
+    # 取得該局（with 區塊內持有該局的鎖）；找不到時立即回 404
+    try:
+        return _guarded(game_id, store.session(game_id, create))
+    except GameNotFound:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+@contextmanager
+def _guarded(game_id: str, session):
+    # 共用狀態的 compare-and-swap 失敗（被其他 worker 搶先改動）時回 409；
+    # 區塊內的走法紀錄等 session 寫入成功後才送出，被丟棄的改動不會留在紀錄裡
+    records = []
+    token = _pending_records.set(records)
+    try:
+        with session as board:
+            yield board
+    except VersionConflict:
+        records.clear()
+        events.publish(game_id, {"type": "resync", "game_id": game_id})  # 已推送的差異作廢
+        raise HTTPException(status_code=409, detail="這一局已被其他請求改動，請重新讀取後再試")
+    finally:
+        _pending_records.reset(token)
+        if move_log is not None:
+            for record in records:
+                move_log.append(*record)
+
 @app.post("/game")
-def game(game_in: GameIn):
+def game(game_in: GameIn, request: Request):
     try:
-        success, msg = _apply_action(game_in.player, game_in.action, game_in.pos, game_in.from_pos)
-        payload = _common_payload(success, msg, board, board.winner, board.turn)
-        return JSONResponse(content=_speak_and_attach(payload))
+        with _open_game(game_in.game_id, create=True) as board, _broadcast(game_in.game_id, board):
+            success, msg = _apply_action(board, game_in.player, game_in.action, game_in.pos, game_in.from_pos,
+                                         game_id=game_in.game_id)
+            payload = _common_payload(success, msg, board, board.winner, board.turn)
+            return _respond(request, payload, board)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -101,22 +430,23 @@ def game(game_in: GameIn):
         raise HTTPException(status_code=500, detail="伺服器內部錯誤，請稍後再試")
 
 @app.post("/reset")
-def reset():
-    global board
-    board.reset()
-    payload = _common_payload(True, "遊戲已重置", board, board.winner, board.turn)
-    # 確保 message 是字串
-    payload["message"] = "遊戲已重置"
-    return JSONResponse(content=_speak_and_attach(payload))
+def reset(request: Request, game_id: str = DEFAULT_GAME_ID):
+    with _open_game(game_id, create=True) as board, _broadcast(game_id, board):
+        version = board.version
+        board.reset()
+        _record(game_id, board, version, "reset", "X")
+        payload = _common_payload(True, "遊戲已重置", board, board.winner, board.turn)
+        # 確保 message 是字串
+        payload["message"] = "遊戲已重置"
+        return _respond(request, payload, board)
 
 
 # 建立新遊戲端點
 @app.post("/games", status_code=status.HTTP_201_CREATED)
 def create_game():
-    global board
-    board.reset()
+    game_id, board = store.create()
     return {
-        "game_id": "dummy",  # 測試用的固定 ID
+        "game_id": game_id,
         "board": board.render(),
         "turn": board.turn,
         "message": "新遊戲建立成功"
@@ -125,70 +455,568 @@ def create_game():
 
 # 新增遊戲行動端點
 @app.post("/games/{game_id}/move")
-def game_move(game_id: str, data: GameMoveIn):
+def game_move(game_id: str, data: GameMoveIn, request: Request):
     player = data.player
     pos = data.position
 
     if not player or not pos:
         raise HTTPException(status_code=400, detail="Missing required field: player or position")
 
-    success, msg = _apply_action(player, "place", pos)
+    with _open_game(game_id) as board, _broadcast(game_id, board):
+        success, msg = _apply_action(board, player, "place", pos, game_id=game_id)
+        payload = _common_payload(success, msg, board, board.winner, board.turn)
+        payload["game_id"] = game_id
+        payload["message"] = str(msg)
+
+        # 只要和局就直接回傳 200
+        if msg == "draw":
+            payload["is_over"] = True
+            payload["winner"] = None
+            payload["message"] = "draw"
+            return _respond(request, payload, board)
 
-    payload = _common_payload(success, msg, board, board.winner, board.turn)
-    payload["game_id"] = game_id
-    payload["message"] = str(msg)
+        if not success:
+            raise HTTPException(status_code=400, detail=str(msg))
 
-    # 只要和局就直接回傳 200
-    if msg == "draw":
-        payload["is_over"] = True
-        payload["winner"] = None
-        payload["message"] = "draw"
-        return JSONResponse(content=_speak_and_attach(payload), status_code=200)
+        return _respond(request, payload, board)
 
-    if not success:
-        raise HTTPException(status_code=400, detail=str(msg))
+@app.post("/games/{game_id}/moves")
+def game_moves(game_id: str, data: BatchMovesIn):
+    """
+    依序套用多步（規則同 _apply_action），整批在同一把鎖內完成，中間不會插入其他請求的動作。
+    遇到第一個被拒絕的動作就停下，之前的步數保留；只回傳最終狀態與被拒絕的索引，不做 TTS
+    """
+    if len(data.moves) > BATCH_MAX_MOVES:
+        raise HTTPException(status_code=400, detail=f"一次最多 {BATCH_MAX_MOVES} 步")
+    # 格式錯誤在套用任何一步之前就整批拒絕
+    missing = [{"loc": ["body", "moves", index, "from_pos"], "msg": "move 需要 from_pos", "type": "missing"}
+               for index, move in enumerate(data.moves) if move.action == "move" and not move.from_pos]
+    if missing:
+        raise HTTPException(status_code=422, detail=missing)
+    applied, rejected, error = 0, None, None
+    with _open_game(game_id) as board, _broadcast(game_id, board):
+        for index, move in enumerate(data.moves):
+            try:
+                success, msg = _apply_action(board, move.player, move.action, move.pos, move.from_pos, game_id)
+            except HTTPException as e:
+                success, msg = False, e.detail
+            except Exception as e:
+                # 非預期的錯誤也只讓這一步被拒絕，之前套用的步數照常回報
+                success, msg = False, f"無效的動作: {e}"
+            if not success:
+                rejected, error = index, str(msg)
+                break
+            applied += 1
+        head = json.dumps({"game_id": game_id, "applied": applied, "rejected": rejected, "error": error},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        body = head[:-1] + b',"state":' + board.render_compact() + b"}"
+    return Response(content=body, media_type="application/json")
+
+def _etag(board):
+    # 同一版本的各種表示（完整 / 精簡 / omit）內容等價，用弱 ETag；
+    # 加上棋盤的 nonce，同一個 id 重新建立後版本重來也不會誤回 304
+    return f'W/"{board.nonce}-{board.version}"'
+
+def _not_modified(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def _game_version(game_id: str):
+    with _open_game(game_id) as board:
+        return board.version
+
+async def _wait_for_version(game_id: str, version: int, timeout: float):
+    """
+    掛在該局的事件訂閱上，直到棋盤版本 >= version 或逾時；回傳最後看到的版本
+    先訂閱再讀版本：之後的改動一定會推送過來，不會漏接
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    sub = events.subscribe(game_id)
+    try:
+        current = await run_in_threadpool(_game_version, game_id)
+        while current < version:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            if shared_state is not None:
+                remaining = min(remaining, 1.0)  # 其他 worker 的改動不會推送到這裡，定期重讀
+            try:
+                event = await asyncio.wait_for(sub.get(), remaining)
+            except asyncio.TimeoutError:
+                if shared_state is None:
+                    break
+                event = {"type": "resync"}
+            if event["type"] == "delta":
+                current = event["version"]
+            else:
+                current = await run_in_threadpool(_game_version, game_id)
+        return current
+    finally:
+        events.unsubscribe(sub)
 
-    return JSONResponse(content=_speak_and_attach(payload), status_code=200)
+def _game_state(game_id: str, request: Request):
+    # 表示方式可由 X-Response-Mode 切換，快取必須依這個標頭區分
+    headers = {"Vary": "X-Response-Mode"}
+    with _open_game(game_id) as board:
+        etag = _etag(board)
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, **headers})
+        payload = _common_payload(True, "Game state fetched", board, board.winner, board.turn)
+        payload["game_id"] = game_id
+        response = _respond(request, payload, board, speak=False)
+    response.headers.update({"ETag": etag, **headers})
+    return response
 
 @app.get("/games/{game_id}")
-def get_game(game_id: str):
-    payload = _common_payload(True, "Game state fetched", board, board.winner, board.turn)
-    payload["game_id"] = game_id
-    return JSONResponse(content=payload, status_code=200)
+async def get_game(game_id: str, request: Request, wait_for_version: int = None,
+                   timeout: float = Query(30, gt=0)):
+    """
+    回應帶 ETag（棋盤實體 + 版本）；If-None-Match 相符時回 304、沒有 body
+    ?wait_for_version=N&timeout=秒：版本還沒到 N 時等到下一步（最多 timeout 秒）；
+    逾時後照一般規則回應（If-None-Match 仍相符才回 304，否則回 200 與目前狀態）
+    """
+    if wait_for_version is not None:
+        await _wait_for_version(game_id, wait_for_version, min(timeout, LONG_POLL_MAX_TIMEOUT))
+    return await run_in_threadpool(_game_state, game_id, request)
+
+@app.get("/games/{game_id}/hint")
+async def game_hint(game_id: str, player: str = None):
+    """
+    評估目前局面每個合法動作的結果（win / loss / draw 與步數），最佳的排在最前面
+    快取命中時直接回傳；否則在 search_pool 中查完美對弈表或搜尋
+    """
+    snapshot = await run_in_threadpool(_snapshot, game_id)
+    player = (player or snapshot.turn).upper()
+    if player not in ("X", "O"):
+        raise HTTPException(status_code=400, detail="player must be X or O")
+    payload = {"game_id": game_id, "player": player, "version": snapshot.version}
+    if snapshot.game_over:
+        return JSONResponse(content={**payload, "over": True, "moves": []})
+    hint = hint_analyzer.lookup(snapshot, player)
+    if hint is None:
+        hint = await _offload(search_pool, hint_analyzer.compute, snapshot, player,
+                              timeout=hint_analyzer.time_ms / 1000 + search_pool.timeout)
+    return JSONResponse(content={**payload, "over": False, **hint})
+
+@app.get("/hint/stats")
+def hint_stats():
+    return JSONResponse(content=hint_analyzer.stats())
+
+def _commit_ai_move(data: AIMoveIn, player: str, version: int, choice, request: Request):
+    with _open_game(data.game_id) as board, _broadcast(data.game_id, board):
+        success, _ = _apply_ai(board, player, version, choice, data.game_id)
+        payload = _common_payload(success, "AI已落子", board, board.winner, board.turn)
+        payload["msg"] = choice[2]  # 保持舊鍵名
+        payload["search"] = choice[3]
+        return _respond(request, payload, board)
 
 @app.post("/ai_move")
-def ai_move_endpoint(data: AIMoveIn):
+async def ai_move_endpoint(data: AIMoveIn, request: Request):
     player = data.player.upper()
-    from_pos, to_pos, msg = ai_move(board, player)
-    success, state = (False, "AI 沒有動作")
+    version, choice = await _ai_search(data.game_id, player, data.strategy, data.time_ms, data.max_nodes, create=True)
+    return await run_in_threadpool(_commit_ai_move, data, player, version, choice, request)
+
+def _batch_snapshots(game_ids):
+    # 逐局複製棋盤；找不到的局不放進結果，由呼叫端回報 404
+    snapshots = {}
+    for game_id in game_ids:
+        try:
+            snapshots[game_id] = _snapshot(game_id)
+        except HTTPException:
+            pass
+    return snapshots
+
+def _ai_batch_choice(boards, players, strategy: str, time_ms: float, max_nodes: int):
     try:
-        if from_pos is None:
-            success, state = board.place_piece(to_pos, player)
-        else:
-            if not ALLOW_MOVE_ANYTIME and len(board.pieces[player]) < board.max_pieces:
-                raise HTTPException(status_code=400, detail="目前只能下子，還不能移動棋子")
-            success, state = board.move_piece(to_pos, player, from_pos)
-        # 確保 winner 狀態即時更新
-        board.is_winner("X")
-        board.is_winner("O")
-        board.check_game_over()
-    except Exception:
-        raise HTTPException(status_code=400, detail="AI 回傳非法位置")
-    payload = _common_payload(success, "AI已落子", board, board.winner, board.turn)
-    payload["msg"] = msg  # 保持舊鍵名
-    return JSONResponse(content=_speak_and_attach(payload))
-
-@app.post("/transcribe")
-async def transcribe(file: UploadFile = File(...)):
-    file_path = f"/tmp/{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    text = transcribe_audio(file_path)
+        with BOARD_LATENCY.time(f"ai_move_batch.{strategy}" if strategy in STRATEGIES else "ai_move_batch.unknown"):
+            return ai_moves_batch(boards, players, strategy, time_ms, max_nodes, max_total_ms=AI_BATCH_MAX_MS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _commit_ai_batch(game_ids, snapshots, players, choices):
+    # 逐局在各自的鎖內套用；單局失敗（棋盤已變動、非法位置、找不到）只影響該局的結果
+    results, picks = [], dict(zip(snapshots, zip(players, choices)))
+    for game_id in game_ids:
+        if game_id not in picks:
+            results.append({"game_id": game_id, "success": False, "status": 404, "error": "Game not found"})
+            continue
+        player, choice = picks[game_id]
+        if choice[3].get("timed_out"):
+            results.append({"game_id": game_id, "success": False, "status": 504, "error": choice[2]})
+            continue
+        try:
+            with _open_game(game_id) as board, _broadcast(game_id, board):
+                success, state = _apply_ai(board, player, snapshots[game_id].version, choice, game_id)
+                result = {
+                    "game_id": game_id, "success": success, "player": player,
+                    "from_pos": choice[0], "pos": choice[1], "msg": choice[2] if success else str(state),
+                    "cells": board.cells(), "turn": board.turn, "winner": board.winner,
+                    "over": board.game_over, "version": board.version,
+                }
+        except HTTPException as e:
+            result = {"game_id": game_id, "success": False, "status": e.status_code, "error": e.detail}
+        results.append(result)
+    return results
+
+@app.post("/ai_move/batch")
+async def ai_move_batch_endpoint(data: AIBatchIn):
+    """
+    一次替多局選步並套用：棋盤副本一起送進 ai_moves_batch（random 以 NumPy 一次抽完，
+    其他策略相同局面只算一次），再逐局以版本比對後落子；回傳每局的結果。
+    整批搜尋超過 AI_BATCH_MAX_MS 時，已算出的局照常落子，其餘的局回 status 504
+    """
+    game_ids = list(dict.fromkeys(data.game_ids))  # 去除重複，同一局一次只下一步
+    if len(game_ids) > AI_BATCH_MAX_GAMES:
+        raise HTTPException(status_code=400, detail=f"一次最多 {AI_BATCH_MAX_GAMES} 局")
+    snapshots = await run_in_threadpool(_batch_snapshots, game_ids)
+    boards = list(snapshots.values())
+    players = [(data.player or board.turn).upper() for board in boards]
+    choices = []
+    if boards:
+        budget = 0 if data.strategy == "random" else min(len(boards) * data.time_ms, AI_BATCH_MAX_MS) / 1000
+        choices = await _offload(search_pool, _ai_batch_choice, boards, players, data.strategy,
+                                 data.time_ms, data.max_nodes, timeout=budget + search_pool.timeout)
+    results = await run_in_threadpool(_commit_ai_batch, game_ids, snapshots, players, choices)
+    batch = choices[0][3]["batch"] if choices else {"size": 0, "unique": 0, "timed_out": 0, "time_ms": 0.0}
+    return JSONResponse(content={"results": results, "batch": batch})
+
+def _ws_validate(model, game_id: str, command: dict):
+    try:
+        return model(**dict(command, game_id=game_id))
+    except ValidationError as e:
+        # 只留 loc / msg / type：pydantic 1.x 與 2.x 都有，也一定能轉成 JSON（2.x 的 ctx 可能含例外物件）
+        detail = [{key: err[key] for key in ("loc", "msg", "type")} for err in e.errors()]
+        raise HTTPException(status_code=422, detail=detail)
+
+def _ws_place_or_move(game_id: str, command: dict):
+    # 在執行緒池中執行；成功時差異由 _broadcast 推送給所有訂閱者（包含發送者）
+    data = _ws_validate(GameIn, game_id, command)
+    with _open_game(game_id) as board, _broadcast(game_id, board):
+        success, msg = _apply_action(board, data.player, data.action, data.pos, data.from_pos, game_id)
+    if not success:
+        raise HTTPException(status_code=400, detail=str(msg))
+
+def _ws_commit_ai(game_id: str, player: str, version: int, choice):
+    with _open_game(game_id) as board, _broadcast(game_id, board):
+        success, state = _apply_ai(board, player, version, choice, game_id)
+    if not success:
+        raise HTTPException(status_code=400, detail=str(state))
+
+async def _ws_command(game_id: str, command: dict):
+    """
+    執行 WebSocket 收到的一個指令：
+      {"action": "place", "player": "X", "pos": "a1"}
+      {"action": "move", "player": "X", "from_pos": "a1", "pos": "b2"}
+      {"action": "ai", "player": "O", "strategy": "alphabeta", "time_ms": 100}
+    失敗時丟 HTTPException
+    """
+    if command.get("action") != "ai":
+        await run_in_threadpool(_ws_place_or_move, game_id, command)
+        return
+    data = _ws_validate(AIMoveIn, game_id, command)
+    player = data.player.upper()
+    version, choice = await _ai_search(game_id, player, data.strategy, data.time_ms, data.max_nodes)
+    await run_in_threadpool(_ws_commit_ai, game_id, player, version, choice)
+
+def _ws_snapshot(game_id: str):
+    # 在執行緒池中執行：可能要從 SQLite 載入，也可能因該局已被淘汰而丟 404
+    with _open_game(game_id) as board:
+        return dict(json.loads(board.render_compact()), type="state", game_id=game_id)
+
+async def _ws_sender(websocket: WebSocket, game_id: str, sub):
+    # 先送一次完整狀態，之後只送差異；早於快照版本的差異直接略過
+    # 重新同步時該局已不存在（例如被淘汰）：送出錯誤訊框後關閉連線，不讓連線默默失效
+    try:
+        snapshot = await run_in_threadpool(_ws_snapshot, game_id)
+        await websocket.send_json(snapshot)
+        while True:
+            event = await sub.get()
+            if event.get("version", snapshot["version"] + 1) <= snapshot["version"]:
+                continue
+            if event["type"] == "resync":
+                snapshot = await run_in_threadpool(_ws_snapshot, game_id)
+                event = snapshot
+            await websocket.send_json(event)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+        await websocket.close(code=4404 if e.status_code == 404 else 1011, reason=str(e.detail))
+
+@app.websocket("/games/{game_id}/ws")
+async def game_ws(websocket: WebSocket, game_id: str):
+    await websocket.accept()
+    try:
+        await run_in_threadpool(_open_game, game_id)  # 記憶體中沒有時會從 SQLite 載入
+    except HTTPException:
+        await websocket.close(code=4404, reason="Game not found")
+        return
+    sub = events.subscribe(game_id)
+    sender = asyncio.create_task(_ws_sender(websocket, game_id, sub))
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                command = json.loads(text)
+                if not isinstance(command, dict):
+                    raise ValueError("command must be a JSON object")
+                await _ws_command(game_id, command)
+            except HTTPException as e:
+                sub.offer({"type": "error", "status": e.status_code, "detail": e.detail})
+            except ValueError as e:
+                sub.offer({"type": "error", "status": 400, "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        events.unsubscribe(sub)
+
+async def _read_audio(request: Request):
+    # multipart 上傳或直接以 audio/* 當 body 上傳皆可；都從 request.stream() 逐塊讀取並限制大小。
+    # 端點不宣告 File(...)，FastAPI 不會先把整份表單收完（大檔還會寫到暫存檔）才進到這裡
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > ASR_MAX_UPLOAD_BYTES + CHUNK_SIZE:
+        raise UploadTooLarge(f"音訊超過 {ASR_MAX_UPLOAD_BYTES} bytes 上限")  # 不必讀 body 就先拒絕
+    content_type = request.headers.get("content-type", "")
+    if content_type.lower().startswith("multipart/form-data"):
+        return await read_multipart_file(request.stream(), content_type, ASR_MAX_UPLOAD_BYTES)
+    return await read_limited(request.stream(), ASR_MAX_UPLOAD_BYTES)
+
+def _voice_commit(game_id: str, player, command):
+    # 在執行緒池中於鎖內套用語音指令；player 未指定時為該局目前輪到的一方
+    action, from_pos, to_pos = command
+    with _open_game(game_id) as board, _broadcast(game_id, board):
+        player = (player or board.turn).upper()
+        success, msg = _apply_action(board, player, action, to_pos, from_pos, game_id)
+        return {"type": "command", "action": action, "from_pos": from_pos, "pos": to_pos, "player": player,
+                "success": bool(success), "message": msg if isinstance(msg, str) else "ok",
+                "turn": board.turn, "winner": board.winner, "version": board.version}
+
+# 語音串流可用的音訊格式與取樣率上限
+VOICE_FORMATS = ("pcm16", "f32")
+VOICE_MAX_SAMPLE_RATE = 192_000
+
+def _voice_config(config: dict, control: dict):
+    # 套用控制訊息中的設定，回傳新的設定；格式或取樣率不合法時丟 ValueError，原設定不變
+    config = dict(config, **{key: control[key] for key in ("player", "sample_rate", "format") if key in control})
+    config["sample_rate"] = int(config["sample_rate"])
+    if not 0 < config["sample_rate"] <= VOICE_MAX_SAMPLE_RATE:
+        raise ValueError(f"sample_rate 必須介於 1 與 {VOICE_MAX_SAMPLE_RATE} 之間")
+    if config["format"] not in VOICE_FORMATS:
+        raise ValueError(f"不支援的音訊格式: {config['format']}（可用：{', '.join(VOICE_FORMATS)}）")
+    return config
+
+def _pcm_samples(data: bytes, fmt: str, sample_rate: int):
+    # 二進位訊框 → 16 kHz float32；pcm16 為 little-endian int16，f32 為 float32
+    if fmt not in VOICE_FORMATS or not 0 < sample_rate <= VOICE_MAX_SAMPLE_RATE:
+        raise ValueError(f"無效的音訊設定: format={fmt}, sample_rate={sample_rate}")
+    if fmt == "f32":
+        samples = np.frombuffer(data, dtype="<f4", count=len(data) // 4)
+    else:
+        samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2).astype(np.float32) * (1.0 / 32768)
+    return resample(samples, sample_rate, TARGET_RATE) if sample_rate != TARGET_RATE else samples
+
+@app.websocket("/games/{game_id}/voice")
+async def voice_ws(websocket: WebSocket, game_id: str):
+    """
+    串流語音下棋：
+      - 文字訊框（選用）：{"player": "X", "sample_rate": 16000, "format": "pcm16" | "f32"} 設定；{"type": "end"} 表示一句話結束
+      - 二進位訊框：音訊片段
+    伺服器回傳 {"type": "partial", "text"}，辨識出明確指令時立即落子並回傳 {"type": "command", ...}
+    辨識在 model_pool 中背景進行，接收音訊不會因辨識而停頓；同一時間每條連線只有一個辨識工作
+    """
+    await websocket.accept()
+    try:
+        await run_in_threadpool(_open_game, game_id)
+    except HTTPException:
+        await websocket.close(code=4404, reason="Game not found")
+        return
+    config = {"player": None, "sample_rate": TARGET_RATE, "format": "pcm16"}
+    recognizer = StreamingRecognizer()
+    receiving, decoding, final = None, None, False
+    decoding_final = False  # 進行中的辨識是否為「一句話結束」後的最後一次
+    try:
+        while True:
+            if receiving is None:
+                receiving = asyncio.ensure_future(websocket.receive())
+            waiting = {receiving} if decoding is None else {receiving, decoding}
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if decoding in done:
+                task, decoding = decoding, None
+                try:
+                    text = task.result()
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+                    text = None
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "status": 500, "detail": f"辨識失敗: {e}"})
+                    text = None
+                if text is not None:
+                    command = recognizer.update(text, final=decoding_final)
+                    await websocket.send_json({"type": "final" if decoding_final else "partial", "text": text})
+                    if command is not None:
+                        try:
+                            result = await run_in_threadpool(_voice_commit, game_id, config["player"], command)
+                        except HTTPException as e:
+                            result = {"type": "error", "status": e.status_code, "detail": e.detail}
+                        await websocket.send_json(dict(result, text=text))
+                        recognizer.reset()
+                if decoding_final:
+                    recognizer.reset()
+                    final = False
+
+            if receiving in done:
+                message, receiving = receiving.result(), None
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    try:
+                        recognizer.feed(_pcm_samples(message["bytes"], config["format"], config["sample_rate"]))
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "status": 400, "detail": str(e)})
+                elif message.get("text") is not None:
+                    try:
+                        control = json.loads(message["text"])
+                        if control.get("type") == "end":
+                            final = True
+                        else:
+                            config = _voice_config(config, control)
+                    except (ValueError, TypeError, AttributeError) as e:
+                        await websocket.send_json({"type": "error", "status": 400, "detail": f"無效的控制訊息: {e}"})
+
+            if decoding is None:
+                if final and not recognizer.heard_speech:
+                    recognizer.reset()  # 整句都是靜音（或指令已送出）
+                    final = False
+                elif final or recognizer.due():
+                    decoding_final = final
+                    decoding = asyncio.ensure_future(
+                        _offload(model_pool, transcribe_samples, recognizer.snapshot()))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (receiving, decoding):
+            if task is not None:
+                task.cancel()
+
+# body 由 _read_audio 自行串流解析，這裡只補上 OpenAPI 文件
+_TRANSCRIBE_BODY = {"requestBody": {"content": {
+    "multipart/form-data": {"schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}}},
+    "audio/*": {"schema": {"type": "string", "format": "binary"}},
+}}}
+
+@app.post("/transcribe", openapi_extra=_TRANSCRIBE_BODY)
+async def transcribe(request: Request):
+    try:
+        data = await _read_audio(request)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not data:
+        raise HTTPException(status_code=400, detail="沒有收到音訊")
+    try:
+        audio = await run_in_threadpool(asr_input, data)
+    except AudioDecodeError as e:
+        # 與模型轉錄失敗一致：仍回 200，text 帶失敗原因
+        return JSONResponse(content={"text": f"轉錄失敗: {e}"})
+    try:
+        # 批次在 model_pool 中執行；逾時時取消等待（尚未送出的項目會被批次略過）
+        text = await asyncio.wait_for(asr_batcher.submit(audio), model_pool.timeout)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (asyncio.TimeoutError, InferenceTimeout):
+        raise HTTPException(status_code=504, detail="語音辨識逾時")
     return JSONResponse(content={"text": text})
 
+@app.get("/transcribe/stats")
+def transcribe_stats():
+    return JSONResponse(content=asr_batcher.stats())
+
+@app.get("/inference/stats")
+def inference_stats():
+    return JSONResponse(content={"model": model_pool.stats(), "search": search_pool.stats()})
+
+@app.get("/tts/stats")
+def tts_stats():
+    return JSONResponse(content=tts_cache.stats())
+
+@app.get("/tts/{key}")
+async def tts_audio(key: str, request: Request):
+    # 內容定址：同一個 key 的音訊永遠不變，ETag 直接用 key，瀏覽器可長期快取
+    if not valid_key(key):
+        raise HTTPException(status_code=404, detail="找不到這段語音")
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    audio = tts_cache.cached(key)
+    if audio is None:
+        try:
+            audio = await _offload(model_pool, tts_cache.get, key)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="找不到這段語音")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"語音合成失敗: {e}")
+    return Response(content=audio, media_type=tts_cache.media_type, headers=headers)
+
+def _llm_decision(data: LLMIn, board, player):
+    try:
+        if data.mode == "generate":
+            decision = ai_decision_with_llm(data.prompt)
+            if isinstance(decision, dict):
+                decision.setdefault("player", player)
+            return decision
+        if data.mode != "scored":
+            raise HTTPException(status_code=400, detail="mode 必須是 scored 或 generate")
+        return ai_decision_scored(data.prompt, board, player)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _normalize_prompt(prompt: str):
+    return " ".join(prompt.lower().split())
+
+async def _decide(data: LLMIn, board):
+    """
+    先用規則解析（interpret_command）；解析不出來才查快取，最後才在 model_pool 呼叫模型
+    board 為棋盤副本；decision["source"] 標示來源：rule / cache / model
+    """
+    player = (data.player or board.turn).upper()
+    action, from_pos, to_pos = interpret_command(data.prompt, player)
+    if action is not None:
+        decision_stats["rule"] += 1
+        return {"action": action, "pos": to_pos, "from_pos": from_pos, "player": player,
+                "raw": data.prompt, "source": "rule"}
+
+    position = board.position_key() if data.mode == "scored" else None
+    key = (_normalize_prompt(data.prompt), data.mode, player, position)
+    cached = decision_cache.get(key)
+    if cached is not None:
+        return dict(cached, source="cache")
+    decision = await _offload(model_pool, _llm_decision, data, board, player)
+    decision_stats["model"] += 1
+    if isinstance(decision, dict):
+        decision["source"] = "model"
+        decision_cache.put(key, dict(decision))
+    return decision
+
+@app.get("/llm/stats")
+def llm_stats():
+    return JSONResponse(content={
+        "rule_hits": decision_stats["rule"],
+        "model_calls": decision_stats["model"],
+        "cache": decision_cache.stats(),
+    })
+
 @app.post("/llm_move")
-def llm_move(data: LLMIn):
-    decision = ai_decision_with_llm(data.prompt)
+async def llm_move(data: LLMIn):
+    board = await run_in_threadpool(_snapshot, data.game_id, True)
+    decision = await _decide(data, board)
     if not isinstance(decision, dict):
         decision = {"raw": str(decision)}
     if not decision.get("pos"):
@@ -199,21 +1027,27 @@ def llm_move(data: LLMIn):
         "raw": str(decision)
     })
 
-@app.post("/nlp_move")
-def nlp_move(data: LLMIn):
-    decision = ai_decision_with_llm(data.prompt)
-    if not isinstance(decision, dict):
-        raise HTTPException(status_code=400, detail="LLM 回傳格式錯誤")
-    player = decision.get("player", "").upper()
+def _commit_nlp_move(data: LLMIn, decision, request: Request):
+    # 決策是在棋盤副本上做的；套用時由 _apply_action 在鎖內重新檢查合法性
+    player = (decision.get("player") or "").upper()
     action = decision.get("action")
     pos = decision.get("pos")
     from_pos = decision.get("from_pos")
     if not player or not action:
         raise HTTPException(status_code=400, detail="LLM 回傳缺少 player 或 action")
-    try:
-        success, msg = _apply_action(player, action, pos, from_pos)
-        payload = _common_payload(success, msg, board, board.winner, board.turn)
+    with _open_game(data.game_id, create=True) as board, _broadcast(data.game_id, board):
+        try:
+            success, msg = _apply_action(board, player, action, pos, from_pos, data.game_id)
+            payload = _common_payload(success, msg, board, board.winner, board.turn)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
         payload["decision"] = decision
-        return JSONResponse(content=_speak_and_attach(payload))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        return _respond(request, payload, board)
+
+@app.post("/nlp_move")
+async def nlp_move(data: LLMIn, request: Request):
+    board = await run_in_threadpool(_snapshot, data.game_id, True)
+    decision = await _decide(data, board)
+    if not isinstance(decision, dict):
+        raise HTTPException(status_code=400, detail="LLM 回傳格式錯誤")
+    return await run_in_threadpool(_commit_nlp_move, data, decision, request)
@@ -1,4 +1,4 @@
 from .board import Board
-from .ai import ai_move, transcribe_audio, ai_decision_with_llm
+from .ai import ai_move, transcribe_audio, transcribe_batch, ai_decision_with_llm
 
-__all__ = ["Board", "ai_move", "transcribe_audio", "ai_decision_with_llm"]
\ No newline at end of file
+__all__ = ["Board", "ai_move", "transcribe_audio", "transcribe_batch", "ai_decision_with_llm"]
\ No newline at end of file
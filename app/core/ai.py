@@ -1,53 +1,223 @@
 # ai.py
-# AI 模組：隨機下棋 + 語音辨識 (Whisper) + LLM 決策
+# AI 模組：隨機 / 完美查表 / 搜尋式下棋 + 語音辨識 (Whisper) + LLM 決策
 import random
-from transformers import pipeline
+import time
 
-# ---------- 1. 隨機 AI ----------
-def ai_move(board, player):
+import numpy as np
+
+from app.core.metrics import model_timer
+from app.core.models import register
+from app.core.board import POSITIONS
+from app.core.search import search_move
+from app.core.solver import NO_MOVE, RESULT_NAMES, decode_move, get_perfect_table
+
+# ---------- 1. 下棋 AI ----------
+# 每個策略都是 fn(board, player, time_ms, max_nodes) -> (from_pos, to_pos, msg, info)，
+# 只讀取 board，不會修改它；from_pos 為 None 代表放子
+def random_move(board, player, time_ms=None, max_nodes=None):
     """
     隨機 AI，下棋或移動棋子
     """
     if len(board.pieces[player]) < board.max_pieces:
-        options = [i for i in range(9) if board.board[i] == ' ']
+        options = board.available_positions()
         if not options:
-            return None, None, "AI 無合法位置"
+            return None, None, "AI 無合法位置", {}
         target = random.choice(options)
-        return None, board.idx_to_pos(target), ""  # 放子
+        return None, board.idx_to_pos(target), "", {}  # 放子
     else:
-        my_pieces = board.pieces[player]
+        # 複製一份再洗牌，避免打亂 board.pieces 的「最舊在前」順序
+        my_pieces = list(board.pieces[player])
         random.shuffle(my_pieces)
         for src in my_pieces:
-            options = [i for i in range(9) if board.board[i] == ' ']
+            options = board.available_positions()
             if not options:
                 continue
             dest = random.choice(options)
-            return board.idx_to_pos(src), board.idx_to_pos(dest), ""
-        return None, None, "AI 無法移動"
+            return board.idx_to_pos(src), board.idx_to_pos(dest), "", {}
+        return None, None, "AI 無法移動", {}
+
+
+def perfect_move(board, player, time_ms=None, max_nodes=None):
+    """
+    完美對弈 AI：查預先求解的表（app/core/solver.py），一次查表即得最佳走法
+    表不存在或局面不在表內（例如 TEST_MODE 下雙方子數不合規則）時退回隨機 AI
+    """
+    table = get_perfect_table()
+    probe = table.probe_board(board, player) if table else None
+    if probe is None or probe[2] == NO_MOVE:
+        return random_move(board, player)
+    result, steps, code = probe
+    from_idx, to_idx = decode_move(code)
+    from_pos = None if from_idx is None else board.idx_to_pos(from_idx)
+    msg = f"{RESULT_NAMES[result]} in {steps}"
+    return from_pos, board.idx_to_pos(to_idx), msg, {"nodes": 1, "score": RESULT_NAMES[result], "depth": steps}
+
+
+def _search_strategy(name):
+    def strategy(board, player, time_ms=200, max_nodes=200_000):
+        from_pos, to_pos, result = search_move(board, player, name, time_ms, max_nodes)
+        if to_pos is None:
+            return None, None, "AI 無法移動", {"nodes": result.nodes}
+        return from_pos, to_pos, "", {"nodes": result.nodes, "depth": result.depth, "score": result.score}
+    strategy.__name__ = f"{name}_move"
+    strategy.__doc__ = f"搜尋式 AI（{name}），受 time_ms / max_nodes 預算限制"
+    return strategy
+
+
+STRATEGIES = {
+    "random": random_move,
+    "perfect": perfect_move,
+    "alphabeta": _search_strategy("alphabeta"),
+    "mcts": _search_strategy("mcts"),
+}
+
+
+def ai_move_with_info(board, player, strategy="random", time_ms=200, max_nodes=200_000):
+    """
+    依策略名稱選擇 AI，回傳 (from_pos, to_pos, msg, info)；
+    info 含 strategy、nodes、time_ms、nodes_per_sec（搜尋式策略另有 depth、score）
+    """
+    fn = STRATEGIES.get(strategy)
+    if fn is None:
+        raise ValueError(f"未知的 AI 策略: {strategy}")
+    started = time.perf_counter()
+    from_pos, to_pos, msg, info = fn(board, player, time_ms=time_ms, max_nodes=max_nodes)
+    elapsed = time.perf_counter() - started
+    info = {"strategy": strategy, "nodes": 0, **info, "time_ms": round(elapsed * 1000, 3)}
+    info["nodes_per_sec"] = round(info["nodes"] / elapsed) if info["nodes"] and elapsed > 0 else None
+    return from_pos, to_pos, msg, info
+
+
+def ai_move(board, player, strategy="random", time_ms=200, max_nodes=200_000):
+    """
+    依策略名稱選擇 AI，回傳 (from_pos, to_pos, msg)；from_pos 為 None 代表放子
+    """
+    return ai_move_with_info(board, player, strategy, time_ms, max_nodes)[:3]
+
+
+# MASK_CELLS[mask] = 9 格是否在 mask 內（512 x 9 的布林表），把位元遮罩整批展開成矩陣
+MASK_CELLS = ((np.arange(512)[:, None] >> np.arange(9)) & 1).astype(bool)
+_POSITIONS = np.array(POSITIONS, dtype=object)
+
+
+def _random_moves_batch(boards, players):
+    """
+    random_move 的向量化版本：一次替所有棋盤抽籤。
+    每列對合法格子給一個均勻亂數、取 argmax，等同在合法格子中均勻挑一個；
+    移子階段起點與終點各自獨立抽（與 random_move 的分布相同）
+    """
+    n = len(boards)
+    rng = np.random.default_rng(random.getrandbits(64))  # 跟著 random.seed 走，測試可重現
+    own = np.fromiter((board.masks[p] for board, p in zip(boards, players)), np.int64, n)
+    occupied = np.fromiter((board.occupied() for board in boards), np.int64, n)
+    placing = np.fromiter((len(board.pieces[p]) < board.max_pieces for board, p in zip(boards, players)), bool, n)
+    empty = ~MASK_CELLS[occupied]
+    draws = rng.random((2, n, 9))
+    to_pos = _POSITIONS[np.argmax(np.where(empty, draws[0], -1.0), axis=1)]
+    from_pos = _POSITIONS[np.argmax(np.where(MASK_CELLS[own], draws[1], -1.0), axis=1)]
+    from_pos[placing] = None
+    results = [(f, t, "", {}) for f, t in zip(from_pos.tolist(), to_pos.tolist())]
+    for i in np.flatnonzero(~empty.any(axis=1)):
+        results[i] = (None, None, "AI 無合法位置" if placing[i] else "AI 無法移動", {})
+    return results
+
+
+def ai_moves_batch(boards, players, strategy="random", time_ms=200, max_nodes=200_000, max_total_ms=None):
+    """
+    一次替多個棋盤選步，回傳與 boards 同順序的 (from_pos, to_pos, msg, info) 串列
+      - random：NumPy 一次抽完所有棋盤
+      - 其他策略：相同局面（雙方棋子順序、輪到誰）只算一次，結果共用
+    max_total_ms 是整批的時間上限：每次搜尋最多用剩下的時間，用完後其餘局面不再搜尋，
+    回傳 (None, None, msg, {"timed_out": True})
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"未知的 AI 策略: {strategy}")
+    started = time.perf_counter()
+    deadline = None if max_total_ms is None else started + max_total_ms / 1000
+    timed_out = 0
+    if strategy == "random":
+        results = _random_moves_batch(boards, players)
+        unique = len(boards)
+    else:
+        memo = {}
+        results = []
+        for board, player in zip(boards, players):
+            key = (tuple(board.pieces['X']), tuple(board.pieces['O']), player, board.max_pieces)
+            if key not in memo:
+                budget = time_ms if deadline is None else min(time_ms, (deadline - time.perf_counter()) * 1000)
+                if budget <= 0:
+                    timed_out += 1
+                    results.append((None, None, "批次搜尋時間已用完", {"timed_out": True}))
+                    continue
+                memo[key] = ai_move_with_info(board, player, strategy, budget, max_nodes)
+            results.append(memo[key])
+        unique = len(memo)
+    elapsed = round((time.perf_counter() - started) * 1000, 3)
+    batch = {"size": len(boards), "unique": unique, "timed_out": timed_out, "time_ms": elapsed}
+    return [(f, t, msg, {"strategy": strategy, "nodes": 0, **info, "batch": batch})
+            for f, t, msg, info in results]
 
 
 # ---------- 2. 語音轉文字 (Whisper) ----------
-# 初始化 Whisper pipeline（小模型，速度快，精度夠 demo）
-asr = pipeline("automatic-speech-recognition", model="openai/whisper-tiny")
+def _pipeline(task, model):
+    # transformers/torch 只在真正載入模型時才 import，避免拖慢啟動與測試
+    from transformers import pipeline
+    return pipeline(task, model=model)
+
+# Whisper pipeline（小模型，速度快，精度夠 demo）；第一次使用或背景預熱時才載入
+asr_model = register("asr", lambda: _pipeline("automatic-speech-recognition", "openai/whisper-tiny"))
+
+def _asr_item(item):
+    # pipeline 會從 dict 輸入中 pop 掉 raw / sampling_rate，送進去的必須是淺複本（陣列本身不複製）
+    return dict(item) if isinstance(item, dict) else item
 
 def transcribe_audio(file_path):
     """
     語音轉文字：用 Hugging Face Whisper
+    file_path 可以是檔案路徑，或 {"raw": float32 陣列, "sampling_rate": 16000}（見 app.core.audio）
     原理：
       - 把音訊 (wav/mp3) 轉成特徵向量
       - 丟進 Whisper 模型
       - 解碼成文字
     """
     try:
-        result = asr(file_path)
+        pipe = asr_model.get()
+        with model_timer("asr", "transcribe"):
+            result = pipe(_asr_item(file_path))
         return result.get("text", "")
     except Exception as e:
         return f"轉錄失敗: {e}"
 
 
+def transcribe_batch(inputs):
+    """
+    批次語音轉文字：一次把多段音訊送進 Whisper（特徵會補齊成同一長度）
+    整批失敗時改為逐段轉錄，避免一個壞檔拖垮同批的其他請求
+    """
+    try:
+        pipe = asr_model.get()
+        with model_timer("asr", "transcribe_batch"):
+            results = pipe([_asr_item(item) for item in inputs], batch_size=len(inputs))
+        return [r.get("text", "") for r in results]
+    except Exception:
+        if len(inputs) == 1:
+            return [transcribe_audio(inputs[0])]
+        return [transcribe_audio(item) for item in inputs]
+
+
+def transcribe_samples(samples, sampling_rate=16000):
+    """
+    辨識一段 float32 音訊陣列（串流辨識的滑動視窗）；失敗時直接丟出例外，不回傳錯誤文字
+    """
+    pipe = asr_model.get()
+    with model_timer("asr", "stream"):
+        result = pipe({"raw": samples, "sampling_rate": sampling_rate})
+    return result.get("text", "")
+
+
 # ---------- 3. LLM 決策 ----------
-# 初始化一個簡單 LLM（先用 gpt2，輕量，跑得動）
-llm = pipeline("text-generation", model="gpt2")
+# 一個簡單 LLM（先用 gpt2，輕量，跑得動）；同樣延遲載入
+llm_model = register("llm", lambda: _pipeline("text-generation", "gpt2"))
 
 def ai_decision_with_llm(prompt):
     """
@@ -57,7 +227,9 @@ def ai_decision_with_llm(prompt):
       - LLM 產生回覆（文字）
       - 從文字裡解析出 pos/action
     """
-    output = llm(prompt, max_length=50, num_return_sequences=1)
+    pipe = llm_model.get()
+    with model_timer("llm", "generate"):
+        output = pipe(prompt, max_length=50, num_return_sequences=1)
     if not output:
         return {"action": "place", "pos": "a1", "from_pos": None, "raw": ""}
     text = output[0].get("generated_text", "")
@@ -65,4 +237,80 @@ def ai_decision_with_llm(prompt):
         pos = text.split("pos=")[1].split()[0]
         return {"action": "place", "pos": pos, "from_pos": None, "raw": text}
     else:
-        return {"action": "place", "pos": "a1", "from_pos": None, "raw": text}
\ No newline at end of file
+        return {"action": "place", "pos": "a1", "from_pos": None, "raw": text}
+
+def legal_actions(board, player):
+    """
+    列出目前所有合法動作 (action, from_pos, to_pos)：
+    未滿 max_pieces 時為 9 格中的空格，之後為 (自己的棋子 → 空格) 的組合
+    """
+    empties = [board.idx_to_pos(i) for i in board.available_positions()]
+    if len(board.pieces[player]) < board.max_pieces:
+        return [("place", None, to_pos) for to_pos in empties]
+    return [
+        ("move", board.idx_to_pos(src), to_pos)
+        for src in board.pieces[player]
+        for to_pos in empties
+    ]
+
+
+def _candidate_text(action, from_pos, to_pos):
+    if action == "place":
+        return f" pos={to_pos}"
+    return f" move={from_pos}->{to_pos}"
+
+
+def _score_continuations(pipe, context, continuations, max_context_tokens=512):
+    """
+    一次前向運算（batch）計算每個候選續寫的 log-probability 總和
+    """
+    import torch
+
+    tok, model = pipe.tokenizer, pipe.model
+    ctx_ids = tok.encode(context)[-max_context_tokens:]
+    cont_ids = [tok.encode(text) for text in continuations]
+    seqs = [ctx_ids + ids for ids in cont_ids]
+    width = max(len(seq) for seq in seqs)
+    pad_id = tok.eos_token_id if tok.eos_token_id is not None else 0
+    input_ids = torch.full((len(seqs), width), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros_like(input_ids)
+    for i, seq in enumerate(seqs):
+        input_ids[i, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+        attention_mask[i, :len(seq)] = 1
+
+    with torch.no_grad():
+        logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+    # 第 t 個位置的 logits 預測第 t+1 個 token
+    logprobs = torch.log_softmax(logits[:, :-1].float(), dim=-1)
+    token_logprobs = logprobs.gather(2, input_ids[:, 1:].unsqueeze(-1)).squeeze(-1)
+    start = len(ctx_ids) - 1
+    return [token_logprobs[i, start:start + len(ids)].sum().item() for i, ids in enumerate(cont_ids)]
+
+
+def ai_decision_scored(prompt, board, player):
+    """
+    受限決策：只替目前合法的候選動作打分數，取 log-probability 最高者
+    原理：
+      - 把 prompt 與棋盤狀態組成上下文
+      - 每個合法動作寫成一段續寫（" pos=b2"、" move=a1->b2"）
+      - 一次 batch 前向運算算出各續寫的機率，不需逐 token 生成
+    保證回傳合法動作；沒有任何合法動作時回傳 action 為 None
+    """
+    candidates = legal_actions(board, player)
+    if not candidates:
+        return {"action": None, "pos": None, "from_pos": None, "player": player, "raw": ""}
+    context = f"{prompt}\n棋盤: {board.render_string()}\n輪到 {player}，下一步:"
+    texts = [_candidate_text(*c) for c in candidates]
+    pipe = llm_model.get()
+    with model_timer("llm", "score"):
+        scores = _score_continuations(pipe, context, texts)
+    best = max(range(len(candidates)), key=scores.__getitem__)
+    action, from_pos, to_pos = candidates[best]
+    return {
+        "action": action,
+        "pos": to_pos,
+        "from_pos": from_pos,
+        "player": player,
+        "score": scores[best],
+        "raw": texts[best].strip(),
+    }
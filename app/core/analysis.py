@@ -0,0 +1,148 @@
+# analysis.py
+# 局面分析（/games/{game_id}/hint）：替每個合法動作標上 win / loss / draw 與步數
+#
+# - 有完美對弈表時逐一查子局面，結果精確（exact=True）
+# - 沒有表時以 alpha-beta 迭代加深評估：預算內證明得出的必勝 / 必敗標成 win / loss，
+#   其餘標成 draw（exact=False）
+# - 結果以局面在 8 種對稱（4 個旋轉 × 鏡射）下的標準形為 key 放進有上限的 LRU，
+#   不同遊戲中等價的局面共用同一筆；走法存成標準形座標，取出時再轉回實際座標
+#
+# 這個變體的走法只看雙方佔了哪些格子（移子可選任何一顆），與落子先後無關，
+# 因此以遮罩（而非 Board.pieces 的順序）當 key 不會混淆不同結果的局面
+from app.core.board import POSITIONS
+from app.core.cache import LRUCache
+from app.core.search import MATE_THRESHOLD, WIN_SCORE, AlphaBeta, shared_tt
+from app.core.solver import DRAW, LOSS, RESULT_NAMES, SIDES, WIN, decode_move, legal_moves
+
+
+def _symmetries():
+    # 每個對稱是一個置換 perm：第 i 格移到 perm[i]（i = 列 * 3 + 行）
+    maps = (
+        lambda r, c: (r, c), lambda r, c: (c, 2 - r), lambda r, c: (2 - r, 2 - c), lambda r, c: (2 - c, r),
+        lambda r, c: (r, 2 - c), lambda r, c: (2 - r, c), lambda r, c: (c, r), lambda r, c: (2 - c, 2 - r),
+    )
+    perms = []
+    for f in maps:
+        perm = [0] * 9
+        for i in range(9):
+            r, c = f(*divmod(i, 3))
+            perm[i] = r * 3 + c
+        perms.append(tuple(perm))
+    return tuple(perms)
+
+
+SYMMETRIES = _symmetries()
+INVERSES = tuple(tuple(perm.index(i) for i in range(9)) for perm in SYMMETRIES)
+# MASK_MAPS[s][mask]：遮罩套用第 s 個對稱後的結果，標準化只需 8 次查表
+MASK_MAPS = tuple(
+    tuple(sum(1 << perm[i] for i in range(9) if (m >> i) & 1) for m in range(512)) for perm in SYMMETRIES
+)
+
+
+def canonical(x_mask, o_mask):
+    """
+    回傳 ((標準形 X 遮罩, 標準形 O 遮罩), 所用的對稱編號)；標準形取 8 種對稱中最小的一組
+    """
+    return min(((maps[x_mask], maps[o_mask]), s) for s, maps in enumerate(MASK_MAPS))
+
+
+def _result_from_score(score):
+    if score > MATE_THRESHOLD:
+        return RESULT_NAMES[WIN], WIN_SCORE - score
+    if score < -MATE_THRESHOLD:
+        return RESULT_NAMES[LOSS], WIN_SCORE + score
+    return RESULT_NAMES[DRAW], None
+
+
+def _table_moves(table, xs, os_, side, max_pieces):
+    # 查每個子局面；子局面對輪到的對手而言的結果，反過來就是這一步的結果
+    moves = []
+    for code, nxs, nos in legal_moves(xs, os_, side, max_pieces):
+        probe = table.probe(nxs, nos, 1 - side)
+        if probe is None:
+            return None
+        child, steps, _ = probe
+        result = WIN if child == LOSS else LOSS if child == WIN else DRAW
+        moves.append((code, RESULT_NAMES[result], None if result == DRAW else steps + 1))
+    return moves
+
+
+def _search_moves(xs, os_, side, max_pieces, time_ms, max_nodes):
+    scores, depth, nodes = AlphaBeta(shared_tt, max_pieces).evaluate_moves(xs, os_, side, time_ms, max_nodes)
+    return [(code, *_result_from_score(score)) for code, score in scores.items()], depth
+
+
+def _rank(move):
+    # 先勝（越快越好）、再和、最後敗（拖越久越好）
+    _, result, depth = move
+    if result == RESULT_NAMES[WIN]:
+        return (0, depth)
+    if result == RESULT_NAMES[LOSS]:
+        return (2, -depth)
+    return (1, 0)
+
+
+class PositionAnalyzer:
+    def __init__(self, maxsize=65536, time_ms=200, max_nodes=500_000, table_fn=None):
+        self.cache = LRUCache(maxsize)
+        self.time_ms = time_ms
+        self.max_nodes = max_nodes
+        self.table_fn = table_fn  # 回傳完美對弈表（或 None）的函式
+
+    def _key(self, board, player):
+        (cx, co), sym = canonical(board.masks['X'], board.masks['O'])
+        return (cx, co, SIDES.index(player), board.max_pieces), sym
+
+    def _evaluate(self, key):
+        # 在標準形上評估；棋子順序不影響結果，直接依格子編號排序
+        cx, co, side, max_pieces = key
+        xs = tuple(i for i in range(9) if (cx >> i) & 1)
+        os_ = tuple(i for i in range(9) if (co >> i) & 1)
+        table = self.table_fn() if self.table_fn else None
+        moves = None
+        if table is not None and table.max_pieces == max_pieces:
+            moves = _table_moves(table, xs, os_, side, max_pieces)
+        if moves is not None:
+            entry = {"exact": True, "source": "table", "depth": None}
+        else:
+            moves, depth = _search_moves(xs, os_, side, max_pieces, self.time_ms, self.max_nodes)
+            entry = {"exact": False, "source": "search", "depth": depth}
+        entry["moves"] = tuple(sorted(moves, key=_rank))
+        return entry
+
+    def lookup(self, board, player):
+        """
+        只查快取（O(1)，可在事件迴圈中呼叫）；命中時回傳分析結果，否則回傳 None
+        """
+        key, sym = self._key(board, player)
+        entry = self.cache.get(key)
+        return None if entry is None else self._render(entry, sym, cached=True)
+
+    def compute(self, board, player):
+        # 快取沒有時才呼叫：評估並放進快取（可能耗時，應在執行緒池中執行）
+        key, sym = self._key(board, player)
+        entry = self._evaluate(key)
+        self.cache.put(key, entry)
+        return self._render(entry, sym, cached=False)
+
+    def analyze(self, board, player):
+        return self.lookup(board, player) or self.compute(board, player)
+
+    @staticmethod
+    def _render(entry, sym, cached):
+        # 標準形座標 → 實際座標
+        inverse = INVERSES[sym]
+        moves = []
+        for code, result, depth in entry["moves"]:
+            from_idx, to_idx = decode_move(code)
+            moves.append({
+                "from_pos": None if from_idx is None else POSITIONS[inverse[from_idx]],
+                "pos": POSITIONS[inverse[to_idx]],
+                "result": result,
+                "depth": depth,
+            })
+        return {"exact": entry["exact"], "source": entry["source"], "search_depth": entry["depth"],
+                "cached": cached, "moves": moves}
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,224 @@
+# audio.py
+# 上傳音訊直接在記憶體中解碼：bytes → float32 單聲道 NumPy 陣列 → 重新取樣到 16 kHz，
+# 以 {"raw": 陣列, "sampling_rate": 16000} 交給 Whisper pipeline，不經過 /tmp，也不重複讀檔。
+#
+# - PCM / float WAV 由內建的 RIFF 解析處理，樣本以 np.frombuffer 直接指向上傳的 bytes（零複製），
+#   只在轉成 float32 時產生一份新陣列
+# - 其他格式（FLAC、OGG…）在有安裝 soundfile 時由它解碼
+# - multipart 上傳直接從請求串流逐塊解析（read_multipart_file），檔案內容只放在記憶體、
+#   邊收邊檢查大小，不會像 Starlette 的表單解析那樣先整份收完、超過 1 MB 還寫到暫存檔
+import io
+import struct
+
+import numpy as np
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart 0.0.12 以前的套件名稱
+    from multipart.multipart import MultipartParser, parse_options_header
+
+TARGET_RATE = 16000
+CHUNK_SIZE = 64 * 1024
+
+_PCM_DTYPES = {8: np.dtype("u1"), 16: np.dtype("<i2"), 32: np.dtype("<i4")}
+_WAVE_FORMAT_PCM, _WAVE_FORMAT_FLOAT, _WAVE_FORMAT_EXTENSIBLE = 1, 3, 0xFFFE
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+class MultipartError(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+async def read_limited(chunks, max_bytes):
+    """
+    逐塊讀取（async iterator of bytes），超過 max_bytes 立即丟出 UploadTooLarge；
+    最後只做一次 join，得到單一 bytes 物件
+    """
+    parts, size = [], 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"音訊超過 {max_bytes} bytes 上限")
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+class _FilePart:
+    """
+    MultipartParser 的回呼：只收下第一個檔案欄位（有 filename 或名為 field）的內容，
+    累積超過 max_bytes 時立即丟出 UploadTooLarge
+    """
+
+    def __init__(self, field, max_bytes):
+        self.field = field.encode("utf-8")
+        self.max_bytes = max_bytes
+        self.parts, self.size = [], 0
+        self.found = self.current = False
+        self._name, self._value, self._disposition = b"", b"", b""
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._disposition = b""
+
+    def _header_field(self, data, start, end):
+        self._name += data[start:end]
+
+    def _header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        if self._name.lower() == b"content-disposition":
+            self._disposition = self._value
+        self._name, self._value = b"", b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self.current = not self.found and (b"filename" in options or options.get(b"name") == self.field)
+
+    def _part_data(self, data, start, end):
+        if not self.current:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"音訊超過 {self.max_bytes} bytes 上限")
+        self.parts.append(data[start:end])
+
+    def _part_end(self):
+        if self.current:
+            self.found, self.current = True, False
+
+
+async def read_multipart_file(chunks, content_type, max_bytes, field="file", overhead=CHUNK_SIZE):
+    """
+    從 multipart/form-data 的原始串流（async iterator of bytes）取出第一個檔案欄位的 bytes；
+    檔案超過 max_bytes、或整個 body 超過 max_bytes + overhead 時立即丟出 UploadTooLarge。
+    沒有檔案欄位時回傳 b""，格式錯誤丟出 MultipartError
+    """
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise MultipartError("multipart 請求缺少 boundary")
+    part = _FilePart(field, max_bytes)
+    parser = MultipartParser(boundary, part.callbacks())
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes + overhead:
+            raise UploadTooLarge(f"音訊超過 {max_bytes} bytes 上限")
+        try:
+            parser.write(chunk)
+        except UploadTooLarge:
+            raise
+        except Exception as e:
+            raise MultipartError(f"無法解析 multipart 請求: {e}") from None
+    parser.finalize()
+    return b"".join(part.parts)
+
+
+def _parse_wav(data):
+    """
+    回傳 (樣本陣列（原始型別、零複製）, 聲道數, 取樣率)；不是支援的 WAV 時回傳 None
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    offset, fmt = 12, None
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt " and size >= 16:
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                audio_format = struct.unpack_from("<H", data, body + 24)[0]  # SubFormat GUID 的前兩個 byte
+            fmt = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            audio_format, channels, rate, bits = fmt
+            if audio_format == _WAVE_FORMAT_FLOAT and bits == 32:
+                dtype = np.dtype("<f4")
+            elif audio_format == _WAVE_FORMAT_PCM and bits in _PCM_DTYPES:
+                dtype = _PCM_DTYPES[bits]
+            else:
+                return None
+            if channels < 1 or rate < 1:
+                return None
+            size = min(size, len(data) - body)
+            count = size // dtype.itemsize // channels * channels
+            return np.frombuffer(data, dtype=dtype, count=count, offset=body), channels, rate
+        offset = body + size + (size & 1)  # chunk 以偶數 byte 對齊
+    return None
+
+
+def _to_float32(samples):
+    if samples.dtype == np.float32:
+        return samples
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128.0) * (1.0 / 128)
+    scale = 1.0 / float(np.iinfo(samples.dtype).max + 1)
+    return samples.astype(np.float32) * np.float32(scale)
+
+
+def _decode_soundfile(data):
+    try:
+        import soundfile
+    except ImportError:
+        raise AudioDecodeError("不支援的音訊格式（僅支援 PCM WAV；安裝 soundfile 可支援更多格式）")
+    try:
+        samples, rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception as e:
+        raise AudioDecodeError(f"無法解碼音訊: {e}")
+    return samples, rate
+
+
+def resample(samples, rate, target=TARGET_RATE):
+    """
+    以頻域截斷 / 補零做帶限重新取樣（同 scipy.signal.resample 的作法），O(n log n)
+    """
+    if rate == target or len(samples) == 0:
+        return samples
+    n_out = max(1, int(round(len(samples) * target / rate)))
+    spectrum = np.fft.rfft(samples)
+    resized = np.zeros(n_out // 2 + 1, dtype=spectrum.dtype)
+    keep = min(len(resized), len(spectrum))
+    resized[:keep] = spectrum[:keep]
+    out = np.fft.irfft(resized, n_out)
+    out *= n_out / len(samples)
+    return out.astype(np.float32, copy=False)
+
+
+def decode_audio(data, target_rate=TARGET_RATE):
+    """
+    bytes → float32 單聲道、target_rate 取樣率的 NumPy 陣列
+    """
+    parsed = _parse_wav(data)
+    if parsed is not None:
+        samples, channels, rate = parsed
+        samples = _to_float32(samples)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    else:
+        frames, rate = _decode_soundfile(data)
+        samples = frames.reshape(-1) if frames.shape[1] == 1 else frames.mean(axis=1, dtype=np.float32)
+    if len(samples) == 0:
+        raise AudioDecodeError("音訊沒有任何樣本")
+    return resample(samples, rate, target_rate)
+
+
+def asr_input(data):
+    # Whisper pipeline 可直接接受的輸入格式
+    return {"raw": decode_audio(data), "sampling_rate": TARGET_RATE}
@@ -0,0 +1,115 @@
+# batching.py
+# 微批次推論排程器：把同時到達的請求湊成一批，一次送進模型
+#
+# 取得第一個請求後，最多再等 max_wait_ms 或湊滿 max_batch_size 就送出；
+# 批次在執行緒池中執行，不阻塞事件迴圈，結果依序回填到各呼叫者的 future。
+# 給了 pool（InferencePool）時批次經由 pool.run 執行，受它的 max_pending 與逾時限制；
+# 等待湊批的佇列上限為 max_queue，滿了 submit 立即丟出 Overloaded（→ 503）。
+import asyncio
+import time
+from collections import Counter
+
+from app.core.inference import Overloaded
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10.0, executor=None, pool=None, max_queue=0):
+        """
+        batch_fn: 同步函式，輸入 list，回傳等長的結果 list
+        pool: InferencePool（優先於 executor）；max_queue: 等待中的請求上限，0 為不限
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 必須 >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.pool = pool
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._in_flight = 0
+        self._batches = 0
+        self._items = 0
+        self._sizes = Counter()
+        self._last_batch_ms = None
+
+    def _ensure_worker(self):
+        # worker 綁定在目前的事件迴圈上；迴圈換了（例如測試每次請求新開迴圈）就重建
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(self.max_queue)
+            self._worker = loop.create_task(self._run())
+        return loop
+
+    async def submit(self, item):
+        loop = self._ensure_worker()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded(f"語音辨識佇列已滿（{self.max_queue} 個請求等待中）") from None
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [(item, fut) for item, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            self._in_flight = len(items)
+            started = time.perf_counter()
+            try:
+                if self.pool is not None:
+                    results = await self.pool.run(self.batch_fn, items)
+                else:
+                    results = await self._loop.run_in_executor(self.executor, self.batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError("batch_fn 回傳數量與輸入不符")
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for (_, fut), result in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(result)
+            finally:
+                self._in_flight = 0
+                self._batches += 1
+                self._items += len(items)
+                self._sizes[len(items)] += 1
+                self._last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "in_flight": self._in_flight,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._sizes.items())},
+            "last_batch_ms": self._last_batch_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -1,38 +1,92 @@
 import json
+import secrets
 # board.py
+# 棋盤以 bitboard 表示：每位玩家一個 9-bit 整數，第 i 位代表第 i 格（0=a1 … 8=c3）
+
+# 八條連線（橫、直、斜）
+LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),    # 橫
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),    # 直
+    (0, 4, 8), (2, 4, 6),               # 斜
+)
+WIN_MASKS = tuple(sum(1 << i for i in line) for line in LINES)
+FULL_MASK = (1 << 9) - 1
+
+# 預先計算 512 種佔位狀態：是否三連線、空格索引
+WIN_TABLE = tuple(any((m & w) == w for w in WIN_MASKS) for m in range(FULL_MASK + 1))
+EMPTY_CELLS = tuple(
+    tuple(i for i in range(9) if not (m >> i) & 1) for m in range(FULL_MASK + 1)
+)
+
+# 每條線的子數以 2 bit 存在一個整數中（第 l 條線佔第 2l、2l+1 位）；
+# CELL_LINE_INC[i] 為第 i 格所在各條線的 +1 增量，落子時加、移走時減
+CELL_LINE_INC = tuple(
+    sum(1 << (2 * l) for l, line in enumerate(LINES) if i in line) for i in range(9)
+)
+# 某條線子數為 3（0b11）時，該 2 bit 欄位的低位與高位同時為 1
+LINE_LOW_BITS = sum(1 << (2 * l) for l in range(len(LINES)))
+
+POSITIONS = ("a1", "b1", "c1", "a2", "b2", "c2", "a3", "b3", "c3")
+POS_TO_IDX = {pos: idx for idx, pos in enumerate(POSITIONS)}
+
 
 class Board:
+    # GameStore 可能同時保存十萬局以上，用 __slots__ 降低每局的記憶體用量
+    __slots__ = ("masks", "pieces", "line_counts", "max_pieces", "winner", "turn", "game_over",
+                 "version", "nonce", "_render_cache")
+
     def __init__(self):
-        # 初始化棋盤：9 格預設為空白
-        self.board = [' ' for _ in range(9)]
-        # 記錄玩家與 AI 各自的棋子位置（最多 4 個）
+        # 初始化棋盤：兩位玩家的佔位遮罩皆為 0（9 格皆空）
+        self.masks = {'X': 0, 'O': 0}
+        # 記錄玩家與 AI 各自的棋子位置（最多 4 個，依落子先後排序）
         self.pieces = {'X': [], 'O': []}
+        # 每位玩家在 8 條線上的子數（打包成整數），隨落子 / 移子增量更新
+        self.line_counts = {'X': 0, 'O': 0}
         self.max_pieces = 4
         # 新增 winner 屬性
         self.winner = None
         self.turn = "X"
         self.game_over = False
+        # 每次落子、移子或重置都會遞增；用來快取序列化結果
+        self.version = 0
+        # 每個棋盤實體的隨機識別；同一個 id 重新建立棋盤時版本會從 0 重來，靠它區分新舊（ETag 用）
+        self.nonce = secrets.token_hex(4)
+        self._render_cache = (-1, None)
+
+    @property
+    def board(self):
+        # 相容舊介面：由遮罩還原成 9 格字元列表（唯讀快照）
+        x, o = self.masks['X'], self.masks['O']
+        return ['X' if (x >> i) & 1 else 'O' if (o >> i) & 1 else ' ' for i in range(9)]
 
     def display(self):
         # 顯示棋盤畫面
+        cells = self.board
         print("\n棋盤狀態：")
         for i in range(0, 9, 3):
-            print(' | '.join(self.board[i:i+3]))
+            print(' | '.join(cells[i:i+3]))
         print()
 
     def switch_turn(self):
         # 切換回合
         self.turn = "O" if self.turn == "X" else "X"
 
+    def occupied(self):
+        # 雙方棋子的聯集遮罩
+        return self.masks['X'] | self.masks['O']
+
     def place_piece(self, pos, player):
         idx = self.pos_to_idx(pos)
         if idx == -1:
             return False, "無效的位置"
-        if self.board[idx] == ' ':
+        bit = 1 << idx
+        if not self.occupied() & bit:
             if len(self.pieces[player]) >= self.max_pieces:
                 return False, "你已經放滿 4 子，請使用 move_piece()"
-            self.board[idx] = player
+            self.masks[player] |= bit
+            self.line_counts[player] += CELL_LINE_INC[idx]
             self.pieces[player].append(idx)
+            self.version += 1
 
             # 檢查勝負或平手
             result = self.check_game_over()
@@ -59,23 +113,24 @@ class Board:
         to_idx = self.pos_to_idx(to_pos)
         if to_idx == -1:
             return False, "目標位置無效"
-        if self.board[to_idx] != ' ':
+        if self.occupied() & (1 << to_idx):
             return False, "目標位置不是空格"
 
         if from_pos is not None:
             from_idx = self.pos_to_idx(from_pos)
             if from_idx == -1:
                 return False, "起始位置無效"
-            if from_idx not in self.pieces[player]:
+            if not (self.masks[player] >> from_idx) & 1:
                 return False, "起始位置沒有你的棋子"
             self.pieces[player].remove(from_idx)
         else:
             # 取出最舊的棋子
             from_idx = self.pieces[player].pop(0)
 
-        self.board[from_idx] = ' '
-        self.board[to_idx] = player
+        self.masks[player] = (self.masks[player] & ~(1 << from_idx)) | (1 << to_idx)
+        self.line_counts[player] += CELL_LINE_INC[to_idx] - CELL_LINE_INC[from_idx]
         self.pieces[player].append(to_idx)
+        self.version += 1
 
         # 檢查勝負或平手
         self.check_game_over()
@@ -85,24 +140,51 @@ class Board:
             self.switch_turn()
         return success, state
 
+    def to_dict(self):
+        # 可 JSON 序列化的完整狀態（持久化用）；遮罩與連線計數可由 pieces 還原
+        return {
+            "pieces": {'X': list(self.pieces['X']), 'O': list(self.pieces['O'])},
+            "max_pieces": self.max_pieces,
+            "winner": self.winner,
+            "turn": self.turn,
+            "game_over": self.game_over,
+            "version": self.version,
+            "nonce": self.nonce,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        board = cls()
+        for player in ('X', 'O'):
+            cells = list(data["pieces"][player])
+            board.pieces[player] = cells
+            for idx in cells:
+                board.masks[player] |= 1 << idx
+                board.line_counts[player] += CELL_LINE_INC[idx]
+        board.max_pieces = data.get("max_pieces", board.max_pieces)
+        board.winner = data["winner"]
+        board.turn = data["turn"]
+        board.game_over = data["game_over"]
+        board.version = data["version"]
+        board.nonce = data.get("nonce", board.nonce)
+        return board
+
+    def position_key(self):
+        # 可雜湊的局面識別：雙方棋子（依先後順序）與輪到誰
+        return (tuple(self.pieces['X']), tuple(self.pieces['O']), self.turn)
+
     def pos_to_idx(self, pos):
         # 棋盤位置文字 → 索引編號（0～8）
-        mapping = {
-            "a1": 0, "b1": 1, "c1": 2,
-            "a2": 3, "b2": 4, "c2": 5,
-            "a3": 6, "b3": 7, "c3": 8,
-        }
-        return mapping.get(pos.lower(), -1)
+        return POS_TO_IDX.get(pos.lower(), -1)
+
+    def has_line(self, player):
+        # 是否有任一條線滿 3 子；只看增量維護的計數，O(1)
+        counts = self.line_counts[player]
+        return counts & (counts >> 1) & LINE_LOW_BITS != 0
 
     def is_winner(self, player):
         # 判斷玩家是否獲勝（三連線），並更新 winner 屬性
-        b = self.board
-        lines = [
-            [0,1,2], [3,4,5], [6,7,8],    # 橫
-            [0,3,6], [1,4,7], [2,5,8],    # 直
-            [0,4,8], [2,4,6],             # 斜
-        ]
-        win = any(all(b[i] == player for i in line) for line in lines)
+        win = self.has_line(player)
         if win:
             self.winner = player
         return win
@@ -123,46 +205,78 @@ class Board:
 
     def reset(self):
         # 重置棋盤、棋子、勝利者與回合
-        self.board = [' ' for _ in range(9)]
+        self.masks = {'X': 0, 'O': 0}
         self.pieces = {'X': [], 'O': []}
+        self.line_counts = {'X': 0, 'O': 0}
         self.winner = None
         self.turn = "X"
         self.game_over = False
+        self.version += 1
 
     def is_full(self):
-        # 判斷棋盤是否滿了
-        return all(s != ' ' for s in self.board)
+        # 判斷棋盤是否滿了（9 格皆有子）
+        return self.occupied().bit_count() == 9
+
+    def is_empty(self):
+        # 判斷棋盤是否完全沒有棋子
+        return self.occupied() == 0
 
     def available_positions(self):
         # 回傳所有空格的索引位置
-        return [i for i, s in enumerate(self.board) if s == ' ']
+        return list(EMPTY_CELLS[self.occupied()])
 
     def idx_to_pos(self, idx):
         # 索引編號 → 棋盤位置文字（0→a1，8→c3）
-        reverse_map = {
-            0: "a1", 1: "b1", 2: "c1",
-            3: "a2", 4: "b2", 5: "c2",
-            6: "a3", 7: "b3", 8: "c3"
-        }
-        return reverse_map.get(idx, "?")
+        if 0 <= idx < 9:
+            return POSITIONS[idx]
+        return "?"
 
     def get_board_state(self):
         # 回傳字典，每個位置對應其棋子狀態（'X'、'O' 或 None）
+        x, o = self.masks['X'], self.masks['O']
         state = {}
-        for idx in range(9):
-            pos = self.idx_to_pos(idx)
-            val = self.board[idx]
-            state[pos] = val if val in ['X', 'O'] else None
+        for idx, pos in enumerate(POSITIONS):
+            bit = 1 << idx
+            state[pos] = 'X' if x & bit else 'O' if o & bit else None
         # Add winner, is_over, next_player
         state["winner"] = self.winner
         state["is_over"] = self.game_over
         state["next_player"] = self.turn if not self.game_over else None
         return state
 
+    def cells(self):
+        # 9 個字元的棋盤字串（a1 … c3），'.' 為空格
+        x, o = self.masks['X'], self.masks['O']
+        return ''.join('X' if (x >> i) & 1 else 'O' if (o >> i) & 1 else '.' for i in range(9))
+
+    def _rendered(self):
+        # 同一個版本只序列化一次：(狀態字典, JSON 字串, 精簡版 JSON bytes)
+        version, cached = self._render_cache
+        if version != self.version:
+            state = self.get_board_state()
+            compact = {
+                "cells": self.cells(),
+                "winner": self.winner,
+                "turn": self.turn,
+                "over": self.game_over,
+                "version": self.version,
+            }
+            cached = (
+                state,
+                json.dumps(state, ensure_ascii=False),
+                json.dumps(compact, separators=(",", ":")).encode("utf-8"),
+            )
+            self._render_cache = (self.version, cached)
+        return cached
+
     def render(self):
-        # 直接回傳棋盤狀態字典
-        return self.get_board_state()
+        # 直接回傳棋盤狀態字典（同一版本共用快取，呼叫端請勿修改）
+        return self._rendered()[0]
 
     def render_string(self):
         # 回傳棋盤狀態的 JSON 字串
-        return json.dumps(self.get_board_state(), ensure_ascii=False)
\ No newline at end of file
+        return self._rendered()[1]
+
+    def render_compact(self):
+        # 精簡版狀態（已編碼的 JSON bytes）：cells 以 9 個字元表示，'.' 為空格
+        return self._rendered()[2]
@@ -0,0 +1,84 @@
+# events.py
+# 每局的事件推播：WebSocket 連線訂閱某一局，任何端點改動棋盤後只推送差異
+#
+# publish() 可能在執行緒池（同步端點）或事件迴圈中被呼叫，
+# 一律透過 loop.call_soon_threadsafe 把事件交給訂閱者所在的事件迴圈。
+import asyncio
+import threading
+
+from app.core.board import POSITIONS
+
+
+def board_delta(game_id, before_cells, board):
+    """
+    與 before_cells（Board.cells() 的快照）比較，只列出有變動的格子；空格以 None 表示
+    """
+    after = board.cells()
+    changed = {
+        POSITIONS[i]: (None if cell == '.' else cell)
+        for i, (old, cell) in enumerate(zip(before_cells, after)) if old != cell
+    }
+    return {
+        "type": "delta",
+        "game_id": game_id,
+        "version": board.version,
+        "changed": changed,
+        "winner": board.winner,
+        "turn": board.turn,
+        "over": board.game_over,
+    }
+
+
+class Subscription:
+    def __init__(self, game_id, maxsize):
+        self.game_id = game_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def offer(self, event):
+        # 在訂閱者的事件迴圈中執行；佇列滿了代表客戶端太慢，改送 resync 要求重抓完整狀態
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync", "game_id": self.game_id}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class GameEvents:
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subs = {}  # game_id -> set(Subscription)
+
+    def subscribe(self, game_id):
+        # 需在事件迴圈中呼叫
+        sub = Subscription(game_id, self.queue_size)
+        with self._lock:
+            self._subs.setdefault(game_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.game_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.game_id]
+
+    def publish(self, game_id, event):
+        with self._lock:
+            subs = list(self._subs.get(game_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                self.unsubscribe(sub)  # 事件迴圈已關閉
+
+    def subscribers(self, game_id=None):
+        with self._lock:
+            if game_id is not None:
+                return len(self._subs.get(game_id, ()))
+            return sum(len(subs) for subs in self._subs.values())
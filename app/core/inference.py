@@ -0,0 +1,95 @@
+# inference.py
+# 專用的推論執行緒池：模型呼叫與 AI 搜尋不佔用 Starlette 的請求執行緒池，
+# 慢的推論最多只會塞滿自己的池，不會拖垮便宜的遊戲端點。
+#
+# - 同時排隊 + 執行中的工作數上限為 max_pending，超過時立即丟出 Overloaded（→ 503）
+# - 每個工作有逾時（→ 504）；逾時或呼叫端被取消時，尚未開始的工作會從佇列中移除。
+#   已在執行的工作無法強制中止（執行緒不能被殺掉），會跑完但結果被丟棄，
+#   這段期間仍計入 max_pending，因此池不會被逾時的工作無限堆疊。
+#
+# 選用執行緒池而非行程池：模型在行程內延遲載入一次（LazyModel），torch 推論期間會釋放 GIL，
+# 多個行程則會讓每個 worker 各載一份 Whisper / gpt2。
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(RuntimeError):
+    pass
+
+
+class InferenceTimeout(TimeoutError):
+    pass
+
+
+class InferencePool:
+    def __init__(self, name, max_workers=2, max_pending=32, timeout=30.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _call(self, fn, args):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, timeout=None):
+        """
+        在池中執行 fn(*args) 並等待結果；timeout 為 None 時使用池的預設值
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(f"{self.name} 忙碌中（{self._pending} 個工作排隊或執行中）")
+            self._pending += 1
+        future = self.executor.submit(self._call, fn, args)
+        future.add_done_callback(self._release)
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), limit)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise InferenceTimeout(f"{self.name} 超過 {limit:g} 秒未完成") from None
+        except asyncio.CancelledError:
+            future.cancel()
+            with self._lock:
+                self.cancelled += 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "timeout": self.timeout,
+                "pending": self._pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,262 @@
+# metrics.py
+# 輕量的 Prometheus 指標（不依賴 prometheus_client）：Counter / Gauge / Histogram，
+# 以 /metrics 輸出文字格式。每次記錄只有一次 dict 查找與整數加法，可長期開啟。
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# 預設的延遲分桶（秒）：涵蓋微秒級的棋盤操作到數秒的模型推論
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    @contextmanager
+    def track(self, *labels):
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class GaugeFunc(_Metric):
+    """
+    抓取時才呼叫 fn() 取值；fn 回傳數值，或 {label 值 tuple: 數值}
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self):
+        result = self.fn()
+        if not isinstance(result, dict):
+            result = {(): result}
+        lines = self._header()
+        for labels, value in sorted(result.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [各分桶計數（最後一格為 +Inf）, 總和, 次數]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels):
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._values.items())
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標 {metric.name} 已註冊")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def gauge_func(self, name, help, fn, labelnames=()):
+        return self._add(GaugeFunc(name, help, fn, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_ERRORS = REGISTRY.counter(
+    "http_request_errors_total", "HTTP responses with status >= 400 (unhandled exceptions count as 500)",
+    ("route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served")
+MODEL_LATENCY = REGISTRY.histogram(
+    "model_inference_duration_seconds", "Model call latency (asr / llm)", ("model", "op"))
+MODEL_IN_FLIGHT = REGISTRY.gauge("model_inference_in_flight", "Model calls currently running", ("model",))
+MODEL_ERRORS = REGISTRY.counter("model_inference_errors_total", "Model calls that raised", ("model", "op"))
+BOARD_LATENCY = REGISTRY.histogram(
+    "board_operation_duration_seconds", "Board / AI operation latency", ("op",))
+
+
+@contextmanager
+def model_timer(model, op):
+    """
+    包住一次模型呼叫：記錄延遲、進行中數量與例外次數
+    """
+    MODEL_IN_FLIGHT.inc(model)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        MODEL_ERRORS.inc(model, op)
+        raise
+    finally:
+        MODEL_LATENCY.observe(time.perf_counter() - started, model, op)
+        MODEL_IN_FLIGHT.dec(model)
+
+
+class MetricsMiddleware:
+    """
+    純 ASGI middleware（不經過 BaseHTTPMiddleware，開銷較低）：
+    route 標籤取路由樣板（例如 /games/{game_id}），避免每個 game_id 各自成為一組時間序列
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status[0] = 500
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_LATENCY.observe(elapsed, path, method)
+            HTTP_REQUESTS.inc(path, method, str(status[0]))
+            if status[0] >= 400:
+                HTTP_ERRORS.inc(path, method, str(status[0]))
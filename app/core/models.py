@@ -0,0 +1,90 @@
+# models.py
+# 延遲載入的模型：import 時不碰 torch/transformers，第一次使用或背景預熱時才載入
+import threading
+import time
+
+
+class ModelUnavailable(RuntimeError):
+    pass
+
+
+class LazyModel:
+    """
+    包裝一個載入函式；get() 第一次呼叫時才載入，之後直接回傳同一個實例
+    狀態：unloaded → loading → ready / error（error 時下次 get() 會再試一次）
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._model = None
+        self.state = "unloaded"
+        self.error = None
+        self.load_seconds = None
+
+    def get(self):
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None:
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    self._model = self._loader()
+                except Exception as e:
+                    self.state = "error"
+                    self.error = str(e)
+                    raise ModelUnavailable(f"模型 {self.name} 載入失敗: {e}") from e
+                self.load_seconds = time.perf_counter() - started
+                self.state = "ready"
+                self.error = None
+        return self._model
+
+    def set(self, model):
+        # 直接注入現成的模型（測試、基準測試用的替身）
+        with self._lock:
+            self._model = model
+            self.state = "ready"
+            self.error = None
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def status(self):
+        return {"state": self.state, "error": self.error, "load_seconds": self.load_seconds}
+
+
+MODELS = {}
+
+
+def register(name, loader):
+    model = LazyModel(name, loader)
+    MODELS[name] = model
+    return model
+
+
+def warm_up(names=None):
+    """
+    在背景執行緒依序載入模型，不阻塞啟動；回傳該執行緒
+    """
+    def run():
+        for name in names or list(MODELS):
+            try:
+                MODELS[name].get()
+            except ModelUnavailable:
+                pass  # 狀態已記錄在 LazyModel.error，由 /readyz 回報
+
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def models_status():
+    return {name: model.status() for name, model in MODELS.items()}
+
+
+def all_ready():
+    return all(model.ready for model in MODELS.values())
@@ -0,0 +1,204 @@
+# movelog.py
+# 只增不改的二進位走法紀錄：每筆固定 24 bytes，批次寫入，以 mmap + NumPy 讀取與重播
+#
+# 檔案格式（little-endian）：
+#   header  : magic "TTML"、版本(1B)、保留(3B)
+#   record  : game_id(16s) ply(u4) action(u1) from(i1) to(i1) player(u1)
+# game_id 超過 16 bytes 時改存其 blake2b 雜湊（16 個十六進位字元）；ply 為該步之後的 board.version。
+# 寫入只 flush 到 OS，不逐筆 fsync；行程崩潰時最多遺失尚未 flush 的那一批，
+# 檔尾不完整的紀錄在讀取時會被忽略。
+import argparse
+import atexit
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from app.core.board import Board, POSITIONS
+
+MAGIC = b"TTML"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sB3x")
+RECORD = struct.Struct("<16sIBbbB")
+RECORD_DTYPE = np.dtype([
+    ("game_id", "S16"), ("ply", "<u4"), ("action", "u1"),
+    ("from", "i1"), ("to", "i1"), ("player", "u1"),
+])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+PLACE, MOVE, RESET = 0, 1, 2
+ACTIONS = ("place", "move", "reset")
+PLAYERS = ("X", "O")
+NO_CELL = -1
+
+
+def encode_game_id(game_id):
+    raw = game_id.encode("utf-8")
+    if len(raw) > 16:
+        raw = hashlib.blake2b(raw, digest_size=8).hexdigest().encode("ascii")
+    return raw
+
+
+def _cell(pos):
+    return NO_CELL if pos is None else POSITIONS.index(pos.lower())
+
+
+class MoveLog:
+    """
+    append() 只把紀錄打包進記憶體緩衝區；累積 flush_records 筆或每 flush_interval 秒
+    由背景執行緒寫入檔案一次。檔案在第一次寫入時才開啟
+    """
+
+    def __init__(self, path, flush_records=512, flush_interval=0.05):
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._buffer = bytearray()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        atexit.register(self.close)
+
+    def append(self, game_id, ply, action, player, from_pos=None, to_pos=None):
+        record = RECORD.pack(encode_game_id(game_id), ply, ACTIONS.index(action),
+                             _cell(from_pos), _cell(to_pos), PLAYERS.index(player))
+        with self._lock:
+            self._buffer += record
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="move-log", daemon=True)
+                self._thread.start()
+            if self._pending >= self.flush_records:
+                self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "ab")
+        if f.tell() == 0:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        return f
+
+    def flush(self, sync=False):
+        with self._lock:
+            if not self._buffer:
+                return
+            data, count = bytes(self._buffer), self._pending
+            self._buffer.clear()
+            self._pending = 0
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(data)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            self.written += count
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush(sync=True)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {"path": self.path, "written": self.written, "pending": self._pending}
+
+
+class MoveLogReader:
+    """
+    以 mmap 讀取整個紀錄檔，records 為 NumPy 結構化陣列（零複製）
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"{path} 不是走法紀錄檔")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} 不是走法紀錄檔")
+        count = (size - HEADER.size) // RECORD.size  # 忽略檔尾不完整的紀錄
+        self.records = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        self.records = None
+        self._mm.close()
+        self._file.close()
+
+    def games(self):
+        return [g.decode("utf-8") for g in np.unique(self.records["game_id"])]
+
+    def game(self, game_id):
+        # 某一局的所有紀錄（依寫入順序）
+        return self.records[self.records["game_id"] == encode_game_id(game_id)]
+
+    def action_counts(self):
+        counts = np.bincount(self.records["action"], minlength=len(ACTIONS))
+        return {name: int(counts[i]) for i, name in enumerate(ACTIONS)}
+
+    def replay(self, game_id, board_factory=Board):
+        """
+        依紀錄重建某一局；只會從最後一次 reset 之後開始重播
+        """
+        records = self.game(game_id)
+        resets = np.flatnonzero(records["action"] == RESET)
+        if len(resets):
+            records = records[resets[-1] + 1:]
+        board = board_factory()
+        for ply, action, from_idx, to_idx, player in zip(
+                records["ply"].tolist(), records["action"].tolist(), records["from"].tolist(),
+                records["to"].tolist(), records["player"].tolist()):
+            player = PLAYERS[player]
+            if action == PLACE:
+                success, msg = board.place_piece(POSITIONS[to_idx], player)
+            else:
+                success, msg = board.move_piece(POSITIONS[to_idx], player, POSITIONS[from_idx])
+            if not success:
+                raise ValueError(f"第 {ply} 步無法重播: {msg}")
+        return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="走法紀錄統計與重播")
+    parser.add_argument("path", nargs="?", default="data/moves.log")
+    parser.add_argument("--replay", metavar="GAME_ID", help="重播某一局並印出棋盤")
+    args = parser.parse_args(argv)
+    reader = MoveLogReader(args.path)
+    if args.replay:
+        board = reader.replay(args.replay)
+        board.display()
+        print(f"winner={board.winner} turn={board.turn} over={board.game_over}")
+        return
+    started = time.perf_counter()
+    counts = reader.action_counts()
+    games = len(np.unique(reader.records["game_id"]))
+    seconds = time.perf_counter() - started
+    print(f"{len(reader)} records, {games} games, {counts} (scanned in {seconds * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
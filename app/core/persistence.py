@@ -0,0 +1,216 @@
+# persistence.py
+# 以 SQLite 保存每局的快照，讓重啟或重新部署後遊戲仍在
+#
+# 請求路徑上只做記憶體操作：save() 把快照放進 dirty 字典（同一局多次落子只保留最新一份），
+# 背景執行緒每 flush_interval 秒把累積的快照用一個 transaction 批次寫入。
+# 讀取（GameStore 記憶體中找不到時才會呼叫）先看尚未寫入的快照，再查 SQLite。
+#
+# SQLiteSharedState 則是多個 worker / 行程共用的狀態：每次寫入直接進 SQLite，
+# 以 version 做 compare-and-swap，不需要跨行程的全域鎖（見 GameStore 的 shared 參數）。
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.board import Board
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    state   TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+class SQLiteGameRepository:
+    def __init__(self, path, flush_interval=0.05, board_factory=Board):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.board_factory = board_factory
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db_lock = threading.Lock()     # sqlite3 連線不可同時被多個執行緒使用
+        self._dirty = {}                     # game_id → (version, state json)
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.saves = 0
+        self.writes = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="game-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, game_id, board):
+        """
+        記錄最新快照（需在持有該局鎖時呼叫）；實際寫入由背景執行緒完成
+        """
+        state = json.dumps(board.to_dict(), separators=(",", ":"))
+        with self._dirty_lock:
+            self._dirty[game_id] = (board.version, state)
+            self.saves += 1
+
+    def load(self, game_id):
+        """
+        讀回某一局；不存在時回傳 None
+        """
+        with self._dirty_lock:
+            pending = self._dirty.get(game_id)
+        if pending is not None:
+            state = pending[1]
+        else:
+            with self._db_lock:
+                row = self._db.execute("SELECT state FROM games WHERE game_id = ?", (game_id,)).fetchone()
+            if row is None:
+                return None
+            state = row[0]
+        return self.board_factory.from_dict(json.loads(state))
+
+    def delete(self, game_id):
+        with self._dirty_lock:
+            self._dirty.pop(game_id, None)
+        with self._db_lock:
+            self._db.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        # 先取得連線鎖再取出 dirty，確保批次依序寫入，舊快照不會蓋掉新的
+        with self._db_lock:
+            with self._dirty_lock:
+                if not self._dirty:
+                    return 0
+                batch, self._dirty = self._dirty, {}
+            now = time.time()
+            rows = [(game_id, state, version, now) for game_id, (version, state) in batch.items()]
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO games (game_id, state, version, updated) VALUES (?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+        self.writes += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def stats(self):
+        with self._dirty_lock:
+            pending = len(self._dirty)
+        return {
+            "path": self.path,
+            "pending": pending,
+            "saves": self.saves,
+            "writes": self.writes,
+            "batches": self.batches,
+            # 平均每次寫入合併了幾次 save
+            "coalescing": round(self.saves / self.writes, 3) if self.writes else None,
+        }
+
+
+class SQLiteSharedState:
+    """
+    多個 worker 共用的遊戲狀態（本機檔案版）。每個執行緒各自開一條連線，
+    寫入是單一條 UPSERT：只有資料庫中的 version 仍等於呼叫端讀到的版本時才會生效
+    """
+
+    def __init__(self, path, board_factory=Board, busy_timeout=5.0):
+        self.path = path
+        self.board_factory = board_factory
+        self.busy_timeout = busy_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._conn().execute(SCHEMA)
+        self.commits = 0
+        self.conflicts = 0
+        self.refreshes = 0
+        atexit.register(self.close)
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def load(self, game_id):
+        row = self._conn().execute("SELECT state FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return None if row is None else self.board_factory.from_dict(json.loads(row[0]))
+
+    def load_if_changed(self, game_id, version):
+        """
+        資料庫中的版本與 version 不同時回傳最新的 Board，否則回傳 None（一次查詢）
+        """
+        row = self._conn().execute(
+            "SELECT state FROM games WHERE game_id = ? AND version != ?", (game_id, version)).fetchone()
+        if row is None:
+            return None
+        self.refreshes += 1
+        return self.board_factory.from_dict(json.loads(row[0]))
+
+    def compare_and_swap(self, game_id, expected_version, board):
+        """
+        資料庫中該局的版本仍是 expected_version（或還沒有這一局）時寫入 board 並回傳 True；
+        已被其他 worker 改過則不寫入、回傳 False
+        """
+        state = json.dumps(board.to_dict(), separators=(",", ":"))
+        cursor = self._conn().execute(
+            "INSERT INTO games (game_id, state, version, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(game_id) DO UPDATE SET state = excluded.state, version = excluded.version, "
+            "updated = excluded.updated WHERE games.version = ?",
+            (game_id, state, board.version, time.time(), expected_version))
+        if cursor.rowcount == 1:
+            self.commits += 1
+            return True
+        self.conflicts += 1
+        return False
+
+    def delete(self, game_id):
+        self._conn().execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def stats(self):
+        return {"path": self.path, "commits": self.commits, "conflicts": self.conflicts,
+                "refreshes": self.refreshes}
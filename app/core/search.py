@@ -0,0 +1,354 @@
+# search.py
+# 搜尋式 AI：迭代加深 alpha-beta 與 MCTS
+#
+# 兩者都在不可變的局面 (X 序列, O 序列, 輪到誰) 上搜尋（走法規則同 solver.legal_moves），
+# 每一步都產生新的 tuple，因此永遠不會修改呼叫端的 Board。
+# 兩種搜尋共用同一個置換表（以雙方佔位遮罩為 key，執行緒間共用時加鎖），並受每步的時間 / 節點數上限約束。
+import math
+import random
+import threading
+import time
+
+from app.core.board import LINES, WIN_TABLE
+from app.core.solver import SIDES, decode_move, legal_moves
+
+WIN_SCORE = 1000
+MATE_THRESHOLD = WIN_SCORE - 200
+MAX_DEPTH = 64
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# 連線評估：只有己方棋子的線依子數加分，只有對方棋子的線扣分
+LINE_WEIGHTS = (0, 1, 10, 0)
+
+
+def _mask(seq):
+    mask = 0
+    for cell in seq:
+        mask |= 1 << cell
+    return mask
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class TranspositionTable:
+    """
+    以局面為 key 的共用置換表；超過容量時整表清空（簡單的世代淘汰）
+    key = (用途 "ab" / "mcts", max_pieces, X 遮罩, O 遮罩, 輪到誰)：兩種搜尋共用同一份容量；
+    走法只看佔了哪些格子，以遮罩為 key 讓不同落子順序走到的同一局面共用結果；
+    同一局面在不同子數上限下的走法不同，max_pieces 也是 key 的一部分
+    search_pool 的多個執行緒共用同一張表，存取都在鎖內進行
+    """
+
+    def __init__(self, maxsize=1_000_000):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.probes = 0
+
+    def get(self, key):
+        with self._lock:
+            self.probes += 1
+            entry = self._data.get(key)
+            if entry is not None:
+                self.hits += 1
+            return entry
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def setdefault(self, key, default):
+        # 取出 key 的值；沒有時放入 default 並回傳它（查與放之間不會被其他執行緒插入）
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = default
+                self._store(key, entry)
+            return entry
+
+    def _store(self, key, value):
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._data.clear()
+        self._data[key] = value
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _tt_key(tag, max_pieces, xs, os_, side):
+    return (tag, max_pieces, _mask(xs), _mask(os_), side)
+
+
+class SearchResult:
+    __slots__ = ("move", "score", "depth", "nodes", "seconds", "strategy")
+
+    def __init__(self, strategy, move, score, depth, nodes, seconds):
+        self.strategy = strategy
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+
+    def info(self):
+        return {
+            "strategy": self.strategy,
+            "score": self.score,
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "time_ms": round(self.seconds * 1000, 3),
+            "nodes_per_sec": round(self.nodes / self.seconds) if self.seconds > 0 else None,
+        }
+
+
+def position_from_board(board, player):
+    return tuple(board.pieces['X']), tuple(board.pieces['O']), SIDES.index(player)
+
+
+def evaluate(xs, os_, side):
+    """
+    靜態評估（以輪到的一方為正）
+    """
+    x_mask, o_mask = _mask(xs), _mask(os_)
+    score = 0
+    for line in LINES:
+        x_count = sum((x_mask >> i) & 1 for i in line)
+        o_count = sum((o_mask >> i) & 1 for i in line)
+        if o_count == 0:
+            score += LINE_WEIGHTS[x_count]
+        elif x_count == 0:
+            score -= LINE_WEIGHTS[o_count]
+    return score if side == 0 else -score
+
+
+def _to_tt(score, ply):
+    # 勝負分數改存成「相對此節點」的距離，取出時再換回
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _from_tt(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class _Budget:
+    def __init__(self, time_ms, max_nodes):
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_ms / 1000.0
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes >= self.max_nodes or \
+                (self.nodes & 255 == 0 and time.perf_counter() > self.deadline):
+            raise BudgetExceeded
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class AlphaBeta:
+    def __init__(self, tt, max_pieces=4):
+        self.tt = tt
+        self.max_pieces = max_pieces
+
+    def _negamax(self, xs, os_, side, depth, alpha, beta, ply, budget):
+        budget.tick()
+        if WIN_TABLE[_mask(os_ if side == 0 else xs)]:
+            return -(WIN_SCORE - ply)  # 上一手已連線
+        if depth == 0:
+            return evaluate(xs, os_, side)
+
+        key = _tt_key("ab", self.max_pieces, xs, os_, side)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_score, e_flag, tt_move = entry
+            if e_depth >= depth:
+                e_score = _from_tt(e_score, ply)
+                if e_flag == EXACT:
+                    return e_score
+                if e_flag == LOWER:
+                    alpha = max(alpha, e_score)
+                else:
+                    beta = min(beta, e_score)
+                if alpha >= beta:
+                    return e_score
+
+        moves = legal_moves(xs, os_, side, self.max_pieces)
+        if tt_move is not None:
+            moves.sort(key=lambda m: m[0] != tt_move)
+        alpha0 = alpha
+        best, best_move = -math.inf, None
+        for code, nxs, nos in moves:
+            score = -self._negamax(nxs, nos, 1 - side, depth - 1, -beta, -alpha, ply + 1, budget)
+            if score > best:
+                best, best_move = score, code
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        self.tt.put(key, (depth, _to_tt(best, ply), flag, best_move))
+        return best
+
+    def search(self, xs, os_, side, time_ms=200, max_nodes=200_000):
+        """
+        迭代加深：每完成一層就記下最佳走法，預算用完時回傳最後一個完整層的結果
+        """
+        budget = _Budget(time_ms, max_nodes)
+        moves = legal_moves(xs, os_, side, self.max_pieces)
+        best_move, best_score, completed = (moves[0][0] if moves else None), 0, 0
+        try:
+            for depth in range(1, MAX_DEPTH + 1):
+                alpha, beta = -math.inf, math.inf
+                iter_best, iter_move = -math.inf, None
+                # 上一層的最佳走法先搜，提高剪枝效率
+                moves.sort(key=lambda m: m[0] != best_move)
+                for code, nxs, nos in moves:
+                    score = -self._negamax(nxs, nos, 1 - side, depth - 1, -beta, -alpha, 1, budget)
+                    if score > iter_best:
+                        iter_best, iter_move = score, code
+                    alpha = max(alpha, score)
+                best_move, best_score, completed = iter_move, iter_best, depth
+                if abs(best_score) > MATE_THRESHOLD:
+                    break  # 已找到必勝 / 必敗，再加深也不會改變結果
+        except BudgetExceeded:
+            pass
+        return SearchResult("alphabeta", best_move, best_score, completed, budget.nodes, budget.elapsed())
+
+    def evaluate_moves(self, xs, os_, side, time_ms=200, max_nodes=200_000):
+        """
+        替每個合法走法算出精確分數（每個子局面都用完整視窗搜尋，不做根節點剪枝）
+        回傳 ({走法編碼: 分數}, 完成的深度, 節點數)；預算用完時回傳最後一個完整層的結果
+        """
+        budget = _Budget(time_ms, max_nodes)
+        moves = legal_moves(xs, os_, side, self.max_pieces)
+        scores, completed = {}, 0
+        try:
+            for depth in range(1, MAX_DEPTH + 1):
+                scores = {code: -self._negamax(nxs, nos, 1 - side, depth - 1, -math.inf, math.inf, 1, budget)
+                          for code, nxs, nos in moves}
+                completed = depth
+                if all(abs(score) > MATE_THRESHOLD for score in scores.values()):
+                    break  # 每個走法都已分出勝負
+        except BudgetExceeded:
+            pass
+        return scores, completed, budget.nodes
+
+
+class MCTS:
+    """
+    UCT 蒙地卡羅樹搜尋；節點統計 [造訪次數, 累計分數] 存在共用置換表中，
+    分數以「走進此局面的一方」為正，因此不同路徑走到同一局面會共用統計
+    """
+
+    def __init__(self, tt, max_pieces=4, exploration=1.4, rollout_limit=40, rng=None):
+        self.tt = tt
+        self.max_pieces = max_pieces
+        self.exploration = exploration
+        self.rollout_limit = rollout_limit
+        self.rng = rng or random.Random()
+
+    def _stats(self, xs, os_, side):
+        return self.tt.setdefault(_tt_key("mcts", self.max_pieces, xs, os_, side), [0, 0.0])
+
+    def _rollout(self, xs, os_, side, budget):
+        # 隨機走到有人連線或達步數上限（視為和局）；回傳以 side 為正的結果
+        start_side = side
+        for _ in range(self.rollout_limit):
+            budget.tick()
+            if WIN_TABLE[_mask(os_ if side == 0 else xs)]:
+                return -1.0 if side == start_side else 1.0
+            _, xs, os_ = self.rng.choice(legal_moves(xs, os_, side, self.max_pieces))
+            side = 1 - side
+        return 0.0
+
+    def _iterate(self, root, budget):
+        # 選擇 → 展開 → 隨機模擬 → 反向傳播
+        path = [root]
+        xs, os_, side = root
+        visited = {(_mask(xs), _mask(os_), side)}  # 以佔位判斷重複局面，與落子順序無關
+        while True:
+            budget.tick()
+            if WIN_TABLE[_mask(os_ if side == 0 else xs)]:
+                value = -1.0  # 上一手已連線，輪到的一方已輸
+                break
+            if len(path) > 1 and self._stats(xs, os_, side)[0] == 0:
+                value = self._rollout(xs, os_, side, budget)  # 新展開的葉節點
+                break
+            if len(path) > MAX_DEPTH:
+                value = 0.0
+                break
+            parent_visits = self._stats(xs, os_, side)[0]
+            child, best_uct = None, -math.inf
+            for _, nxs, nos in legal_moves(xs, os_, side, self.max_pieces):
+                stats = self.tt.get(_tt_key("mcts", self.max_pieces, nxs, nos, 1 - side))
+                if stats is None or stats[0] == 0:
+                    child = (nxs, nos, 1 - side)
+                    break
+                uct = stats[1] / stats[0] + self.exploration * math.sqrt(math.log(parent_visits + 1) / stats[0])
+                if uct > best_uct:
+                    child, best_uct = (nxs, nos, 1 - side), uct
+            path.append(child)
+            xs, os_, side = child
+            position = (_mask(xs), _mask(os_), side)
+            if position in visited:
+                value = 0.0  # 走回重複局面，視為和局
+                break
+            visited.add(position)
+        # 反向傳播：value 以 path 最後一個局面「輪到的一方」為正；
+        # 統計存成「走進此局面的一方」的分數
+        for position in reversed(path):
+            stats = self._stats(*position)
+            stats[0] += 1
+            stats[1] -= value
+            value = -value
+
+    def search(self, xs, os_, side, time_ms=200, max_nodes=200_000):
+        budget = _Budget(time_ms, max_nodes)
+        root = (xs, os_, side)
+        iterations = 0
+        try:
+            while True:
+                self._iterate(root, budget)
+                iterations += 1
+        except BudgetExceeded:
+            pass
+        best_move, best_visits, best_score = None, -1, 0.0
+        for code, nxs, nos in legal_moves(xs, os_, side, self.max_pieces):
+            stats = self.tt.get(_tt_key("mcts", self.max_pieces, nxs, nos, 1 - side))
+            visits = stats[0] if stats else 0
+            if visits > best_visits:
+                best_move, best_visits = code, visits
+                best_score = stats[1] / stats[0] if stats and stats[0] else 0.0
+        return SearchResult("mcts", best_move, round(best_score, 4), iterations, budget.nodes, budget.elapsed())
+
+
+# 所有請求共用的置換表：同一局的連續走法可以沿用上一步的搜尋結果
+shared_tt = TranspositionTable()
+
+
+def search_move(board, player, strategy="alphabeta", time_ms=200, max_nodes=200_000):
+    """
+    在 Board 的快照上搜尋，回傳 (from_pos, to_pos, SearchResult)
+    """
+    xs, os_, side = position_from_board(board, player)
+    engine_cls = AlphaBeta if strategy == "alphabeta" else MCTS
+    result = engine_cls(shared_tt, board.max_pieces).search(xs, os_, side, time_ms, max_nodes)
+    if result.move is None:
+        return None, None, result
+    from_idx, to_idx = decode_move(result.move)
+    from_pos = None if from_idx is None else board.idx_to_pos(from_idx)
+    return from_pos, board.idx_to_pos(to_idx), result
@@ -0,0 +1,141 @@
+# simulator.py
+# 向量化自我對弈模擬器：以 NumPy 陣列同時推進 N 局，用來大量評估 AI 策略
+#
+# 規則與 Board 相同：X 先手；子數未滿 max_pieces 時放子，之後把「最舊的棋子」
+# （或 move_from="random" 時任一顆自己的棋子）移到空格；下完立即判斷勝負，
+# 分出勝負後不再換手。
+import numpy as np
+
+from app.core.board import LINES
+
+LINE_CELLS = np.array(LINES, dtype=np.intp)   # (8, 3)
+EMPTY, X, O = 0, 1, 2
+NO_WINNER = -1
+
+
+def random_policy(owner, player, rng):
+    """
+    在每局的空格中均勻隨機選一格；owner 為 (n, 9)，回傳 (n,) 的目標格索引
+    """
+    keys = rng.random(owner.shape)
+    keys[owner != EMPTY] = -1.0
+    return keys.argmax(axis=1)
+
+
+class SimulationResult:
+    def __init__(self, winner, done, plies, history=None):
+        self.winner = winner          # (N,)：0 = X、1 = O、-1 = 和局或未結束
+        self.done = done              # (N,)：是否已分出勝負（或和局）
+        self.plies = plies            # (N,)：每局實際走的步數
+        self.history = history        # (max_plies, N, 2)：每步的 (from, to)，放子時 from = -1
+
+    def summary(self):
+        finished = self.done
+        n = len(self.winner)
+        return {
+            "games": int(n),
+            "x_wins": int((self.winner == 0).sum()),
+            "o_wins": int((self.winner == 1).sum()),
+            "draws": int(((self.winner == NO_WINNER) & finished).sum()),
+            "unfinished": int((~finished).sum()),
+            "mean_plies": float(self.plies[finished].mean()) if finished.any() else None,
+        }
+
+
+class SelfPlaySimulator:
+    def __init__(self, n_games, max_pieces=4, move_from="oldest", seed=None):
+        if move_from not in ("oldest", "random"):
+            raise ValueError("move_from 必須是 oldest 或 random")
+        self.n = n_games
+        self.max_pieces = max_pieces
+        self.move_from = move_from
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        n, k = self.n, self.max_pieces
+        self.owner = np.zeros((n, 9), dtype=np.int8)
+        # 每位玩家的棋子佇列（最舊在前），counts 為佇列長度
+        self.queue = np.full((n, 2, k), -1, dtype=np.int8)
+        self.counts = np.zeros((n, 2), dtype=np.int8)
+        self.turn = np.zeros(n, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+        self.winner = np.full(n, NO_WINNER, dtype=np.int8)
+        self.plies = np.zeros(n, dtype=np.int32)
+
+    def _place(self, games, player, targets):
+        slot = self.counts[games, player]
+        self.queue[games, player, slot] = targets
+        self.counts[games, player] += 1
+        self.owner[games, targets] = player + 1
+
+    def _move(self, games, player, targets):
+        k = self.max_pieces
+        queues = self.queue[games, player]                       # (m, k)
+        if self.move_from == "oldest":
+            picked = np.zeros(len(games), dtype=np.intp)
+        else:
+            picked = self.rng.integers(0, k, size=len(games))
+        sources = queues[np.arange(len(games)), picked]
+        # 移除被選中的棋子、其餘往前補，最後接上新位置（與 list.remove + append 相同）
+        keep = np.arange(k)[None, :] != picked[:, None]
+        remaining = queues[keep].reshape(len(games), k - 1)
+        self.queue[games, player] = np.concatenate([remaining, targets[:, None].astype(np.int8)], axis=1)
+        self.owner[games, sources] = EMPTY
+        self.owner[games, targets] = player + 1
+        return sources
+
+    def step(self, policy=random_policy):
+        """
+        推進所有未結束的局一步；回傳 (games, from, to)，放子時 from 為 -1
+        """
+        games = np.flatnonzero(~self.done)
+        if len(games) == 0:
+            return games, games, games
+        player = self.turn[games]
+        sources = np.full(len(games), -1, dtype=np.intp)
+        targets = np.full(len(games), -1, dtype=np.intp)
+        # 所有未結束的局回合數相同，但仍依每局的 turn 分組，保持通用
+        for p in (0, 1):
+            sel = player == p
+            if not sel.any():
+                continue
+            g = games[sel]
+            t = policy(self.owner[g], p, self.rng)
+            placing = self.counts[g, p] < self.max_pieces
+            if placing.any():
+                self._place(g[placing], p, t[placing])
+            if (~placing).any():
+                sources[np.flatnonzero(sel)[~placing]] = self._move(g[~placing], p, t[~placing])
+            targets[sel] = t
+
+        self.plies[games] += 1
+        # 只有剛下完的一方可能連線
+        cells = self.owner[games][:, LINE_CELLS]                 # (m, 8, 3)
+        won = (cells == (player + 1)[:, None, None]).all(axis=2).any(axis=1)
+        full = (self.owner[games] != EMPTY).all(axis=1)
+        over = won | full
+        self.winner[games[won]] = player[won]
+        self.done[games[over]] = True
+        still = games[~over]
+        self.turn[still] = 1 - self.turn[still]
+        return games, sources, targets
+
+    def run(self, max_plies=200, policy=random_policy, record=False):
+        history = np.full((max_plies, self.n, 2), -1, dtype=np.int8) if record else None
+        for ply in range(max_plies):
+            games, sources, targets = self.step(policy)
+            if len(games) == 0:
+                break
+            if record:
+                history[ply, games, 0] = sources
+                history[ply, games, 1] = targets
+        return SimulationResult(self.winner.copy(), self.done.copy(), self.plies.copy(), history)
+
+
+def simulate(n_games, max_plies=200, max_pieces=4, move_from="oldest", seed=None):
+    """
+    便捷函式：跑 n_games 局隨機自我對弈並回傳彙總結果
+    """
+    sim = SelfPlaySimulator(n_games, max_pieces=max_pieces, move_from=move_from, seed=seed)
+    return sim.run(max_plies).summary()
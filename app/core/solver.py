@@ -0,0 +1,311 @@
+# solver.py
+# 「每方最多 N 子、超過就移子」變體的離線逆推（retrograde）求解器與查表
+#
+# 規則同 Board：子數未滿 N 時放子，滿了之後把自己任一顆棋子移到空格（不限最舊的一顆）。
+# 因此走法與勝負只取決於雙方各佔了哪些格子，與落子先後無關：
+# 局面 = (X 佔的格子集合, O 佔的格子集合, 輪到誰)，介面上仍接受序列（例如 Board.pieces），
+# 索引時只看集合。求解結果寫成固定寬度的二進位表，執行期以 mmap 查表。
+#
+# 用法： python -m app.core.solver [--output data/perfect_play.bin] [--max-pieces 4]
+import argparse
+import mmap
+import os
+import struct
+from collections import deque
+from itertools import combinations
+from pathlib import Path
+
+from app.core.board import WIN_TABLE
+
+# 對「輪到的一方」而言的結果
+DRAW, WIN, LOSS = 0, 1, 2
+RESULT_NAMES = {DRAW: "draw", WIN: "win", LOSS: "loss"}
+
+# 走法以一個位元組編碼：高 4 位為起點（15 = 下子），低 4 位為終點
+PLACE_FROM = 15
+NO_MOVE = 0xFF
+
+SIDES = ("X", "O")
+MAGIC = b"TTTP"
+HEADER = struct.Struct("<4sBBHI")   # magic, 格式版本, max_pieces, 保留, 局面數
+ENTRY = struct.Struct("<BBH")       # 結果, 最佳走法, 距離（步數）
+FORMAT_VERSION = 2                  # 2：局面改以格子集合索引（1 為有序序列）
+FULL_MASK = (1 << 9) - 1
+
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parents[2] / "data" / "perfect_play.bin"
+
+
+def encode_move(from_idx, to_idx):
+    return ((PLACE_FROM if from_idx is None else from_idx) << 4) | to_idx
+
+
+def decode_move(code):
+    from_idx, to_idx = code >> 4, code & 0x0F
+    return (None if from_idx == PLACE_FROM else from_idx), to_idx
+
+
+def _comb_count(n, k):
+    count = 1
+    for i in range(k):
+        count = count * (n - i) // (i + 1)
+    return count
+
+
+def _comb_ranks():
+    # ranks[n][mask]：mask（n 格中選出的子集）在 combinations(range(n), 子集大小) 中的名次
+    ranks = []
+    for n in range(10):
+        table = [0] * (1 << n)
+        for k in range(n + 1):
+            for rank, combo in enumerate(combinations(range(n), k)):
+                table[sum(1 << c for c in combo)] = rank
+        ranks.append(tuple(table))
+    return tuple(ranks)
+
+
+_COMB_RANK = _comb_ranks()
+
+
+def _segments(max_pieces):
+    # 合法的 (X 子數, O 子數, 輪到誰) 組合：X 先手，放滿後雙方子數不再變化
+    segs = []
+    for k in range(max_pieces + 1):
+        for m in range(max_pieces + 1):
+            for side in (0, 1):
+                if (side == 0 and k == m) or (side == 1 and k == m + 1) \
+                        or (side == 1 and k == m == max_pieces):
+                    segs.append((k, m, side))
+    return segs
+
+
+class StateIndex:
+    """
+    局面 ↔ 連續整數索引的完美雜湊
+    每段 (k, m, side) 內，X 的格子集合以組合的字典序排名，O 的集合在剩餘格子中再以字典序排名；
+    棋子順序不影響索引
+    """
+
+    def __init__(self, max_pieces=4):
+        self.max_pieces = max_pieces
+        self.offsets = {}
+        total = 0
+        for seg in _segments(max_pieces):
+            k, m, _ = seg
+            self.offsets[seg] = total
+            total += _comb_count(9, k) * _comb_count(9 - k, m)
+        self.size = total
+
+    def index(self, xs, os_, side):
+        k, m = len(xs), len(os_)
+        offset = self.offsets.get((k, m, side))
+        if offset is None:
+            return -1
+        x_mask = _mask(xs)
+        avail = FULL_MASK & ~x_mask
+        # O 的格子換成在剩餘格子中的編號，再查組合名次
+        o_mask = 0
+        for cell in os_:
+            o_mask |= 1 << (avail & ((1 << cell) - 1)).bit_count()
+        return offset + _COMB_RANK[9][x_mask] * _comb_count(9 - k, m) + _COMB_RANK[9 - k][o_mask]
+
+    def states(self):
+        # 依索引順序產生所有局面（itertools.combinations 的輸出即為字典序）
+        for k, m, side in self.offsets:
+            for xs in combinations(range(9), k):
+                rest = [c for c in range(9) if c not in xs]
+                for os_ in combinations(rest, m):
+                    yield xs, os_, side
+
+
+def legal_moves(xs, os_, side, max_pieces=4):
+    """
+    產生 (走法編碼, 新的 X 序列, 新的 O 序列)；規則與 Board.place_piece/move_piece 相同
+    """
+    own = xs if side == 0 else os_
+    used = 0
+    for cell in xs + os_:
+        used |= 1 << cell
+    empties = [i for i in range(9) if not (used >> i) & 1]
+    moves = []
+    if len(own) < max_pieces:
+        for to_idx in empties:
+            moves.append((encode_move(None, to_idx), own + (to_idx,)))
+    else:
+        for from_idx in own:
+            kept = tuple(c for c in own if c != from_idx)
+            for to_idx in empties:
+                moves.append((encode_move(from_idx, to_idx), kept + (to_idx,)))
+    if side == 0:
+        return [(code, new, os_) for code, new in moves]
+    return [(code, xs, new) for code, new in moves]
+
+
+def _mask(seq):
+    mask = 0
+    for cell in seq:
+        mask |= 1 << cell
+    return mask
+
+
+def solve(max_pieces=4, verbose=False):
+    """
+    逆推求解所有局面，回傳 (結果 bytearray, 最佳走法 bytearray, 距離 list)
+    """
+    index = StateIndex(max_pieces)
+    size = index.size
+    result = bytearray(size)
+    best = bytearray([NO_MOVE]) * size
+    dist = [0] * size
+    pending = [0] * size      # 尚未被證明「對手必勝」的子局面數
+    edge_src, edge_dst, edge_move = [], [], bytearray()
+    queue = deque()
+
+    for idx, (xs, os_, side) in enumerate(index.states()):
+        mover_mask = _mask(os_ if side == 0 else xs)
+        own_mask = _mask(xs if side == 0 else os_)
+        if WIN_TABLE[mover_mask]:
+            # 上一手已連線：輪到的一方已輸
+            result[idx] = LOSS
+            queue.append(idx)
+            continue
+        if WIN_TABLE[own_mask]:
+            # 不可達的局面（輪到的一方早已連線），視為已勝
+            result[idx] = WIN
+            queue.append(idx)
+            continue
+        children = legal_moves(xs, os_, side, max_pieces)
+        pending[idx] = len(children)
+        for code, nxs, nos in children:
+            edge_src.append(idx)
+            edge_dst.append(index.index(nxs, nos, 1 - side))
+            edge_move.append(code)
+    if verbose:
+        print(f"{size} states, {len(edge_src)} edges")
+
+    # 反向鄰接（CSR）：子局面 → 父局面
+    starts = [0] * (size + 1)
+    for dst in edge_dst:
+        starts[dst + 1] += 1
+    for i in range(size):
+        starts[i + 1] += starts[i]
+    fill = starts[:-1]
+    preds = [0] * len(edge_dst)
+    pred_moves = bytearray(len(edge_dst))
+    for src, dst, code in zip(edge_src, edge_dst, edge_move):
+        pos = fill[dst]
+        preds[pos] = src
+        pred_moves[pos] = code
+        fill[dst] = pos + 1
+    del edge_src, edge_dst, edge_move
+
+    # BFS 由終局往回推：距離單調不減，故勝方取最短、敗方取最長
+    while queue:
+        child = queue.popleft()
+        child_result, child_dist = result[child], dist[child]
+        for pos in range(starts[child], starts[child + 1]):
+            parent = preds[pos]
+            if result[parent] != DRAW:
+                continue
+            if child_result == LOSS:
+                result[parent] = WIN
+            else:
+                pending[parent] -= 1
+                if pending[parent]:
+                    continue
+                result[parent] = LOSS
+            dist[parent] = child_dist + 1
+            best[parent] = pred_moves[pos]
+            queue.append(parent)
+
+    # 和局局面：選一個不會讓對手必勝的子局面
+    for idx, (xs, os_, side) in enumerate(index.states()):
+        if result[idx] != DRAW:
+            continue
+        for code, nxs, nos in legal_moves(xs, os_, side, max_pieces):
+            if result[index.index(nxs, nos, 1 - side)] == DRAW:
+                best[idx] = code
+                break
+    return result, best, dist
+
+
+def write_table(path, max_pieces=4, verbose=False):
+    result, best, dist = solve(max_pieces, verbose=verbose)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, max_pieces, 0, len(result)))
+        buf = bytearray(ENTRY.size * len(result))
+        for i in range(len(result)):
+            ENTRY.pack_into(buf, i * ENTRY.size, result[i], best[i], min(dist[i], 0xFFFF))
+        f.write(buf)
+    os.replace(tmp, path)
+    return path
+
+
+class PerfectTable:
+    """
+    以 mmap 開啟的完美對弈表：一次查表取得 (結果, 距離, 最佳走法)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, max_pieces, _, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"不是有效的完美對弈表: {self.path}")
+        self.max_pieces = max_pieces
+        self.index = StateIndex(max_pieces)
+        if count != self.index.size:
+            self._mm.close()
+            raise ValueError(f"完美對弈表大小不符: {count} != {self.index.size}")
+
+    def close(self):
+        self._mm.close()
+
+    def probe(self, xs, os_, side):
+        """
+        回傳 (結果, 距離, 走法編碼)；局面不在表內時回傳 None
+        """
+        idx = self.index.index(tuple(xs), tuple(os_), side)
+        if idx < 0:
+            return None
+        res, move, steps = ENTRY.unpack_from(self._mm, HEADER.size + idx * ENTRY.size)
+        return res, steps, move
+
+    def probe_board(self, board, player=None):
+        player = player or board.turn
+        if board.max_pieces != self.max_pieces:
+            return None
+        return self.probe(board.pieces['X'], board.pieces['O'], SIDES.index(player))
+
+
+_table = None
+
+
+def get_perfect_table():
+    """
+    延遲載入預設的完美對弈表（路徑可用 PERFECT_TABLE_PATH 覆寫）；檔案不存在時回傳 None
+    """
+    global _table
+    if _table is None:
+        path = Path(os.getenv("PERFECT_TABLE_PATH", DEFAULT_TABLE_PATH))
+        if not path.exists():
+            return None
+        _table = PerfectTable(path)
+    return _table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="離線求解移子井字棋並輸出完美對弈表")
+    parser.add_argument("--output", default=str(DEFAULT_TABLE_PATH))
+    parser.add_argument("--max-pieces", type=int, default=4)
+    args = parser.parse_args(argv)
+    path = write_table(args.output, args.max_pieces, verbose=True)
+    print(f"written {path}")
+
+
+if __name__ == "__main__":
+    main()
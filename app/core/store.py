@@ -0,0 +1,200 @@
+# store.py
+# 多局遊戲的記憶體存放區：game_id → Board
+#
+# - 依 game_id 雜湊分成多個 shard，shard 鎖只保護字典本身（查找/插入/淘汰都是 O(1)）
+# - 每局遊戲有自己的鎖，不同遊戲的落子互不競爭
+# - 以 LRU 順序維持容量上限，並淘汰超過 TTL 未被存取的遊戲
+# - 可選的 loader / saver：記憶體中找不到時由 loader 載入（例如 SQLite），
+#   session 結束時若棋盤版本有變就交給 saver（寫回由 saver 自行批次處理）
+# - 可選的 shared（例如 SQLiteSharedState）：多個 worker 共用狀態時使用。進入 session 時若其他
+#   worker 已改過這一局就先重新載入；結束時以進入時的版本做 compare-and-swap，
+#   失敗代表同一局被其他 worker 搶先改動，丟出 VersionConflict，本地副本換成最新狀態
+# - 可選的 on_create(game_id, board)：create=True 替指定 id 建立新棋盤時呼叫（例如被淘汰後重建），
+#   讓走法紀錄知道這個 id 從頭開始
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.board import Board
+
+
+class GameNotFound(KeyError):
+    pass
+
+
+class VersionConflict(RuntimeError):
+    pass
+
+
+class _Entry:
+    __slots__ = ("board", "lock", "touched", "game_id", "saver", "shared", "entered_version")
+
+    def __init__(self, board, now, game_id=None, saver=None, shared=None):
+        self.board = board
+        self.lock = threading.Lock()
+        self.touched = now
+        self.game_id = game_id
+        self.saver = saver
+        self.shared = shared
+        self.entered_version = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.shared is not None:
+            try:
+                fresh = self.shared.load_if_changed(self.game_id, self.board.version)
+            except BaseException:
+                self.lock.release()
+                raise
+            if fresh is not None:
+                self.board = fresh
+        self.entered_version = self.board.version
+        return self.board
+
+    def __exit__(self, *exc):
+        try:
+            if self.board.version == self.entered_version:
+                return
+            if self.shared is not None:
+                if not self.shared.compare_and_swap(self.game_id, self.entered_version, self.board):
+                    self.board = self.shared.load(self.game_id) or self.board
+                    raise VersionConflict(self.game_id)
+            elif self.saver is not None:
+                self.saver(self.game_id, self.board)
+        finally:
+            self.lock.release()
+
+
+class _Shard:
+    __slots__ = ("lock", "games")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.games = OrderedDict()
+
+
+class GameStore:
+    def __init__(self, max_games=200_000, ttl=3600.0, shards=64,
+                 board_factory=Board, clock=time.monotonic, loader=None, saver=None, shared=None,
+                 on_create=None):
+        self.max_games = max_games
+        self.ttl = ttl
+        self.board_factory = board_factory
+        self.clock = clock
+        self.shared = shared
+        self.loader = shared.load if shared is not None and loader is None else loader
+        self.saver = saver
+        self.on_create = on_create
+        self.loaded = 0
+        self._shards = [_Shard() for _ in range(shards)]
+        # 每個 shard 各自的容量上限，總和不超過 max_games
+        self._shard_capacity = max(1, max_games // shards)
+        self.evicted = 0
+
+    def _shard(self, game_id):
+        return self._shards[hash(game_id) % len(self._shards)]
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry.touched > self.ttl
+
+    def _evict(self, shard, now):
+        # OrderedDict 最前面是最久未使用的遊戲：先清過期，再清超量
+        games = shard.games
+        while games:
+            game_id, entry = next(iter(games.items()))
+            if len(games) <= self._shard_capacity and not self._expired(entry, now):
+                break
+            del games[game_id]
+            self.evicted += 1
+
+    def _cached(self, shard, game_id, now):
+        entry = shard.games.get(game_id)
+        if entry is not None and self._expired(entry, now):
+            del shard.games[game_id]
+            self.evicted += 1
+            entry = None
+        if entry is not None:
+            entry.touched = now
+            shard.games.move_to_end(game_id)
+        return entry
+
+    def _insert(self, shard, game_id, board, now):
+        entry = _Entry(board, now, game_id, self.saver, self.shared)
+        shard.games[game_id] = entry
+        self._evict(shard, now)
+        return entry
+
+    def _lookup(self, game_id, create):
+        entry, created = self._find(game_id, create)
+        if created and self.on_create is not None:
+            self.on_create(game_id, entry.board)
+        return entry
+
+    def _find(self, game_id, create):
+        # 回傳 (entry, 是否新建了棋盤)
+        shard = self._shard(game_id)
+        now = self.clock()
+        with shard.lock:
+            entry = self._cached(shard, game_id, now)
+            if entry is not None:
+                return entry, False
+            if self.loader is None:
+                if not create:
+                    raise GameNotFound(game_id)
+                return self._insert(shard, game_id, self.board_factory(), now), True
+        # 記憶體中沒有：在 shard 鎖之外載入（避免 I/O 擋住同 shard 的其他遊戲）
+        board = self.loader(game_id)
+        with shard.lock:
+            entry = self._cached(shard, game_id, now)
+            if entry is not None:
+                return entry, False  # 其他請求已先載入
+            if board is not None:
+                self.loaded += 1
+            elif not create:
+                raise GameNotFound(game_id)
+            return self._insert(shard, game_id, board or self.board_factory(), now), board is None
+
+    def create(self):
+        """
+        建立新遊戲，回傳 (game_id, board)
+        """
+        game_id = secrets.token_hex(8)  # 64-bit 隨機 id，碰撞機率可忽略
+        shard = self._shard(game_id)
+        with shard.lock:
+            entry = self._insert(shard, game_id, self.board_factory(), self.clock())
+        if self.shared is not None:
+            with entry:
+                if not self.shared.compare_and_swap(game_id, -1, entry.board):
+                    raise VersionConflict(game_id)  # 只在 id 碰撞時發生
+        elif self.saver is not None:
+            with entry:
+                self.saver(game_id, entry.board)
+        return game_id, entry.board
+
+    def get(self, game_id, create=False):
+        """
+        取得遊戲的 Board；找不到時丟出 GameNotFound（create=True 則自動建立）
+        """
+        return self._lookup(game_id, create).board
+
+    def session(self, game_id, create=False):
+        """
+        回傳該局的 context manager：進入時持有該局的鎖並取得 Board，確保同一局的動作依序套用
+        找不到遊戲時立即丟出 GameNotFound
+        """
+        return self._lookup(game_id, create)
+
+    def delete(self, game_id):
+        shard = self._shard(game_id)
+        with shard.lock:
+            return shard.games.pop(game_id, None) is not None
+
+    def __contains__(self, game_id):
+        shard = self._shard(game_id)
+        with shard.lock:
+            entry = shard.games.get(game_id)
+            return entry is not None and not self._expired(entry, self.clock())
+
+    def __len__(self):
+        return sum(len(shard.games) for shard in self._shards)
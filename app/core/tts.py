@@ -0,0 +1,181 @@
+# tts.py
+# 文字轉語音：可替換的合成後端 + 以內容定址的音訊快取（記憶體 LRU + 磁碟）。
+#
+# - key = sha256(後端名稱, voice, 文字)，同一句話在同一個後端與聲音下永遠對應同一個 key
+# - register() 只計算 key 並記下文字，不做合成；回應裡只放 /tts/{key} 與 ETag，
+#   真正的合成延後到第一次有人抓音訊時才做
+# - 同一個 key 同時有多個請求時只有一個會合成（single-flight），其餘等它完成後直接讀快取；
+#   設定磁碟目錄時合成結果會寫入 {key}.{副檔名}，重啟後也不必重新合成
+# - 後端：StubBackend（不需網路，產生固定長度的靜音 WAV，供測試使用）、GTTSBackend（gTTS，MP3）
+import hashlib
+import io
+import os
+import re
+import threading
+import wave
+
+from app.core.cache import LRUCache
+
+# key 一律是 sha256 的十六進位字串；來自 URL 的 key 先比對格式，才會拿去查快取或組檔案路徑
+KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def valid_key(key):
+    return KEY_RE.fullmatch(key) is not None
+
+
+class StubBackend:
+    name = "stub"
+    media_type = "audio/wav"
+    extension = "wav"
+
+    def __init__(self, sample_rate=16000, seconds_per_char=0.02):
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, voice):
+        # 依文字長度產生靜音；內容固定，方便測試比對
+        frames = int(self.sample_rate * self.seconds_per_char * max(1, len(text)))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(b"\0\0" * frames)
+        return buf.getvalue()
+
+
+class GTTSBackend:
+    name = "gtts"
+    media_type = "audio/mpeg"
+    extension = "mp3"
+
+    def synthesize(self, text, voice):
+        # 延遲匯入：沒用到 gTTS 時不需要安裝
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang=voice).write_to_fp(buf)
+        return buf.getvalue()
+
+
+BACKENDS = {"stub": StubBackend, "gtts": GTTSBackend}
+
+
+def get_backend(name):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的 TTS 後端: {name}（可用：{', '.join(BACKENDS)}）")
+
+
+class TTSCache:
+    def __init__(self, backend, directory=None, voice="zh-TW", max_items=1024, max_texts=4096):
+        self.backend = backend
+        self.directory = directory or None
+        self.voice = voice
+        self._audio = LRUCache(max_items)   # key -> 音訊 bytes
+        self._texts = LRUCache(max_texts)   # key -> (text, voice)，合成時才用得到
+        self._lock = threading.Lock()
+        self._inflight = {}                 # key -> 正在合成該 key 的鎖
+        self.disk_hits = 0
+        self.synthesized = 0
+        self.errors = 0
+
+    @property
+    def media_type(self):
+        return self.backend.media_type
+
+    def key(self, text, voice=None):
+        raw = "\0".join((self.backend.name, voice or self.voice, text))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def register(self, text, voice=None):
+        """
+        記下要念的文字並回傳 key；不合成，成本只有一次雜湊
+        """
+        voice = voice or self.voice
+        key = self.key(text, voice)
+        self._texts.put(key, (text, voice))
+        return key
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.{self.backend.extension}")
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key, audio):
+        # 先寫暫存檔再 os.replace，其他行程不會讀到寫一半的檔案
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+
+    def cached(self, key):
+        # 只查記憶體，不碰磁碟也不合成；可在事件迴圈中直接呼叫
+        return self._audio.get(key)
+
+    def get(self, key):
+        """
+        回傳 key 對應的音訊 bytes：記憶體 → 磁碟 → 合成。格式不對、沒註冊過也不在磁碟上的 key 丟出 KeyError
+        """
+        if not valid_key(key):
+            raise KeyError(key)
+        audio = self._audio.get(key)
+        if audio is not None:
+            return audio
+        with self._lock:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                # 等鎖期間可能已有別的請求合成完畢
+                audio = self._audio.get(key)
+                if audio is None:
+                    audio = self._read_disk(key)
+                    if audio is not None:
+                        self.disk_hits += 1
+                    else:
+                        audio = self._synthesize(key)
+                    self._audio.put(key, audio)
+                return audio
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is lock:
+                    del self._inflight[key]
+
+    def _synthesize(self, key):
+        entry = self._texts.get(key)
+        if entry is None:
+            raise KeyError(key)
+        text, voice = entry
+        try:
+            audio = self.backend.synthesize(text, voice)
+        except Exception:
+            self.errors += 1
+            raise
+        self.synthesized += 1
+        if self.directory is not None:
+            self._write_disk(key, audio)
+        return audio
+
+    def stats(self):
+        memory = self._audio.stats()
+        return {
+            "backend": self.backend.name,
+            "voice": self.voice,
+            "memory_items": memory["size"],
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "synthesized": self.synthesized,
+            "errors": self.errors,
+            "texts": len(self._texts),
+        }
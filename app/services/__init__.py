@@ -1,4 +1,5 @@
-from .speech_to_command import speech_to_command
-from .voice_loop import voice_loop
+from .speech_to_command import interpret_command
+from .streaming_asr import StreamingRecognizer
 
-__all__ = ["speech_to_command", "voice_loop"]
\ No newline at end of file
+# voice_loop 是獨立執行的語音對弈腳本（import 時就會載入 Whisper），不在此匯出
+__all__ = ["interpret_command", "StreamingRecognizer"]
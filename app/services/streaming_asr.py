@@ -0,0 +1,109 @@
+# streaming_asr.py
+# 串流語音辨識：持續接收音訊片段，每隔 step_s 秒對最近 window_s 秒的滑動視窗重新辨識，
+# 把部分辨識結果交給 interpret_command，一辨識出明確的指令就提早送出，不必等整段錄音結束。
+#
+# 「明確」的判斷：
+#   - 連續 stable_count 次部分結果解析出同一個指令，或
+#   - 已解析出指令且說話者已停頓（視窗尾端 silence_s 秒的音量低於 silence_rms）
+#   - 文字中出現「到」、「->」、「move」但座標還不到兩個時，代表移子指令還沒說完，先不送出
+# 辨識本身（transcribe_fn）由呼叫端注入，方便在執行緒池中執行或在測試中替換。
+import numpy as np
+
+from app.services.speech_to_command import interpret_command
+
+SAMPLE_RATE = 16000
+MOVE_MARKERS = ("到", "->", "move")
+
+
+def _rms(samples):
+    if len(samples) == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float32))))
+
+
+class StreamingRecognizer:
+    def __init__(self, transcribe_fn=None, player="X", sample_rate=SAMPLE_RATE, window_s=4.0,
+                 step_s=0.4, stable_count=2, silence_s=0.3, silence_rms=0.01, parse_fn=interpret_command):
+        self.transcribe_fn = transcribe_fn
+        self.player = player
+        self.sample_rate = sample_rate
+        self.window = int(window_s * sample_rate)
+        self.step = int(step_s * sample_rate)
+        self.silence = int(silence_s * sample_rate)
+        self.stable_count = stable_count
+        self.silence_rms = silence_rms
+        self.parse_fn = parse_fn
+        self.reset()
+
+    def reset(self):
+        # 送出一個指令後清空，下一句從頭開始
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.partial = ""
+        self.heard_speech = False
+        self._since_decode = 0
+        self._silence_decoded = False
+        self._command = None
+        self._stable = 0
+
+    def feed(self, samples):
+        """
+        加入一段 float32 單聲道音訊（取樣率為 sample_rate）；只保留最近 window_s 秒
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if _rms(samples) >= self.silence_rms:
+            self.heard_speech = True
+            self._silence_decoded = False
+        buffer = np.concatenate((self.buffer, samples))
+        self.buffer = buffer[-self.window:] if len(buffer) > self.window else buffer
+        self._since_decode += len(samples)
+
+    def trailing_silence(self):
+        tail = self.buffer[-self.silence:]
+        return self.heard_speech and len(tail) >= self.silence and _rms(tail) < self.silence_rms
+
+    def due(self):
+        """
+        是否該再辨識一次：距上次已累積 step_s 秒新音訊，或說話者剛停頓（停頓後立即辨識一次）
+        """
+        if not self.heard_speech or self._since_decode == 0:
+            return False
+        if self._since_decode >= self.step:
+            return True
+        return not self._silence_decoded and self.trailing_silence()
+
+    def snapshot(self):
+        # 目前要送去辨識的視窗；buffer 只會被整個替換、不會原地修改，可直接交給其他執行緒
+        self._since_decode = 0
+        if self.trailing_silence():
+            self._silence_decoded = True
+        return self.buffer
+
+    def _parse(self, text):
+        action, from_pos, to_pos = self.parse_fn(text, self.player)
+        if action is None:
+            return None
+        lowered = text.lower()
+        if action != "move" and any(marker in lowered for marker in MOVE_MARKERS):
+            return None  # 「a1 到 …」還沒說完
+        return (action, from_pos, to_pos)
+
+    def update(self, text, final=False):
+        """
+        收到一次部分辨識結果；指令已明確（或 final=True 時只要解析得出）就回傳 (action, from_pos, to_pos)
+        """
+        self.partial = text
+        command = self._parse(text)
+        if command is not None and command == self._command:
+            self._stable += 1
+        else:
+            self._stable = 1 if command is not None else 0
+        self._command = command
+        if command is None:
+            return None
+        if final or self._stable >= self.stable_count or self.trailing_silence():
+            return command
+        return None
+
+    def decode(self, final=False):
+        # 同步版本：直接呼叫 transcribe_fn 辨識目前視窗
+        return self.update(self.transcribe_fn(self.snapshot()), final)
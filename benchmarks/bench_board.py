@@ -0,0 +1,72 @@
+# bench_board.py
+# 比較 bitboard 規則引擎（app.core.board.Board）與舊版列表引擎（ListBoard）
+# 用法： python -m benchmarks.bench_board [--number 20000]
+import argparse
+import timeit
+
+from app.core.board import Board
+from benchmarks.list_board import ListBoard
+
+# 一局固定棋譜：雙方各放 4 子後進入移子階段，最後 X 連成 b 欄
+GAME_SCRIPT = (
+    ("place", "X", "a1", None), ("place", "O", "b1", None),
+    ("place", "X", "c1", None), ("place", "O", "a2", None),
+    ("place", "X", "c2", None), ("place", "O", "a3", None),
+    ("place", "X", "b3", None), ("place", "O", "c3", None),
+    ("move", "X", "b2", "a1"),
+)
+
+
+def play_script(board):
+    board.reset()
+    for action, player, pos, from_pos in GAME_SCRIPT:
+        if action == "place":
+            board.place_piece(pos, player)
+        else:
+            board.move_piece(pos, player, from_pos)
+    return board
+
+
+def _midgame(engine):
+    board = engine()
+    for action, player, pos, _ in GAME_SCRIPT[:6]:
+        board.place_piece(pos, player)
+    return board
+
+
+def run(number):
+    """
+    回傳 {案例名稱: {引擎名稱: 每次呼叫微秒數}}
+    """
+    cases = {
+        "full_game": lambda b: play_script(b),
+        "is_winner": lambda b: b.is_winner("X"),
+        "check_game_over": lambda b: b.check_game_over(),
+        "is_full": lambda b: b.is_full(),
+        "available_positions": lambda b: b.available_positions(),
+        "get_board_state": lambda b: b.get_board_state(),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = {}
+        for label, engine in (("list", ListBoard), ("bitboard", Board)):
+            board = _midgame(engine)
+            seconds = min(timeit.repeat(lambda: fn(board), number=number, repeat=3))
+            results[name][label] = seconds / number * 1e6
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Board 規則引擎效能比較")
+    parser.add_argument("--number", type=int, default=20000, help="每個案例的呼叫次數")
+    args = parser.parse_args(argv)
+
+    results = run(args.number)
+    print(f"{'case':<22}{'list (us)':>12}{'bitboard (us)':>16}{'speedup':>10}")
+    for name, row in results.items():
+        speedup = row["list"] / row["bitboard"] if row["bitboard"] else float("inf")
+        print(f"{name:<22}{row['list']:>12.3f}{row['bitboard']:>16.3f}{speedup:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# run.py
+# 效能基準測試：規則引擎、AI、HTTP 端點
+#
+# 用法：
+#   python -m benchmarks.run --output bench.json                 # 產生基準
+#   python -m benchmarks.run --compare bench.json --threshold 0.2  # 與基準比較，退步超過 20% 時 exit 1
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# 端點基準不應載入真正的 Whisper / gpt2
+os.environ.setdefault("MODEL_WARMUP", "false")
+
+from app.core.ai import ai_move, asr_model, llm_model
+from app.core.board import Board
+
+PLACEMENTS = (("a1", "X"), ("b1", "O"), ("c1", "X"), ("a2", "O"),
+              ("c2", "X"), ("a3", "O"), ("b3", "X"), ("c3", "O"))
+
+
+class _StubPipeline:
+    # 模型替身：端點基準只量測 API 與規則引擎本身的成本
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, list):
+            return [{"text": ""} for _ in inputs]
+        return [{"generated_text": ""}]
+
+
+def _summary(samples_ns, ops_per_sample=1):
+    per_op = sorted(s / ops_per_sample / 1000 for s in samples_ns)  # 微秒
+    median = statistics.median(per_op)
+    return {
+        "unit": "us",
+        "median": round(median, 4),
+        "p95": round(per_op[min(len(per_op) - 1, int(len(per_op) * 0.95))], 4),
+        "min": round(per_op[0], 4),
+        "ops_per_sec": round(1e6 / median) if median > 0 else None,
+        "samples": len(per_op),
+    }
+
+
+def _time_batches(fn, setup, batches, inner):
+    # 每個 batch 先 setup（不計時），再連續呼叫 fn inner 次
+    samples = []
+    for _ in range(batches):
+        state = setup()
+        started = time.perf_counter_ns()
+        for _ in range(inner):
+            fn(state)
+        samples.append(time.perf_counter_ns() - started)
+    return _summary(samples, inner)
+
+
+def _placed_board():
+    board = Board()
+    for pos, player in PLACEMENTS:
+        board.place_piece(pos, player)
+    return board
+
+
+def bench_board(batches):
+    results = {}
+
+    def place_all(board):
+        board.reset()
+        for pos, player in PLACEMENTS:
+            board.place_piece(pos, player)
+
+    samples = []
+    board = Board()
+    for _ in range(batches):
+        started = time.perf_counter_ns()
+        for _ in range(50):
+            place_all(board)
+        samples.append(time.perf_counter_ns() - started)
+    results["board.place_piece"] = _summary(samples, 50 * len(PLACEMENTS))
+
+    def move_oldest(board):
+        # 雙方輪流把最舊的棋子移到唯一的空格
+        player = board.turn
+        board.move_piece(board.idx_to_pos(board.available_positions()[0]), player)
+        board.turn = "O" if player == "X" else "X"
+
+    results["board.move_piece"] = _time_batches(move_oldest, _placed_board, batches, 200)
+    results["board.check_game_over"] = _time_batches(lambda b: b.check_game_over(), _placed_board, batches, 1000)
+    results["board.get_board_state"] = _time_batches(lambda b: b.get_board_state(), _placed_board, batches, 1000)
+
+    def render_fresh(board):
+        # 每次都換版本，量測未命中快取時的序列化成本
+        board.version += 1
+        board.render_string()
+
+    results["board.render_string"] = _time_batches(render_fresh, _placed_board, batches, 1000)
+    return results
+
+
+def bench_ai(batches):
+    results = {}
+    results["ai_move.random"] = _time_batches(lambda b: ai_move(b, "X", "random"), Board, batches, 200)
+    results["ai_move.random_move_phase"] = _time_batches(
+        lambda b: ai_move(b, "X", "random"), _placed_board, batches, 200)
+    results["ai_move.alphabeta_2k_nodes"] = _time_batches(
+        lambda b: ai_move(b, "X", "alphabeta", time_ms=1000, max_nodes=2000), _placed_board, max(3, batches // 10), 1)
+    return results
+
+
+def bench_http(requests):
+    from fastapi.testclient import TestClient
+    from app.api import app
+
+    asr_model.set(_StubPipeline())
+    llm_model.set(_StubPipeline())
+    client = TestClient(app)
+    results = {}
+
+    def latency(fn):
+        samples = []
+        for i in range(requests):
+            started = time.perf_counter_ns()
+            fn(i)
+            samples.append(time.perf_counter_ns() - started)
+        return _summary(samples)
+
+    game_id = client.post("/games").json()["game_id"]
+
+    def game_move(i):
+        if i % len(PLACEMENTS) == 0:
+            client.post(f"/reset?game_id={game_id}")
+        pos, player = PLACEMENTS[i % len(PLACEMENTS)]
+        client.post(f"/games/{game_id}/move", json={"player": player, "position": pos})
+
+    # /reset 也在計時範圍內，但每 8 次才一次，與「一局」的實際成本一致
+    results["http.games_move"] = latency(game_move)
+
+    def ai_request(i):
+        if i % 8 == 0:
+            client.post(f"/reset?game_id={game_id}")
+        client.post("/ai_move", json={"player": "XO"[i % 2], "game_id": game_id})
+
+    results["http.ai_move"] = latency(ai_request)
+    results["http.get_game"] = latency(lambda i: client.get(f"/games/{game_id}"))
+    return results
+
+
+def run(quick=False):
+    batches = 20 if quick else 100
+    results = {}
+    results.update(bench_board(batches))
+    results.update(bench_ai(batches))
+    results.update(bench_http(100 if quick else 500))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    以 median 比較；回傳退步超過 threshold（比例）的項目 [(名稱, 基準, 目前, 變化比例)]
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None or not base["median"]:
+            continue
+        change = now["median"] / base["median"] - 1
+        if change > threshold:
+            regressions.append((name, base["median"], now["median"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="規則引擎 / AI / HTTP 端點效能基準")
+    parser.add_argument("--output", help="把結果寫成 JSON 檔")
+    parser.add_argument("--compare", help="與此 JSON 基準比較")
+    parser.add_argument("--threshold", type=float, default=0.2, help="容許退步比例（預設 0.2 = 20%%）")
+    parser.add_argument("--quick", action="store_true", help="減少取樣次數，快速跑一輪")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, base, now, change in regressions:
+            print(f"REGRESSION {name}: {base:.3f}us -> {now:.3f}us (+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
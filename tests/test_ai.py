@@ -16,4 +16,31 @@ def test_ai_move():
         success, _ = board.move_piece(to_pos, "X", from_pos)
 
     assert success
-    assert board.get_board_state()[to_pos] == "X"
\ No newline at end of file
+    assert board.get_board_state()[to_pos] == "X"
+
+def test_ai_moves_batch_random_is_legal():
+    from app.core.ai import ai_moves_batch
+
+    boards = [Board() for _ in range(50)]
+    for board in boards[::2]:
+        for pos in ("a1", "b1", "a2", "c3"):
+            board.place_piece(pos, "X")  # TEST 用：X 已放滿 4 子，只能移動
+    results = ai_moves_batch(boards, ["X"] * len(boards))
+    assert len(results) == len(boards)
+    for board, (from_pos, to_pos, msg, info) in zip(boards, results):
+        if from_pos is None:
+            assert board.place_piece(to_pos, "X")[0]
+        else:
+            assert board.get_board_state()[from_pos] == "X"
+            assert board.move_piece(to_pos, "X", from_pos)[0]
+        assert info["batch"]["size"] == 50
+
+
+def test_ai_moves_batch_search_dedupes_positions():
+    from app.core.ai import ai_moves_batch
+
+    boards = [Board() for _ in range(4)]
+    boards[3].place_piece("b2", "X")
+    results = ai_moves_batch(boards, ["X", "X", "X", "O"], "alphabeta", time_ms=20)
+    assert results[0][3]["batch"]["unique"] == 2
+    assert results[0][:2] == results[1][:2] == results[2][:2]
@@ -44,4 +44,52 @@ def test_llm_move():
     assert isinstance(decision, dict)
     assert "action" in decision
     assert "pos" in decision
-    assert decision["pos"] is not None
\ No newline at end of file
+    assert decision["pos"] is not None
+
+def test_transcribe_stats():
+    res = client.get("/transcribe/stats")
+    assert res.status_code == 200
+    data = res.json()
+    assert "queue_depth" in data
+    assert "avg_batch_size" in data
+
+
+def test_ai_move_batch():
+    game_ids = [client.post("/games").json()["game_id"] for _ in range(3)]
+    client.post(f"/games/{game_ids[1]}/move", json={"player": "X", "position": "b2"})
+    res = client.post("/ai_move/batch", json={"game_ids": game_ids + ["missing", game_ids[0]]})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["batch"]["size"] == 3
+    results = {r["game_id"]: r for r in data["results"]}
+    assert len(data["results"]) == 4  # 重複的 game_id 只下一次
+    assert results["missing"]["status"] == 404
+    assert results[game_ids[0]]["player"] == "X"
+    assert results[game_ids[1]]["player"] == "O"
+    for game_id in game_ids:
+        assert results[game_id]["success"] is True
+        board = client.get(f"/games/{game_id}").json()["board"]
+        assert board[results[game_id]["pos"]] == results[game_id]["player"]
+
+
+def test_ai_move_batch_caps_total_search_time(monkeypatch):
+    import importlib
+    api = importlib.import_module("app.api.app")
+    monkeypatch.setattr(api, "AI_BATCH_MAX_MS", 1)
+    game_ids = [client.post("/games").json()["game_id"] for _ in range(2)]
+    client.post(f"/games/{game_ids[1]}/move", json={"player": "X", "position": "b2"})
+    res = client.post("/ai_move/batch", json={"game_ids": game_ids, "strategy": "alphabeta", "time_ms": 50})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["batch"]["timed_out"] == 1
+    first, second = data["results"]
+    assert first["success"] is True  # 第一局用掉剩下的時間後仍有結果
+    assert second == {"game_id": game_ids[1], "success": False, "status": 504, "error": "批次搜尋時間已用完"}
+
+
+def test_ai_move_batch_rejects_unknown_player():
+    game_id = client.post("/games").json()["game_id"]
+    res = client.post("/ai_move/batch", json={"game_ids": [game_id], "player": "Z"})
+    assert res.status_code == 422
+    res = client.post("/ai_move/batch", json={"game_ids": [game_id], "player": "x"})
+    assert res.json()["results"][0]["player"] == "X"
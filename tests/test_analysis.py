@@ -0,0 +1,88 @@
+# test_analysis.py
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.analysis import SYMMETRIES, PositionAnalyzer, canonical
+from app.core.board import Board
+from app.core.solver import PerfectTable, write_table
+
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp("analysis") / "perfect3.bin"
+    write_table(path, 3)
+    t = PerfectTable(path)
+    yield t
+    t.close()
+
+
+def _board(moves, max_pieces=4):
+    board = Board()
+    board.max_pieces = max_pieces
+    for pos, player in moves:
+        board.place_piece(pos, player)
+    return board
+
+
+def test_symmetric_positions_share_canonical_form():
+    assert len(set(SYMMETRIES)) == 8
+    corners = [canonical(1 << i, 1 << 4)[0] for i in (0, 2, 6, 8)]
+    assert len(set(corners)) == 1
+    assert canonical(1 << 0, 1 << 4)[0] != canonical(1 << 1, 1 << 4)[0]  # 角與邊不等價
+
+
+def test_table_hint_matches_probes_in_original_coordinates(table):
+    analyzer = PositionAnalyzer(table_fn=lambda: table)
+    # X：c3、a3，O：b2；輪到 O，必須擋 b3
+    board = _board([("c3", "X"), ("b2", "O"), ("a3", "X")], max_pieces=3)
+    hint = analyzer.analyze(board, "O")
+    assert hint["exact"] and hint["source"] == "table"
+    moves = {m["pos"]: m for m in hint["moves"]}
+    assert len(moves) == 6
+    for pos, move in moves.items():
+        child = Board.from_dict(board.to_dict())
+        child.place_piece(pos, "O")
+        result, steps, _ = table.probe_board(child, "X")
+        expected = {0: "draw", 1: "loss", 2: "win"}[result]  # 子局面對 X 的結果反過來
+        assert move["result"] == expected
+    assert moves["b3"]["result"] != "loss"
+    assert moves["a1"]["result"] == "loss" and moves["a1"]["depth"] == 2
+
+    # 鏡射後的局面命中同一筆快取，座標轉回鏡射後的位置
+    mirrored = _board([("a3", "X"), ("b2", "O"), ("c3", "X")], max_pieces=3)
+    hint = analyzer.analyze(mirrored, "O")
+    assert hint["cached"]
+    assert {m["pos"]: m["result"] for m in hint["moves"]}["b3"] == moves["b3"]["result"]
+    assert analyzer.stats()["hits"] == 1
+
+
+def test_search_hint_finds_immediate_win():
+    analyzer = PositionAnalyzer(time_ms=100)
+    board = _board([("a1", "X"), ("b2", "O"), ("b1", "X"), ("c3", "O")])
+    hint = analyzer.analyze(board, "X")
+    assert not hint["exact"]
+    assert hint["moves"][0] == {"from_pos": None, "pos": "c1", "result": "win", "depth": 1}
+
+
+def test_hint_endpoint_and_stats(monkeypatch):
+    monkeypatch.setattr(api, "hint_analyzer", PositionAnalyzer(time_ms=50))
+    game_id = client.post("/games").json()["game_id"]
+    client.post(f"/games/{game_id}/moves", json={"moves": [{"player": "X", "pos": "a1"}]})
+    res = client.get(f"/games/{game_id}/hint")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["player"] == "O" and data["version"] == 1
+    assert len(data["moves"]) == 8
+    assert not data["cached"]
+
+    other = client.post("/games").json()["game_id"]
+    client.post(f"/games/{other}/moves", json={"moves": [{"player": "X", "pos": "c1"}]})
+    assert client.get(f"/games/{other}/hint").json()["cached"]  # 對稱的局面共用快取
+    assert client.get("/hint/stats").json()["hit_rate"] == 0.5
+    assert client.get("/games/missing/hint").status_code == 404
@@ -0,0 +1,147 @@
+# test_audio.py
+import asyncio
+import importlib
+import io
+import wave
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import ai
+from app.core.audio import AudioDecodeError, UploadTooLarge, decode_audio, read_multipart_file, resample
+from app.core.inference import Overloaded
+
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+
+
+def _wav_bytes(rate=44100, seconds=0.5, channels=2, freq=440.0, sampwidth=2):
+    t = np.arange(int(rate * seconds)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * freq * t)
+    if sampwidth == 1:
+        pcm = (tone * 127 + 128).astype(np.uint8)
+    else:
+        pcm = (tone * 32767).astype("<i2")
+    frames = np.repeat(pcm[:, None], channels, axis=1)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sampwidth)
+        w.setframerate(rate)
+        w.writeframes(frames.tobytes())
+    return buf.getvalue()
+
+
+def _peak_hz(samples, rate=16000):
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.argmax(spectrum) * rate / len(samples)
+
+
+@pytest.mark.parametrize("rate,channels,sampwidth", [(44100, 2, 2), (16000, 1, 2), (8000, 1, 1)])
+def test_decode_wav_to_16k_mono_float32(rate, channels, sampwidth):
+    samples = decode_audio(_wav_bytes(rate=rate, channels=channels, sampwidth=sampwidth))
+    assert samples.dtype == np.float32
+    assert samples.ndim == 1
+    assert len(samples) == 8000
+    assert abs(_peak_hz(samples) - 440) < 5
+    assert 0.4 < np.abs(samples).max() < 0.6
+
+
+def test_resample_keeps_length_ratio():
+    x = np.zeros(22050, dtype=np.float32)
+    assert len(resample(x, 22050)) == 16000
+    assert resample(x, 16000) is x
+
+
+def test_decode_rejects_garbage():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"FAKEWAVDATA")
+
+
+def _multipart(payload, boundary="xYzBoundary"):
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n").encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _stream(body, size, pulled):
+    async def chunks():
+        for i in range(0, len(body), size):
+            pulled.append(i)
+            yield body[i:i + size]
+    return chunks()
+
+
+def test_multipart_stream_extracts_file_part():
+    body, content_type = _multipart(bytes(range(256)) * 40)
+    for size in (1, 7, 4096):
+        data = asyncio.run(read_multipart_file(_stream(body, size, []), content_type, 20_000))
+        assert data == bytes(range(256)) * 40
+
+
+def test_multipart_stream_stops_reading_once_over_limit():
+    body, content_type = _multipart(b"\0" * (5 * 1024 * 1024))
+    pulled = []
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(read_multipart_file(_stream(body, 64 * 1024, pulled), content_type, 100_000))
+    assert len(pulled) <= 3  # 5 MB 的 body 只讀了開頭幾塊就拒絕
+
+
+class RecordingPipeline:
+    def __init__(self):
+        self.inputs = []
+
+    def __call__(self, inputs, **kwargs):
+        self.inputs.extend(inputs)
+        return [{"text": str(len(item["raw"]))} for item in inputs]
+
+
+def test_transcribe_passes_decoded_array(monkeypatch):
+    pipe = RecordingPipeline()
+    monkeypatch.setattr(ai.asr_model, "_model", pipe)
+    wav = _wav_bytes()
+    res = client.post("/transcribe", files={"file": ("../../etc/passwd", wav, "audio/wav")})
+    assert res.status_code == 200
+    assert res.json()["text"] == "8000"
+    item = pipe.inputs[0]
+    assert item["sampling_rate"] == 16000
+    assert item["raw"].dtype == np.float32
+
+    # 也可以直接把音訊當 body 上傳
+    res = client.post("/transcribe", content=wav, headers={"content-type": "audio/wav"})
+    assert res.json()["text"] == "8000"
+
+
+def test_transcribe_rejects_oversized_upload(monkeypatch):
+    monkeypatch.setattr(api, "ASR_MAX_UPLOAD_BYTES", 1000)
+    res = client.post("/transcribe", files={"file": ("a.wav", b"\0" * 5000, "audio/wav")})
+    assert res.status_code == 413
+
+
+def test_transcribe_does_not_use_form_parsing(monkeypatch):
+    # Starlette 的 request.form() 會先收完整份 body、大檔寫到暫存檔；/transcribe 必須自己串流解析
+    from starlette.requests import Request
+
+    async def no_form(self, *args, **kwargs):
+        raise AssertionError("request.form() should not be called")
+
+    monkeypatch.setattr(Request, "form", no_form)
+    monkeypatch.setattr(ai.asr_model, "_model", RecordingPipeline())
+    body, content_type = _multipart(_wav_bytes())
+    res = client.post("/transcribe", content=body, headers={"content-type": content_type})
+    assert res.status_code == 200
+    assert res.json()["text"] == "8000"
+    res = client.post("/transcribe", content=b"--x", headers={"content-type": "multipart/form-data"})
+    assert res.status_code == 400
+
+
+def test_transcribe_returns_503_when_asr_queue_is_full(monkeypatch):
+    async def full(audio):
+        raise Overloaded("語音辨識佇列已滿")
+
+    monkeypatch.setattr(api.asr_batcher, "submit", full)
+    res = client.post("/transcribe", files={"file": ("a.wav", _wav_bytes(), "audio/wav")})
+    assert res.status_code == 503
@@ -0,0 +1,77 @@
+# test_batching.py
+import asyncio
+import threading
+
+import pytest
+
+from app.core.batching import MicroBatcher
+from app.core.inference import InferencePool, Overloaded
+
+
+def test_concurrent_requests_share_a_batch():
+    seen = []
+
+    def batch_fn(items):
+        seen.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8, 10]
+    assert [len(b) for b in seen] == [4, 2]
+    stats = batcher.stats()
+    assert stats["batches"] == 2
+    assert stats["items"] == 6
+    assert stats["batch_size_histogram"] == {"2": 1, "4": 1}
+    assert stats["queue_depth"] == 0
+
+
+def test_batch_error_reaches_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model crashed")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_survives_event_loop_change():
+    batcher = MicroBatcher(lambda items: [i + 1 for i in items], max_wait_ms=1)
+    assert asyncio.run(batcher.submit(1)) == 2
+    assert asyncio.run(batcher.submit(2)) == 3
+
+
+def test_rejects_invalid_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0)
+
+
+def test_full_queue_is_rejected_and_batches_use_pool():
+    release = threading.Event()
+    pool = InferencePool("asr-test", max_workers=1, max_pending=4, timeout=5)
+    batcher = MicroBatcher(lambda items: [release.wait(5) and i for i in items],
+                           max_batch_size=1, max_wait_ms=1, pool=pool, max_queue=1)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.05)  # 第一筆已在 pool 中執行
+        assert pool.stats()["running"] == 1
+        second = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await batcher.submit(3)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(main()) == [1, 2]
+    assert batcher.stats()["rejected"] == 1
+    assert pool.stats()["completed"] == 2
+    pool.shutdown()
+
@@ -0,0 +1,17 @@
+# test_benchmarks.py
+from benchmarks.run import compare
+
+
+def _report(**medians):
+    return {"results": {name: {"median": value} for name, value in medians.items()}}
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = _report(a=10.0, b=10.0, c=10.0)
+    current = _report(a=11.0, b=13.0, c=5.0)
+    regressions = compare(current, baseline, threshold=0.2)
+    assert [name for name, *_ in regressions] == ["b"]
+
+
+def test_compare_ignores_missing_entries():
+    assert compare(_report(a=1.0), _report(a=1.0, gone=1.0), threshold=0.1) == []
@@ -0,0 +1,90 @@
+# test_board.py
+import random
+
+from app.core.board import WIN_TABLE, Board
+from benchmarks.list_board import ListBoard
+
+
+def test_place_and_win():
+    board = Board()
+    for pos, player in [("a1", "X"), ("a2", "O"), ("b1", "X"), ("b2", "O"), ("c1", "X")]:
+        success, _ = board.place_piece(pos, player)
+        assert success
+    assert board.winner == "X"
+    assert board.game_over is True
+    assert board.is_winner("X")
+    assert not board.is_winner("O")
+
+
+def test_occupied_cell_rejected():
+    board = Board()
+    board.place_piece("b2", "X")
+    assert board.place_piece("b2", "O") == (False, "已經有棋子")
+    assert board.available_positions() == [0, 1, 2, 3, 5, 6, 7, 8]
+
+
+def test_move_oldest_piece():
+    board = Board()
+    for pos, player in [("a1", "X"), ("b1", "O"), ("c1", "X"), ("a2", "O"),
+                        ("c2", "X"), ("a3", "O"), ("b3", "X"), ("c3", "O")]:
+        board.place_piece(pos, player)
+    success, state = board.move_piece("b2", "X")
+    assert success
+    assert state["a1"] is None
+    assert state["b2"] == "X"
+    assert board.pieces["X"] == [2, 5, 7, 4]
+    assert board.board[4] == "X"
+
+
+def test_matches_list_engine_on_random_games():
+    rng = random.Random(1234)
+    for _ in range(200):
+        new, old = Board(), ListBoard()
+        for _ in range(30):
+            player = new.turn
+            empties = new.available_positions()
+            assert empties == old.available_positions()
+            to_pos = new.idx_to_pos(rng.choice(empties))
+            if len(new.pieces[player]) < new.max_pieces:
+                result = new.place_piece(to_pos, player)
+                assert result == old.place_piece(to_pos, player)
+            else:
+                from_pos = new.idx_to_pos(rng.choice(new.pieces[player]))
+                result = new.move_piece(to_pos, player, from_pos)
+                assert result == old.move_piece(to_pos, player, from_pos)
+            assert new.board == old.board
+            assert new.pieces == old.pieces
+            assert (new.winner, new.turn, new.game_over) == (old.winner, old.turn, old.game_over)
+            if new.game_over:
+                break
+
+
+def test_line_counts_track_masks():
+    # 增量維護的連線計數必須與直接查表的結果一致（含不照規則、終局後繼續走的情況）
+    rng = random.Random(99)
+    board = Board()
+    for _ in range(2000):
+        player = rng.choice("XO")
+        to_pos = board.idx_to_pos(rng.choice(board.available_positions()))
+        if len(board.pieces[player]) < board.max_pieces:
+            board.place_piece(to_pos, player)
+        else:
+            board.move_piece(to_pos, player, board.idx_to_pos(rng.choice(board.pieces[player])))
+        for side in "XO":
+            assert board.has_line(side) == WIN_TABLE[board.masks[side]]
+        if rng.random() < 0.05:
+            board.reset()
+            assert board.line_counts == {"X": 0, "O": 0}
+
+
+def test_render_cached_per_version():
+    board = Board()
+    first = board.render_string()
+    assert board.render_string() is first
+    board.place_piece("a1", "X")
+    assert board.version == 1
+    assert board.render()["a1"] == "X"
+    assert board.render_compact() == b'{"cells":"X........","winner":null,"turn":"O","over":false,"version":1}'
+    board.reset()
+    assert board.version == 2
+    assert board.render()["a1"] is None
@@ -0,0 +1,57 @@
+# test_decision_cache.py
+import importlib
+
+from fastapi.testclient import TestClient
+
+from app.core.cache import LRUCache
+
+# app.api 的 __init__ 匯出同名的 FastAPI 物件，需用 import_module 取得模組本身
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+
+
+def test_lru_cache_evicts_and_counts():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert len(cache) == 2
+
+
+def test_rule_fast_path_skips_model(monkeypatch):
+    def boom(*args):
+        raise AssertionError("model should not be called")
+
+    monkeypatch.setattr(api, "_llm_decision", boom)
+    game_id = client.post("/games").json()["game_id"]
+    res = client.post("/nlp_move", json={"prompt": "下在 B2", "game_id": game_id})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["decision"]["source"] == "rule"
+    assert data["board"]["b2"] == "X"
+
+
+def test_model_decisions_are_cached(monkeypatch):
+    calls = []
+
+    def fake(data, board, player):
+        calls.append(data.prompt)
+        return {"action": "place", "pos": "c3", "from_pos": None, "player": player, "raw": ""}
+
+    monkeypatch.setattr(api, "_llm_decision", fake)
+    api.decision_cache.clear()
+    game_id = client.post("/games").json()["game_id"]
+    first = client.post("/llm_move", json={"prompt": "你覺得 呢？", "game_id": game_id}).json()
+    second = client.post("/llm_move", json={"prompt": "  你覺得   呢？ ", "game_id": game_id}).json()
+    assert first["decision"]["source"] == "model"
+    assert second["decision"]["source"] == "cache"
+    assert len(calls) == 1
+
+    stats = client.get("/llm/stats").json()
+    assert stats["cache"]["hits"] == 1
+    assert stats["model_calls"] >= 1
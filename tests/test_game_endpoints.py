@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from app.api.app import app
+from app.api.app import app, store
 import pytest
 
 client = TestClient(app)
@@ -79,4 +79,142 @@ def test_draw():
     assert resp.status_code == 200
     data = resp.json()
     assert data["winner"] is None
-    assert data["is_over"] is True
\ No newline at end of file
+    assert data["is_over"] is True
+def test_games_are_independent():
+    first = create_game()
+    second = create_game()
+    assert first != second
+    client.post(f"/games/{first}/move", json={"player": "X", "position": "a1"})
+    data = client.get(f"/games/{second}").json()
+    assert data["board"]["a1"] is None
+    assert data["next_player"] == "X"
+
+def test_unknown_game():
+    resp = client.get("/games/does-not-exist")
+    assert resp.status_code == 404
+
+def test_compact_response_mode():
+    game_id = create_game()
+    resp = client.post(f"/games/{game_id}/move?compact=1", json={"player": "X", "position": "b2"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "board" not in data and "board_str" not in data
+    assert data["state"]["cells"] == "....X...."
+    assert data["state"]["turn"] == "O"
+    assert data["state"]["version"] == 1
+    assert "tts" in data
+
+    resp = client.get(f"/games/{game_id}", headers={"X-Response-Mode": "compact"})
+    assert resp.json()["state"]["cells"] == "....X...."
+
+def test_omit_fields():
+    game_id = create_game()
+    resp = client.post(f"/games/{game_id}/move?omit=board_str,tts", json={"player": "X", "position": "a1"})
+    data = resp.json()
+    assert "board_str" not in data and "tts" not in data
+    assert data["board"]["a1"] == "X"
+
+def test_batch_moves_stop_at_first_rejection():
+    game_id = create_game()
+    moves = [
+        {"player": "X", "pos": "a1"},
+        {"player": "O", "pos": "b2"},
+        {"player": "X", "pos": "b2"},  # 已經有棋子
+        {"player": "X", "pos": "c3"},
+    ]
+    resp = client.post(f"/games/{game_id}/moves", json={"moves": moves})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["applied"] == 2
+    assert data["rejected"] == 2
+    assert data["error"] == "Position already occupied"
+    assert data["state"]["cells"] == "X...O...."
+    assert data["state"]["version"] == 2
+
+def test_batch_moves_whole_game_in_one_request():
+    game_id = create_game()
+    moves = [{"player": p, "pos": pos} for p, pos in
+             [("X", "a1"), ("O", "b1"), ("X", "a2"), ("O", "b2"), ("X", "a3")]]
+    data = client.post(f"/games/{game_id}/moves", json={"moves": moves}).json()
+    assert data["rejected"] is None and data["applied"] == 5
+    assert data["state"]["winner"] == "X"
+    assert client.get(f"/games/{game_id}").json()["board"]["a3"] == "X"
+    assert client.post("/games/missing/moves", json={"moves": moves}).status_code == 404
+
+def test_batch_moves_malformed_body_applies_nothing():
+    game_id = create_game()
+    bad_moves = [
+        {"player": "O"},                                  # 沒有 pos
+        {"player": "O", "action": "move", "pos": "b2"},   # move 沒有 from_pos
+        {"player": "O", "action": "jump", "pos": "b2"},
+    ]
+    for bad in bad_moves:
+        resp = client.post(f"/games/{game_id}/moves", json={"moves": [{"player": "X", "pos": "a1"}, bad]})
+        assert resp.status_code == 422
+    state = client.get(f"/games/{game_id}?compact=1").json()["state"]
+    assert state["cells"] == "........." and state["version"] == 0
+
+def test_batch_moves_unexpected_error_is_reported_as_rejection():
+    game_id = create_game()
+    moves = [{"player": "X", "pos": "a1"}, {"player": "Z", "pos": "b2"}, {"player": "O", "pos": "c3"}]
+    resp = client.post(f"/games/{game_id}/moves", json={"moves": moves})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["applied"], data["rejected"]) == (1, 1)
+    assert data["error"]
+    assert data["state"]["cells"] == "X........"
+
+def test_etag_and_if_none_match():
+    game_id = create_game()
+    resp = client.get(f"/games/{game_id}")
+    etag = resp.headers["etag"]
+    assert etag.startswith('W/"') and etag.endswith('-0"')
+    assert resp.headers["vary"] == "X-Response-Mode"
+    resp = client.get(f"/games/{game_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["vary"] == "X-Response-Mode"
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"})
+    resp = client.get(f"/games/{game_id}?compact=1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == etag[:-2] + '1"'
+
+def test_recreated_game_gets_new_etag():
+    game_id = "etag-recreated"
+    client.post("/reset", params={"game_id": game_id})
+    etag = client.get(f"/games/{game_id}").headers["etag"]
+    store.delete(game_id)  # 模擬被淘汰後以同一個 id 重新建立、再重置到相同版本
+    client.post("/reset", params={"game_id": game_id})
+    resp = client.get(f"/games/{game_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+def test_long_poll_wakes_on_next_move():
+    import threading
+    import time
+
+    game_id = create_game()
+    result = {}
+
+    def poll():
+        result["resp"] = client.get(f"/games/{game_id}?wait_for_version=1&timeout=5")
+
+    thread = threading.Thread(target=poll)
+    thread.start()
+    time.sleep(0.1)
+    assert "resp" not in result
+    started = time.perf_counter()
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "b2"})
+    thread.join()
+    assert time.perf_counter() - started < 1
+    assert result["resp"].status_code == 200
+    assert result["resp"].json()["board"]["b2"] == "X"
+
+    # 版本已到：立即回傳；等不到：逾時後沒帶 If-None-Match 回 200 與目前狀態，帶了且相符才回 304
+    assert client.get(f"/games/{game_id}?wait_for_version=1").status_code == 200
+    resp = client.get(f"/games/{game_id}?wait_for_version=2&timeout=0.05")
+    assert resp.status_code == 200
+    assert resp.json()["board"]["b2"] == "X"
+    resp = client.get(f"/games/{game_id}?wait_for_version=2&timeout=0.05",
+                      headers={"If-None-Match": resp.headers["etag"]})
+    assert resp.status_code == 304
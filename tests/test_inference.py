@@ -0,0 +1,102 @@
+# test_inference.py
+import asyncio
+import importlib
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.inference import InferencePool, InferenceTimeout, Overloaded
+
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+
+
+def test_pool_runs_and_counts():
+    pool = InferencePool("t", max_workers=2)
+    assert asyncio.run(pool.run(sum, [1, 2, 3])) == 6
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_pool_timeout_cancels_queued_work():
+    pool = InferencePool("t", max_workers=1, max_pending=4, timeout=0.05)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        blocker = asyncio.ensure_future(pool.run(release.wait, 5, timeout=5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(InferenceTimeout):
+            await pool.run(ran.append, "queued")  # 排在 blocker 後面，逾時後被移出佇列
+        release.set()
+        await blocker
+
+    asyncio.run(scenario())
+    assert ran == []
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_pool_rejects_when_full():
+    pool = InferencePool("t", max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded):
+            await pool.run(sum, [1])
+        release.set()
+        await blocker
+
+    asyncio.run(scenario())
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_slow_model_times_out_without_blocking_game_endpoints(monkeypatch):
+    release = threading.Event()
+
+    def slow_decision(data, board, player):
+        release.wait(5)
+        return {"action": "place", "pos": "a1", "from_pos": None, "player": player, "raw": ""}
+
+    monkeypatch.setattr(api, "_llm_decision", slow_decision)
+    monkeypatch.setattr(api.model_pool, "timeout", 0.2)
+    api.decision_cache.clear()
+    game_id = client.post("/games").json()["game_id"]
+    results = {}
+
+    def call_llm():
+        results["llm"] = client.post("/llm_move", json={"prompt": "慢慢想 一下", "game_id": game_id})
+
+    thread = threading.Thread(target=call_llm)
+    thread.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    res = client.post(f"/games/{game_id}/move", json={"player": "X", "position": "b2"})
+    assert res.status_code == 200
+    assert time.perf_counter() - started < 0.2  # 不必等模型
+    thread.join()
+    release.set()
+    assert results["llm"].status_code == 504
+
+
+def test_ai_move_conflict_when_board_changes(monkeypatch):
+    game_id = client.post("/games").json()["game_id"]
+    real_choice = api._ai_choice
+
+    def choice_then_human_moves(board, player, *args):
+        result = real_choice(board, player, *args)
+        with api.store.session(game_id) as live:
+            live.place_piece("c3", "X")  # 搜尋期間有人先下了
+        return result
+
+    monkeypatch.setattr(api, "_ai_choice", choice_then_human_moves)
+    res = client.post("/ai_move", json={"player": "X", "game_id": game_id})
+    assert res.status_code == 409
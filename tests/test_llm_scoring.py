@@ -0,0 +1,77 @@
+# test_llm_scoring.py
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from fastapi.testclient import TestClient
+
+from app.api import app
+from app.core import ai
+from app.core.ai import _score_continuations, ai_decision_scored, legal_actions
+from app.core.board import Board
+from app.core.models import LazyModel
+
+client = TestClient(app)
+
+
+class CharTokenizer:
+    eos_token_id = 0
+
+    def encode(self, text):
+        return [ord(c) % 255 + 1 for c in text]
+
+
+class TinyPipe:
+    def __init__(self):
+        torch.manual_seed(0)
+        config = transformers.GPT2Config(vocab_size=256, n_positions=512, n_embd=32, n_layer=1, n_head=2)
+        self.model = transformers.GPT2LMHeadModel(config).eval()
+        self.tokenizer = CharTokenizer()
+
+
+@pytest.fixture
+def tiny_llm(monkeypatch):
+    pipe = TinyPipe()
+    monkeypatch.setattr(ai, "llm_model", LazyModel("llm", lambda: pipe))
+    return pipe
+
+
+def _moving_board():
+    board = Board()
+    for pos, player in [("a1", "X"), ("b1", "O"), ("c1", "X"), ("a2", "O"),
+                        ("c2", "X"), ("a3", "O"), ("b3", "X"), ("c3", "O")]:
+        board.place_piece(pos, player)
+    return board
+
+
+def test_legal_actions_by_phase():
+    board = Board()
+    assert len(legal_actions(board, "X")) == 9
+    moves = legal_actions(_moving_board(), "X")
+    assert moves == [("move", src, "b2") for src in ("a1", "c1", "c2", "b3")]
+
+
+def test_batched_scores_match_unbatched(tiny_llm):
+    texts = [" pos=a1", " move=a1->b2", " pos=c3"]
+    batched = _score_continuations(tiny_llm, "下一步:", texts)
+    single = [_score_continuations(tiny_llm, "下一步:", [t])[0] for t in texts]
+    assert batched == pytest.approx(single, abs=1e-4)
+
+
+def test_scored_decision_is_always_legal(tiny_llm):
+    board = _moving_board()
+    decision = ai_decision_scored("幫我決定下一步棋", board, "X")
+    assert decision["action"] == "move"
+    assert decision["pos"] == "b2"
+    assert decision["from_pos"] in ("a1", "c1", "c2", "b3")
+
+
+def test_nlp_move_applies_scored_decision(tiny_llm):
+    game_id = client.post("/games").json()["game_id"]
+    res = client.post("/nlp_move", json={"prompt": "下在哪裡好？", "game_id": game_id})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["decision"]["player"] == "X"
+    assert data["board"][data["decision"]["pos"]] == "X"
+    assert data["next_player"] == "O"
@@ -0,0 +1,55 @@
+# test_metrics.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.app import app
+from app.core.metrics import HTTP_LATENCY, MODEL_ERRORS, Registry, model_timer
+
+client = TestClient(app)
+
+
+def test_histogram_and_counter_render():
+    registry = Registry()
+    hist = registry.histogram("op_seconds", "op latency", ("op",), buckets=(0.1, 1.0))
+    counter = registry.counter("ops_total", "ops", ("op",))
+    hist.observe(0.05, "a")
+    hist.observe(0.5, "a")
+    hist.observe(5, "a")
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    text = registry.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="a",le="1"} 2' in text
+    assert 'op_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="a"} 3' in text
+    assert 'ops_total{op="a"} 3' in text
+    with pytest.raises(ValueError):
+        registry.counter("ops_total", "duplicate")
+
+
+def test_model_timer_counts_errors():
+    before = MODEL_ERRORS.value("test", "boom")
+    with pytest.raises(RuntimeError):
+        with model_timer("test", "boom"):
+            raise RuntimeError("x")
+    assert MODEL_ERRORS.value("test", "boom") == before + 1
+
+
+def test_metrics_endpoint_reports_routes():
+    game_id = client.post("/games").json()["game_id"]
+    before = HTTP_LATENCY.count("/games/{game_id}/move", "POST")
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"})
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "b1"})  # 400
+    assert HTTP_LATENCY.count("/games/{game_id}/move", "POST") == before + 2
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert 'http_requests_total{route="/games/{game_id}/move",method="POST",status="200"}' in text
+    assert 'http_request_errors_total{route="/games/{game_id}/move",method="POST",status="400"}' in text
+    assert 'board_operation_duration_seconds_count{op="place_piece"}' in text
+    assert "http_requests_in_flight" in text
+    assert "games_in_memory" in text
+    assert game_id not in text  # 路由以樣板為標籤
@@ -0,0 +1,42 @@
+# test_models.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import app
+from app.core.models import LazyModel, ModelUnavailable
+
+client = TestClient(app)
+
+
+def test_lazy_model_loads_once():
+    calls = []
+    model = LazyModel("fake", lambda: calls.append(1) or "model")
+    assert model.state == "unloaded"
+    assert model.get() == "model"
+    assert model.get() == "model"
+    assert calls == [1]
+    assert model.status()["state"] == "ready"
+
+
+def test_lazy_model_reports_error_and_retries():
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("no weights")
+        return "model"
+
+    model = LazyModel("flaky", loader)
+    with pytest.raises(ModelUnavailable):
+        model.get()
+    assert model.status()["state"] == "error"
+    assert "no weights" in model.status()["error"]
+    assert model.get() == "model"
+
+
+def test_health_endpoints():
+    assert client.get("/healthz").json() == {"status": "ok"}
+    res = client.get("/readyz")
+    assert res.status_code in (200, 503)
+    assert set(res.json()["models"]) >= {"asr", "llm"}
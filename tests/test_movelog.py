@@ -0,0 +1,105 @@
+# test_movelog.py
+import importlib
+import random
+
+from fastapi.testclient import TestClient
+
+from app.core.board import Board
+from app.core.movelog import RECORD, MoveLog, MoveLogReader, encode_game_id
+
+api = importlib.import_module("app.api.app")
+
+
+def _random_game(log, game_id, rng, plies=30):
+    board = Board()
+    for _ in range(plies):
+        player = board.turn
+        version = board.version
+        to_pos = board.idx_to_pos(rng.choice(board.available_positions()))
+        if len(board.pieces[player]) < board.max_pieces:
+            board.place_piece(to_pos, player)
+            log.append(game_id, board.version, "place", player, to_pos=to_pos)
+        else:
+            from_pos = board.idx_to_pos(rng.choice(board.pieces[player]))
+            board.move_piece(to_pos, player, from_pos)
+            log.append(game_id, board.version, "move", player, from_pos, to_pos)
+        assert board.version == version + 1
+        if board.game_over:
+            break
+    return board
+
+
+def test_replay_rebuilds_games(tmp_path):
+    path = tmp_path / "moves.log"
+    log = MoveLog(str(path), flush_records=7)
+    rng = random.Random(5)
+    boards = {f"g{i}": _random_game(log, f"g{i}", rng) for i in range(50)}
+    log.close()
+
+    reader = MoveLogReader(str(path))
+    assert len(reader) == sum(b.version for b in boards.values())
+    assert sorted(reader.games()) == sorted(boards)
+    for game_id, board in boards.items():
+        replayed = reader.replay(game_id)
+        assert replayed.pieces == board.pieces
+        assert (replayed.winner, replayed.turn, replayed.game_over) == (board.winner, board.turn, board.game_over)
+    reader.close()
+
+
+def test_reader_ignores_truncated_tail_and_resets(tmp_path):
+    path = tmp_path / "moves.log"
+    log = MoveLog(str(path))
+    log.append("g", 1, "place", "X", to_pos="a1")
+    log.append("g", 2, "reset", "X")
+    log.append("g", 3, "place", "X", to_pos="b2")
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD.size // 2))  # 模擬寫到一半時崩潰
+
+    reader = MoveLogReader(str(path))
+    assert len(reader) == 3
+    assert reader.action_counts() == {"place": 2, "move": 0, "reset": 1}
+    assert reader.replay("g").pieces == {"X": [4], "O": []}
+    reader.close()
+
+
+def test_long_game_ids_are_hashed():
+    assert encode_game_id("default") == b"default"
+    assert len(encode_game_id("x" * 40)) == 16
+
+
+def test_endpoints_append_accepted_moves(tmp_path, monkeypatch):
+    log = MoveLog(str(tmp_path / "moves.log"))
+    monkeypatch.setattr(api, "move_log", log)
+    client = TestClient(api.app)
+    game_id = client.post("/games").json()["game_id"]
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"})
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "b1"})  # 輪錯人，不記錄
+    client.post("/ai_move", json={"player": "O", "game_id": game_id})
+    log.close()
+
+    reader = MoveLogReader(log.path)
+    records = reader.game(game_id)
+    assert records["action"].tolist() == [0, 0]
+    assert records["player"].tolist() == [0, 1]
+    with api.store.session(game_id) as board:
+        assert reader.replay(game_id).pieces == board.pieces
+    reader.close()
+
+
+def test_recreated_game_starts_with_reset_record(tmp_path, monkeypatch):
+    log = MoveLog(str(tmp_path / "moves.log"))
+    monkeypatch.setattr(api, "move_log", log)
+    client = TestClient(api.app)
+    game_id = "recreated-game"
+    client.post("/game", json={"game_id": game_id, "player": "X", "action": "place", "pos": "a1"})
+    api.store.delete(game_id)  # 模擬被淘汰
+    client.post("/game", json={"game_id": game_id, "player": "X", "action": "place", "pos": "c3"})
+    log.close()
+
+    reader = MoveLogReader(log.path)
+    records = reader.game(game_id)
+    assert records["action"].tolist() == [2, 0, 2, 0]
+    assert records["ply"].tolist() == [0, 1, 0, 1]
+    assert reader.replay(game_id).pieces == {"X": [8], "O": []}
+    reader.close()
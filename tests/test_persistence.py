@@ -0,0 +1,161 @@
+# test_persistence.py
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.board import Board
+from app.core.persistence import SQLiteGameRepository, SQLiteSharedState
+from app.core.store import GameNotFound, GameStore, VersionConflict
+
+api = importlib.import_module("app.api.app")
+
+
+def _store(repo, **kwargs):
+    return GameStore(loader=repo.load, saver=repo.save, **kwargs)
+
+
+def test_board_dict_round_trip():
+    board = Board()
+    for pos, player in [("a1", "X"), ("b2", "O"), ("b1", "X"), ("c3", "O"), ("c1", "X")]:
+        board.place_piece(pos, player)
+    restored = Board.from_dict(board.to_dict())
+    assert restored.board == board.board
+    assert restored.pieces == board.pieces
+    assert restored.line_counts == board.line_counts
+    assert (restored.winner, restored.turn, restored.game_over, restored.version) == \
+        (board.winner, board.turn, board.game_over, board.version)
+
+
+def test_games_survive_restart(tmp_path):
+    path = str(tmp_path / "games.sqlite3")
+    repo = SQLiteGameRepository(path, flush_interval=10)
+    store = _store(repo)
+    game_id, _ = store.create()
+    with store.session(game_id) as board:
+        board.place_piece("a1", "X")
+    with store.session(game_id) as board:
+        board.place_piece("b2", "O")
+    with store.session(game_id) as board:
+        pass  # 沒有改動，不會再存一次
+    repo.close()
+    assert repo.stats()["saves"] == 3  # create + 兩步
+    assert repo.stats()["writes"] == 1  # 同一局合併成一筆寫入
+
+    repo = SQLiteGameRepository(path)
+    store = _store(repo)
+    board = store.get(game_id)
+    assert board.pieces == {"X": [0], "O": [4]}
+    assert board.turn == "X"
+    assert store.loaded == 1
+    with pytest.raises(GameNotFound):
+        store.get("missing")
+    repo.close()
+
+
+def test_evicted_game_is_reloaded_from_pending_writes(tmp_path):
+    repo = SQLiteGameRepository(str(tmp_path / "games.sqlite3"), flush_interval=10)
+    store = _store(repo, max_games=1, shards=1)
+    first, _ = store.create()
+    with store.session(first) as board:
+        board.place_piece("c3", "X")
+    store.create()  # 容量只有 1，first 被淘汰（尚未寫入 SQLite）
+    assert store.get(first).board[8] == "X"
+    repo.close()
+
+
+def test_endpoint_lazy_loads_after_restart(tmp_path, monkeypatch):
+    path = str(tmp_path / "games.sqlite3")
+    repo = SQLiteGameRepository(path)
+    monkeypatch.setattr(api, "store", _store(repo))
+    client = TestClient(api.app)
+    game_id = client.post("/games").json()["game_id"]
+    client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a2"})
+    repo.close()
+
+    repo = SQLiteGameRepository(path)
+    monkeypatch.setattr(api, "store", _store(repo))  # 模擬重啟：記憶體是空的
+    res = client.get(f"/games/{game_id}")
+    assert res.status_code == 200
+    assert res.json()["board"]["a2"] == "X"
+    assert res.json()["turn"] == "O"
+    repo.close()
+
+
+def test_shared_state_sees_other_workers_moves(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a = GameStore(shared=SQLiteSharedState(path))
+    worker_b = GameStore(shared=SQLiteSharedState(path))
+    game_id, _ = worker_a.create()
+    with worker_b.session(game_id) as board:
+        board.place_piece("a1", "X")
+    with worker_a.session(game_id) as board:  # a 的記憶體副本已過期，進入時重新載入
+        assert board.pieces["X"] == [0]
+        board.place_piece("b2", "O")
+    with worker_b.session(game_id) as board:
+        assert board.version == 2
+
+
+def test_shared_state_compare_and_swap_conflict(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a = GameStore(shared=SQLiteSharedState(path))
+    worker_b = GameStore(shared=SQLiteSharedState(path))
+    game_id, _ = worker_a.create()
+    with pytest.raises(VersionConflict):
+        with worker_a.session(game_id) as board:
+            with worker_b.session(game_id) as other:
+                other.place_piece("a1", "X")  # b 先寫入
+            board.place_piece("c3", "X")
+    with worker_a.session(game_id) as board:
+        assert board.pieces["X"] == [0]  # a 的改動被丟棄，換成 b 的版本
+    assert worker_a.shared.stats()["conflicts"] == 1
+
+
+def test_endpoint_reports_conflict_as_409(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite3")
+    monkeypatch.setattr(api, "store", GameStore(shared=SQLiteSharedState(path)))
+    other = GameStore(shared=SQLiteSharedState(path))
+    client = TestClient(api.app)
+    game_id = client.post("/games").json()["game_id"]
+    real_record = api._record
+
+    def record_then_other_worker_moves(*args, **kwargs):
+        real_record(*args, **kwargs)
+        with other.session(game_id) as board:
+            board.place_piece("c3", "X")
+
+    monkeypatch.setattr(api, "_record", record_then_other_worker_moves)
+    res = client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"})
+    assert res.status_code == 409
+    monkeypatch.setattr(api, "_record", real_record)
+    board = client.get(f"/games/{game_id}").json()["board"]
+    assert board["c3"] == "X" and board["a1"] is None
+
+
+def test_conflicting_move_is_not_written_to_move_log(tmp_path, monkeypatch):
+    from app.core.movelog import MoveLog, MoveLogReader
+
+    path = str(tmp_path / "shared.sqlite3")
+    log = MoveLog(str(tmp_path / "moves.log"))
+    monkeypatch.setattr(api, "move_log", log)
+    monkeypatch.setattr(api, "store", GameStore(shared=SQLiteSharedState(path)))
+    other = GameStore(shared=SQLiteSharedState(path))
+    client = TestClient(api.app)
+    game_id = client.post("/games").json()["game_id"]
+    real_record = api._record
+
+    def record_then_other_worker_moves(*args, **kwargs):
+        real_record(*args, **kwargs)
+        with other.session(game_id) as board:
+            board.place_piece("c3", "X")
+
+    monkeypatch.setattr(api, "_record", record_then_other_worker_moves)
+    assert client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"}).status_code == 409
+    monkeypatch.setattr(api, "_record", real_record)
+    assert client.post(f"/games/{game_id}/move", json={"player": "O", "position": "b2"}).status_code == 200
+    log.close()
+
+    reader = MoveLogReader(log.path)
+    records = reader.game(game_id)
+    assert records["to"].tolist() == [4]  # 只有成功寫入的 b2，被拒絕的 a1 沒有留下
+    reader.close()
@@ -0,0 +1,115 @@
+# test_search.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import app
+from app.core.ai import ai_move, ai_move_with_info
+from app.core.board import Board
+from app.core.search import AlphaBeta, MCTS, TranspositionTable, search_move
+
+client = TestClient(app)
+
+
+def _play(board, moves):
+    for pos, player in moves:
+        board.place_piece(pos, player)
+    return board
+
+
+def _moving_board():
+    return _play(Board(), [("a1", "X"), ("b1", "O"), ("c1", "X"), ("a2", "O"),
+                           ("c2", "X"), ("a3", "O"), ("b3", "X"), ("c3", "O")])
+
+
+@pytest.mark.parametrize("strategy", ["alphabeta", "mcts"])
+def test_takes_immediate_win(strategy):
+    board = _play(Board(), [("a1", "X"), ("a2", "O"), ("b1", "X"), ("b2", "O")])
+    from_pos, to_pos, _ = search_move(board, "X", strategy, time_ms=300)
+    assert (from_pos, to_pos) == (None, "c1")
+
+
+def test_alphabeta_blocks_threat():
+    board = _play(Board(), [("a1", "X"), ("b2", "O"), ("b1", "X")])
+    _, to_pos, result = search_move(board, "O", "alphabeta", time_ms=300)
+    assert to_pos == "c1"
+    assert result.depth >= 1
+
+
+@pytest.mark.parametrize("strategy", ["random", "alphabeta", "mcts"])
+def test_search_never_mutates_board(strategy):
+    board = _moving_board()
+    before = (board.position_key(), board.version, board.render_string())
+    from_pos, to_pos, _ = ai_move(board, "X", strategy, time_ms=50)
+    assert (board.position_key(), board.version, board.render_string()) == before
+    assert board.move_piece(to_pos, "X", from_pos)[0]
+
+
+def test_node_budget_is_respected():
+    result = AlphaBeta(TranspositionTable()).search((), (), 0, time_ms=10_000, max_nodes=500)
+    assert result.nodes <= 500
+    result = MCTS(TranspositionTable()).search((), (), 0, time_ms=10_000, max_nodes=500)
+    assert result.nodes <= 500
+
+
+@pytest.mark.parametrize("engine_cls", [AlphaBeta, MCTS])
+def test_tt_entries_are_separated_by_max_pieces(engine_cls):
+    # 同一個局面在子數上限 3 與 4 下的合法走法不同，共用置換表時不能互相命中
+    tt = TranspositionTable()
+    xs, os_ = (0, 2, 7), (1, 4, 6)
+    engine_cls(tt, 3).search(xs, os_, 0, time_ms=10_000, max_nodes=2_000)
+    engine_cls(tt, 4).search(xs, os_, 0, time_ms=10_000, max_nodes=2_000)
+    assert {key[1] for key in tt._data} == {3, 4}
+
+
+def test_tt_is_shared_across_move_orders():
+    # 同樣的佔位、不同的落子順序是同一個局面：第二次搜尋完全命中第一次的結果
+    tt = TranspositionTable()
+    first = AlphaBeta(tt).search((0, 8), (4,), 1, time_ms=10_000, max_nodes=50_000)
+    size = len(tt)
+    second = AlphaBeta(tt).search((8, 0), (4,), 1, time_ms=10_000, max_nodes=50_000)
+    assert len(tt) == size
+    assert (second.move, second.score) == (first.move, first.score)
+
+
+def test_concurrent_searches_with_tiny_shared_tt():
+    # 表很小會一直整表清空；多個執行緒同時搜尋仍要回傳合法走法
+    import threading
+
+    tt = TranspositionTable(maxsize=64)
+    results, errors = [], []
+
+    def worker(engine_cls):
+        try:
+            for _ in range(20):
+                results.append(engine_cls(tt).search((0, 8), (4,), 1, time_ms=10_000, max_nodes=300).move)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(cls,)) for cls in (AlphaBeta, MCTS) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(results) == 80 and None not in results
+
+
+def test_info_reports_speed():
+    _, _, _, info = ai_move_with_info(Board(), "X", "alphabeta", time_ms=20)
+    assert info["strategy"] == "alphabeta"
+    assert info["nodes"] > 0
+    assert info["time_ms"] > 0
+    assert info["nodes_per_sec"] > 0
+
+
+def test_ai_move_endpoint_with_strategy():
+    game_id = client.post("/games").json()["game_id"]
+    res = client.post("/ai_move", json={"player": "X", "game_id": game_id, "strategy": "mcts", "time_ms": 30})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["success"] is True
+    assert data["search"]["strategy"] == "mcts"
+    assert "nodes_per_sec" in data["search"]
+
+    res = client.post("/ai_move", json={"player": "O", "game_id": game_id, "strategy": "nope"})
+    assert res.status_code == 400
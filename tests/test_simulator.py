@@ -0,0 +1,56 @@
+# test_simulator.py
+import numpy as np
+import pytest
+
+from app.core.board import Board
+from app.core.simulator import NO_WINNER, SelfPlaySimulator, simulate
+
+
+def _replay(history, game, max_pieces):
+    board = Board()
+    board.max_pieces = max_pieces
+    for ply in range(history.shape[0]):
+        src, dst = (int(v) for v in history[ply, game])
+        if dst < 0:
+            break
+        player = board.turn
+        if src < 0:
+            success, _ = board.place_piece(board.idx_to_pos(dst), player)
+        else:
+            success, _ = board.move_piece(board.idx_to_pos(dst), player, board.idx_to_pos(src))
+        assert success
+    return board
+
+
+@pytest.mark.parametrize("move_from,max_pieces", [("oldest", 4), ("random", 4), ("oldest", 3), ("random", 5)])
+def test_matches_board_rules(move_from, max_pieces):
+    sim = SelfPlaySimulator(300, max_pieces=max_pieces, move_from=move_from, seed=7)
+    result = sim.run(max_plies=60, record=True)
+    for game in range(300):
+        board = _replay(result.history, game, max_pieces)
+        cells = ["X" if v == 1 else "O" if v == 2 else " " for v in sim.owner[game]]
+        assert board.board == cells
+        assert board.pieces["X"] == [int(c) for c in sim.queue[game, 0, :sim.counts[game, 0]]]
+        assert board.pieces["O"] == [int(c) for c in sim.queue[game, 1, :sim.counts[game, 1]]]
+        assert board.game_over == bool(sim.done[game])
+        expected_winner = None if sim.winner[game] == NO_WINNER else "XO"[sim.winner[game]]
+        assert board.winner == expected_winner
+        assert board.turn == "XO"[sim.turn[game]]
+
+
+def test_summary_counts_every_game():
+    summary = simulate(2000, max_plies=100, seed=1)
+    total = summary["x_wins"] + summary["o_wins"] + summary["draws"] + summary["unfinished"]
+    assert total == summary["games"] == 2000
+    assert summary["x_wins"] > 0 and summary["o_wins"] > 0
+
+
+def test_draw_on_full_board():
+    # 每方 5 子時棋盤可以下滿，滿盤無人連線即和局
+    sim = SelfPlaySimulator(500, max_pieces=5, seed=3)
+    result = sim.run(max_plies=9)
+    full = (sim.owner != 0).all(axis=1)
+    assert np.all(sim.done[full])
+    draws = result.summary()["draws"]
+    assert draws > 0
+    assert draws == int((full & (result.winner == NO_WINNER)).sum())
@@ -0,0 +1,71 @@
+# test_solver.py
+import pytest
+
+from app.core import solver
+from app.core.ai import ai_move
+from app.core.board import Board
+from app.core.solver import DRAW, LOSS, WIN, PerfectTable, StateIndex, legal_moves, write_table
+
+MAX_PIECES = 3
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp("solver") / "perfect3.bin"
+    write_table(path, MAX_PIECES)
+    t = PerfectTable(path)
+    yield t
+    t.close()
+
+
+def test_index_is_dense_and_consistent():
+    index = StateIndex(2)
+    seen = [index.index(xs, os_, side) for xs, os_, side in index.states()]
+    assert seen == list(range(index.size))
+    assert index.index((0, 1, 2), (), 0) == -1  # X 多下兩子，不是合法局面
+
+
+def test_index_ignores_piece_order():
+    # 移子可選任何一顆，結果只和佔了哪些格子有關
+    index = StateIndex(4)
+    assert index.index((4, 0, 8), (2, 6), 1) == index.index((0, 4, 8), (6, 2), 1)
+    assert index.size == 6550
+
+
+def test_terminal_and_immediate_win(table):
+    # 輪到 O，但 X 已連成 a1-b1-c1
+    assert table.probe((0, 1, 2), (3, 4), 1)[:2] == (LOSS, 0)
+    # 輪到 X：a1、b1 已在，下 c1 即勝
+    result, steps, code = table.probe((0, 1), (3, 4), 0)
+    assert (result, steps) == (WIN, 1)
+    assert solver.decode_move(code) == (None, 2)
+
+
+def test_table_is_consistent_with_children(table):
+    for xs, os_, side in list(StateIndex(MAX_PIECES).states())[::97]:
+        result, steps, _ = table.probe(xs, os_, side)
+        if steps == 0 and result != DRAW:
+            continue
+        children = [table.probe(a, b, 1 - side) for _, a, b in legal_moves(xs, os_, side, MAX_PIECES)]
+        if result == WIN:
+            assert min(c[1] for c in children if c[0] == LOSS) == steps - 1
+        elif result == LOSS:
+            assert all(c[0] == WIN for c in children)
+        else:
+            assert any(c[0] == DRAW for c in children)
+            assert not any(c[0] == LOSS for c in children)
+
+
+def test_perfect_strategy_finds_win(table, monkeypatch):
+    monkeypatch.setattr(solver, "_table", table)
+    board = Board()
+    board.max_pieces = MAX_PIECES
+    for pos, player in [("a1", "X"), ("a2", "O"), ("b1", "X"), ("b2", "O")]:
+        board.place_piece(pos, player)
+    from_pos, to_pos, _ = ai_move(board, "X", "perfect")
+    assert (from_pos, to_pos) == (None, "c1")
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        ai_move(Board(), "X", "nope")
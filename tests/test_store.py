@@ -0,0 +1,76 @@
+# test_store.py
+import threading
+
+import pytest
+
+from app.core.store import GameNotFound, GameStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_create_and_get():
+    store = GameStore()
+    game_id, board = store.create()
+    assert store.get(game_id) is board
+    assert game_id in store
+    with pytest.raises(GameNotFound):
+        store.get("missing")
+    assert store.get("missing", create=True) is store.get("missing")
+
+
+def test_lru_capacity_bound():
+    store = GameStore(max_games=4, shards=1)
+    ids = [store.create()[0] for _ in range(4)]
+    store.get(ids[0])          # ids[0] 變成最近使用
+    store.create()
+    assert len(store) == 4
+    assert ids[0] in store
+    assert ids[1] not in store
+    assert store.evicted == 1
+
+
+def test_ttl_eviction():
+    clock = FakeClock()
+    store = GameStore(ttl=10, clock=clock)
+    game_id, _ = store.create()
+    clock.now = 5
+    store.get(game_id)
+    clock.now = 14
+    assert game_id in store
+    clock.now = 30
+    with pytest.raises(GameNotFound):
+        store.get(game_id)
+
+
+def test_sessions_serialize_moves_per_game():
+    store = GameStore()
+    game_id, board = store.create()
+
+    def play(pos):
+        with store.session(game_id) as b:
+            b.place_piece(pos, b.turn)
+
+    threads = [threading.Thread(target=play, args=(pos,)) for pos in ("a1", "b1", "a2", "b3")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(board.pieces["X"]) == 2
+    assert len(board.pieces["O"]) == 2
+
+
+def test_on_create_called_only_for_new_boards():
+    created = []
+    store = GameStore(on_create=lambda game_id, board: created.append(game_id))
+    store.get("a", create=True)
+    store.get("a", create=True)
+    store.delete("a")
+    store.session("a", create=True)
+    store.create()
+    assert created == ["a", "a"]
@@ -0,0 +1,107 @@
+# test_streaming_asr.py
+import importlib
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.services.streaming_asr import StreamingRecognizer
+
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+RATE = 16000
+
+
+def speech(seconds=0.1):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds=0.1):
+    return np.zeros(int(RATE * seconds), dtype=np.float32)
+
+
+def test_waits_for_stable_move_command():
+    partials = iter(["a1", "a1 到", "a1 到 c3", "a1 到 c3"])
+    rec = StreamingRecognizer(lambda window: next(partials), step_s=0.2)
+    results = []
+    for _ in range(4):
+        rec.feed(speech(0.2))
+        assert rec.due()
+        results.append(rec.decode())
+    # 單一座標、說到一半的「a1 到」都不送出；同一個移子指令連續出現兩次才送出
+    assert results == [None, None, None, ("move", "a1", "c3")]
+
+
+def test_commits_on_pause_without_waiting_for_stability():
+    rec = StreamingRecognizer(lambda window: "b2", step_s=1.0, silence_s=0.2)
+    rec.feed(speech(0.3))
+    assert not rec.due()
+    rec.feed(silence(0.2))
+    assert rec.due()  # 停頓後立即辨識一次
+    assert rec.decode() == ("place", None, "b2")
+    assert not rec.due()
+
+
+def test_window_is_bounded_and_silence_alone_never_decodes():
+    rec = StreamingRecognizer(lambda window: "", window_s=1.0)
+    for _ in range(30):
+        rec.feed(silence(0.1))
+    assert not rec.due()
+    rec.feed(speech(2.0))
+    assert len(rec.buffer) == RATE
+
+
+def test_voice_websocket_commits_move(monkeypatch):
+    windows = []
+
+    def fake_transcribe(samples, sampling_rate=16000):
+        windows.append(len(samples))
+        return "下在 b2"
+
+    monkeypatch.setattr(api, "transcribe_samples", fake_transcribe)
+    game_id = client.post("/games").json()["game_id"]
+    with client.websocket_connect(f"/games/{game_id}/voice") as ws:
+        ws.send_json({"player": "X", "sample_rate": 16000, "format": "pcm16"})
+        for chunk in [speech(0.1)] * 5 + [silence(0.1)] * 4:
+            ws.send_bytes((chunk * 32767).astype("<i2").tobytes())
+        while True:
+            message = ws.receive_json()
+            if message["type"] == "command":
+                break
+            assert message["type"] == "partial"
+    assert message["pos"] == "b2"
+    assert message["success"] is True
+    assert message["turn"] == "O"
+    assert windows
+    assert client.get(f"/games/{game_id}").json()["board"]["b2"] == "X"
+
+
+def test_voice_websocket_final_flushes_utterance(monkeypatch):
+    monkeypatch.setattr(api, "transcribe_samples", lambda samples, sampling_rate=16000: "左上")
+    game_id = client.post("/games").json()["game_id"]
+    with client.websocket_connect(f"/games/{game_id}/voice") as ws:
+        ws.send_bytes((speech(0.2) * 32767).astype("<i2").tobytes())
+        ws.send_json({"type": "end"})
+        messages = [ws.receive_json()]
+        while messages[-1]["type"] != "command":
+            messages.append(ws.receive_json())
+    assert messages[-1]["pos"] == "a1"
+    assert messages[-1]["player"] == "X"
+
+
+def test_voice_websocket_rejects_invalid_config(monkeypatch):
+    monkeypatch.setattr(api, "transcribe_samples", lambda samples, sampling_rate=16000: "左上")
+    game_id = client.post("/games").json()["game_id"]
+    with client.websocket_connect(f"/games/{game_id}/voice") as ws:
+        for control in ({"sample_rate": 0}, {"sample_rate": -8000}, {"sample_rate": 10 ** 9}, {"format": "mp3"}):
+            ws.send_json(control)
+            message = ws.receive_json()
+            assert message["type"] == "error" and message["status"] == 400
+        # 不合法的設定沒有套用，連線仍可正常辨識
+        ws.send_bytes((speech(0.2) * 32767).astype("<i2").tobytes())
+        ws.send_json({"type": "end"})
+        messages = [ws.receive_json()]
+        while messages[-1]["type"] != "command":
+            messages.append(ws.receive_json())
+    assert messages[-1]["pos"] == "a1"
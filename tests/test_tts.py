@@ -0,0 +1,92 @@
+# test_tts.py
+import importlib
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.tts import StubBackend, TTSCache
+
+api = importlib.import_module("app.api.app")
+
+client = TestClient(api.app)
+
+
+class CountingBackend(StubBackend):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.calls = []
+        self.delay = delay
+
+    def synthesize(self, text, voice):
+        self.calls.append(text)
+        time.sleep(self.delay)
+        return super().synthesize(text, voice)
+
+
+def test_key_is_content_addressed():
+    cache = TTSCache(StubBackend())
+    assert cache.register("遊戲已重置") == cache.register("遊戲已重置")
+    assert cache.key("draw") != cache.key("draw", voice="en")
+    assert cache.key("draw") == TTSCache(CountingBackend()).key("draw")  # 同名後端共用 key
+
+
+def test_concurrent_requests_synthesize_once(tmp_path):
+    backend = CountingBackend(delay=0.05)
+    cache = TTSCache(backend, directory=str(tmp_path))
+    key = cache.register("AI已落子")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(key))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert backend.calls == ["AI已落子"]
+    assert len(set(results)) == 1
+    assert (tmp_path / f"{key}.wav").read_bytes() == results[0]
+
+    # 重啟後（新的快取物件、沒有註冊過文字）直接從磁碟讀
+    again = TTSCache(CountingBackend(), directory=str(tmp_path))
+    assert again.get(key) == results[0]
+    assert again.stats()["disk_hits"] == 1
+    assert again.stats()["synthesized"] == 0
+
+
+def test_response_returns_url_and_audio_is_cached(monkeypatch):
+    backend = CountingBackend()
+    monkeypatch.setattr(api, "tts_cache", TTSCache(backend))
+    first = client.post("/reset?game_id=tts-test").json()["tts"]
+    second = client.post("/reset?game_id=tts-test").json()["tts"]
+    assert first == second
+    assert first["url"] == f"/tts/{first['etag']}"
+
+    res = client.get(first["url"])
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "audio/wav"
+    assert res.headers["etag"] == f'"{first["etag"]}"'
+    assert client.get(first["url"]).content == res.content
+    assert backend.calls == ["遊戲已重置"]
+
+    res = client.get(first["url"], headers={"If-None-Match": res.headers["etag"]})
+    assert res.status_code == 304
+    assert client.get("/tts/" + "0" * 64).status_code == 404
+
+
+def test_successful_moves_share_one_phrase(monkeypatch):
+    monkeypatch.setattr(api, "tts_cache", TTSCache(CountingBackend()))
+    game_id = client.post("/games").json()["game_id"]
+    a = client.post(f"/games/{game_id}/move", json={"player": "X", "position": "a1"}).json()["tts"]
+    b = client.post(f"/games/{game_id}/move", json={"player": "O", "position": "b2"}).json()["tts"]
+    assert a == b
+
+
+def test_malformed_keys_never_reach_cache_or_disk(tmp_path, monkeypatch):
+    cache = TTSCache(CountingBackend(), directory=str(tmp_path / "tts"))
+    (tmp_path / "secret.wav").write_bytes(b"secret")
+    monkeypatch.setattr(api, "tts_cache", cache)
+    for key in ("..%2Fsecret", "A" * 64, "0" * 63, "0" * 64 + "0"):
+        assert client.get(f"/tts/{key}").status_code == 404
+    with pytest.raises(KeyError):
+        cache.get("../secret")
+    assert not (tmp_path / "tts").exists()
@@ -0,0 +1,100 @@
+# test_websocket.py
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.app import app, events, store
+from app.core.board import Board
+from app.core.events import board_delta
+
+client = TestClient(app)
+
+
+def create_game():
+    return client.post("/games").json()["game_id"]
+
+
+def test_board_delta_lists_only_changed_cells():
+    board = Board()
+    board.place_piece("a1", "X")
+    before = board.cells()
+    board.place_piece("b2", "O")
+    delta = board_delta("g", before, board)
+    assert delta["changed"] == {"b2": "O"}
+    assert delta["turn"] == "X"
+    assert delta["version"] == board.version
+
+    before = board.cells()
+    board.reset()
+    assert board_delta("g", before, board)["changed"] == {"a1": None, "b2": None}
+
+
+def test_ws_sends_snapshot_then_deltas():
+    game_id = create_game()
+    with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "state"
+        assert snapshot["cells"] == "........."
+
+        ws.send_json({"action": "place", "player": "X", "pos": "a1"})
+        delta = ws.receive_json()
+        assert delta["type"] == "delta"
+        assert delta["changed"] == {"a1": "X"}
+        assert delta["turn"] == "O"
+        assert "board" not in delta
+
+        ws.send_json({"action": "ai", "player": "O"})
+        delta = ws.receive_json()
+        assert list(delta["changed"].values()) == ["O"]
+        assert delta["turn"] == "X"
+
+
+def test_ws_receives_moves_made_over_http():
+    game_id = create_game()
+    with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+        ws.receive_json()
+        client.post(f"/games/{game_id}/move", json={"player": "X", "position": "c3"})
+        delta = ws.receive_json()
+        assert delta["changed"] == {"c3": "X"}
+
+
+def test_ws_errors_go_to_sender_only():
+    game_id = create_game()
+    with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+        ws.receive_json()
+        ws.send_json({"action": "place", "player": "O", "pos": "a1"})
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert error["status"] == 400
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_ws_unknown_game_is_closed():
+    with client.websocket_connect("/games/does-not-exist/ws") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_json()
+    assert exc.value.code == 4404
+
+
+def test_ws_validation_errors_are_json_safe():
+    game_id = create_game()
+    with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+        ws.receive_json()
+        ws.send_json({"action": "ai", "player": "O", "time_ms": -1})
+        error = ws.receive_json()
+        assert error["status"] == 422
+        assert [set(err) for err in error["detail"]] == [{"loc", "msg", "type"}]
+
+
+def test_ws_resync_after_eviction_reports_error_and_closes():
+    game_id = create_game()
+    with client.websocket_connect(f"/games/{game_id}/ws") as ws:
+        ws.receive_json()
+        store.delete(game_id)
+        events.publish(game_id, {"type": "resync", "game_id": game_id})
+        error = ws.receive_json()
+        assert error == {"type": "error", "status": 404, "detail": "Game not found"}
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_json()
+    assert exc.value.code == 4404